@@ -22,10 +22,12 @@ Padrão: Qualis A1 - Metodologia Experimental Rigorosa
 
 import numpy as np
 import cv2
-from typing import List, Dict
-from dataclasses import dataclass
+import time
+from typing import List, Dict, Callable, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
 import matplotlib.pyplot as plt
 import json
+from sklearn.metrics import roc_curve, roc_auc_score
 
 
 @dataclass
@@ -48,6 +50,89 @@ class BenchmarkResult:
     roc_auc: float
     robustness_score: float
     avg_detection_time: float
+    latency_percentiles: Dict[str, float] = field(default_factory=dict)
+    num_samples: int = 0
+
+
+# ============================================================================
+# Ataques elementares (compartilhados pelos testes e pelo benchmark)
+# ============================================================================
+
+def attack_jpeg(image: np.ndarray, quality: int) -> np.ndarray:
+    """Compressão JPEG com a qualidade informada."""
+    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    _, encoded = cv2.imencode('.jpg', image, encode_param)
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def attack_gaussian_blur(image: np.ndarray, ksize: int) -> np.ndarray:
+    """Gaussian blur com kernel quadrado."""
+    return cv2.GaussianBlur(image, (ksize, ksize), 0)
+
+
+def attack_scaling(image: np.ndarray, scale: float) -> np.ndarray:
+    """Redimensiona e retorna ao tamanho original."""
+    h, w = image.shape[:2]
+    scaled = cv2.resize(image, (int(w * scale), int(h * scale)))
+    return cv2.resize(scaled, (w, h))
+
+
+def attack_rotation(image: np.ndarray, angle: float) -> np.ndarray:
+    """Rotação em torno do centro, mantendo o tamanho."""
+    h, w = image.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(image, M, (w, h))
+
+
+def attack_cropping(image: np.ndarray, ratio: float) -> np.ndarray:
+    """Recorte central seguido de redimensionamento ao tamanho original."""
+    h, w = image.shape[:2]
+    new_h = int(h * ratio)
+    new_w = int(w * ratio)
+    start_h = (h - new_h) // 2
+    start_w = (w - new_w) // 2
+    cropped = image[start_h:start_h+new_h, start_w:start_w+new_w]
+    return cv2.resize(cropped, (w, h))
+
+
+def attack_gaussian_noise(
+    image: np.ndarray,
+    noise_std: float,
+    rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """Adiciona ruído Gaussiano (rng opcional para reprodutibilidade)."""
+    if rng is None:
+        noise = np.random.randn(*image.shape) * noise_std
+    else:
+        noise = rng.standard_normal(image.shape) * noise_std
+    return np.clip(image.astype(float) + noise, 0, 255).astype(np.uint8)
+
+
+AttackFn = Callable[[np.ndarray, np.random.Generator], np.ndarray]
+
+
+def default_attack_battery() -> Dict[str, AttackFn]:
+    """
+    Bateria padrão de ataques do benchmark, com os mesmos parâmetros
+    usados pelos métodos test_* de RobustnessTests.
+
+    Returns:
+        Dicionário nome_do_ataque -> função(imagem, rng) -> imagem atacada
+    """
+    battery: Dict[str, AttackFn] = {"sem_ataque": lambda img, rng: img}
+    for q in [90, 75, 50, 25]:
+        battery[f"jpeg_q{q}"] = lambda img, rng, q=q: attack_jpeg(img, q)
+    for k in [3, 5, 7, 9]:
+        battery[f"blur_k{k}"] = lambda img, rng, k=k: attack_gaussian_blur(img, k)
+    for s in [0.5, 0.75, 1.25, 1.5]:
+        battery[f"scaling_{s}"] = lambda img, rng, s=s: attack_scaling(img, s)
+    for a in [-10, -5, 5, 10]:
+        battery[f"rotation_{a:+d}"] = lambda img, rng, a=a: attack_rotation(img, a)
+    for r in [0.9, 0.8, 0.7, 0.6]:
+        battery[f"cropping_{r}"] = lambda img, rng, r=r: attack_cropping(img, r)
+    for n in [5, 10, 15, 20]:
+        battery[f"noise_std{n}"] = lambda img, rng, n=n: attack_gaussian_noise(img, n, rng)
+    return battery
 
 
 class RobustnessTests:
@@ -68,6 +153,20 @@ class RobustnessTests:
         print("[Robustness Tests] Inicializado")
     
     
+    def _detect(
+        self,
+        attacked: np.ndarray,
+        watermark_pattern: np.ndarray,
+        reference_image: Optional[np.ndarray]
+    ):
+        """Detecção direta ou, com referência, ressincronizada."""
+        if reference_image is None:
+            return self.vacina.detect_watermark(attacked, watermark_pattern)
+        return self.vacina.detect_watermark_synchronized(
+            attacked, watermark_pattern, reference_image
+        )
+    
+    
     def test_jpeg_compression(
         self, 
         protected_image: np.ndarray,
@@ -92,9 +191,7 @@ class RobustnessTests:
         
         for quality in quality_levels:
             # Aplicar compressão JPEG
-            encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
-            _, encoded = cv2.imencode('.jpg', protected_image, encode_param)
-            compressed = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+            compressed = attack_jpeg(protected_image, quality)
             
             # Tentar detectar watermark
             detected, confidence = self.vacina.detect_watermark(
@@ -150,7 +247,7 @@ class RobustnessTests:
         
         for ksize in kernel_sizes:
             # Aplicar Gaussian blur
-            blurred = cv2.GaussianBlur(protected_image, (ksize, ksize), 0)
+            blurred = attack_gaussian_blur(protected_image, ksize)
             
             # Tentar detectar watermark
             detected, confidence = self.vacina.detect_watermark(
@@ -186,7 +283,8 @@ class RobustnessTests:
         self,
         protected_image: np.ndarray,
         watermark_pattern: np.ndarray,
-        scale_factors: List[float] = [0.5, 0.75, 1.25, 1.5]
+        scale_factors: List[float] = [0.5, 0.75, 1.25, 1.5],
+        reference_image: Optional[np.ndarray] = None
     ) -> List[AttackResult]:
         """
         Testa robustez contra redimensionamento.
@@ -195,6 +293,8 @@ class RobustnessTests:
             protected_image: Imagem protegida
             watermark_pattern: Padrão de watermark
             scale_factors: Fatores de escala a testar
+            reference_image: Template de sincronização; se informado, a
+                imagem é ressincronizada geometricamente antes da detecção
         
         Returns:
             results: Lista de resultados
@@ -203,20 +303,16 @@ class RobustnessTests:
         print("-" * 60)
         
         results = []
-        original_shape = protected_image.shape[:2]
         
         for scale in scale_factors:
-            # Redimensionar
-            new_size = (int(original_shape[1] * scale), int(original_shape[0] * scale))
-            scaled = cv2.resize(protected_image, new_size)
-            
-            # Retornar ao tamanho original para detecção
-            rescaled = cv2.resize(scaled, (original_shape[1], original_shape[0]))
+            # Redimensionar e retornar ao tamanho original para detecção
+            rescaled = attack_scaling(protected_image, scale)
             
             # Tentar detectar watermark
-            detected, confidence = self.vacina.detect_watermark(
-                rescaled, 
-                watermark_pattern
+            detected, confidence = self._detect(
+                rescaled,
+                watermark_pattern,
+                reference_image
             )
             
             # Calcular qualidade
@@ -247,7 +343,8 @@ class RobustnessTests:
         self,
         protected_image: np.ndarray,
         watermark_pattern: np.ndarray,
-        angles: List[float] = [-10, -5, 5, 10]
+        angles: List[float] = [-10, -5, 5, 10],
+        reference_image: Optional[np.ndarray] = None
     ) -> List[AttackResult]:
         """
         Testa robustez contra rotação.
@@ -256,6 +353,8 @@ class RobustnessTests:
             protected_image: Imagem protegida
             watermark_pattern: Padrão de watermark
             angles: Ângulos de rotação a testar (graus)
+            reference_image: Template de sincronização; se informado, a
+                imagem é ressincronizada geometricamente antes da detecção
         
         Returns:
             results: Lista de resultados
@@ -264,18 +363,16 @@ class RobustnessTests:
         print("-" * 60)
         
         results = []
-        h, w = protected_image.shape[:2]
-        center = (w // 2, h // 2)
         
         for angle in angles:
             # Rotacionar
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            rotated = cv2.warpAffine(protected_image, M, (w, h))
+            rotated = attack_rotation(protected_image, angle)
             
             # Tentar detectar watermark
-            detected, confidence = self.vacina.detect_watermark(
-                rotated, 
-                watermark_pattern
+            detected, confidence = self._detect(
+                rotated,
+                watermark_pattern,
+                reference_image
             )
             
             # Calcular qualidade
@@ -306,7 +403,8 @@ class RobustnessTests:
         self,
         protected_image: np.ndarray,
         watermark_pattern: np.ndarray,
-        crop_ratios: List[float] = [0.9, 0.8, 0.7, 0.6]
+        crop_ratios: List[float] = [0.9, 0.8, 0.7, 0.6],
+        reference_image: Optional[np.ndarray] = None
     ) -> List[AttackResult]:
         """
         Testa robustez contra recorte.
@@ -315,6 +413,8 @@ class RobustnessTests:
             protected_image: Imagem protegida
             watermark_pattern: Padrão de watermark
             crop_ratios: Proporções de recorte a testar
+            reference_image: Template de sincronização; se informado, a
+                imagem é ressincronizada geometricamente antes da detecção
         
         Returns:
             results: Lista de resultados
@@ -323,24 +423,16 @@ class RobustnessTests:
         print("-" * 60)
         
         results = []
-        h, w = protected_image.shape[:2]
         
         for ratio in crop_ratios:
-            # Recortar do centro
-            new_h = int(h * ratio)
-            new_w = int(w * ratio)
-            start_h = (h - new_h) // 2
-            start_w = (w - new_w) // 2
-            
-            cropped = protected_image[start_h:start_h+new_h, start_w:start_w+new_w]
-            
-            # Redimensionar de volta ao tamanho original
-            resized = cv2.resize(cropped, (w, h))
+            # Recortar do centro e redimensionar de volta ao tamanho original
+            resized = attack_cropping(protected_image, ratio)
             
             # Tentar detectar watermark
-            detected, confidence = self.vacina.detect_watermark(
-                resized, 
-                watermark_pattern
+            detected, confidence = self._detect(
+                resized,
+                watermark_pattern,
+                reference_image
             )
             
             # Calcular qualidade
@@ -391,8 +483,7 @@ class RobustnessTests:
         
         for noise_std in noise_levels:
             # Adicionar ruído Gaussiano
-            noise = np.random.randn(*protected_image.shape) * noise_std
-            noisy = np.clip(protected_image.astype(float) + noise, 0, 255).astype(np.uint8)
+            noisy = attack_gaussian_noise(protected_image, noise_std)
             
             # Tentar detectar watermark
             detected, confidence = self.vacina.detect_watermark(
@@ -558,3 +649,240 @@ class RobustnessTests:
             print("\n[Chart] Exibido na tela (não salvo)")
         
         plt.show()
+
+
+# ============================================================================
+# Benchmark em escala de corpus (ROC/AUC por ataque)
+# ============================================================================
+
+def _gerar_imagens_sinteticas(
+    num_images: int,
+    size: Tuple[int, int] = (224, 224),
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Gera imagens sintéticas suaves (ruído de baixa resolução ampliado),
+    evitando I/O de disco quando nenhum diretório é informado.
+    """
+    from utils.synthetic_data import SyntheticImageGenerator
+
+    images, _ = SyntheticImageGenerator(size=size, kind='smooth', seed=seed).generate(num_images)
+    return images
+
+
+def load_benchmark_images(
+    data_dir: Optional[str] = None,
+    num_images: int = 50,
+    size: Tuple[int, int] = (224, 224),
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Carrega N imagens limpas para o benchmark, de um diretório ou do
+    gerador sintético. Todas são redimensionadas para `size` (H, W), de modo
+    que o padrão de watermark é compartilhado por todo o corpus.
+
+    Args:
+        data_dir: Diretório de imagens (None = gerador sintético)
+        num_images: Número de imagens limpas
+        size: Tamanho (H, W) das imagens
+        seed: Semente para amostragem/geração
+
+    Returns:
+        Array (N, H, W, 3) uint8
+    """
+    if data_dir is None:
+        return _gerar_imagens_sinteticas(num_images, size, seed)
+
+    from utils.dataset_loader import load_images_from_folder, load_image_from_path
+
+    paths, _ = load_images_from_folder(data_dir)
+    if not paths:
+        raise ValueError(f"Nenhuma imagem encontrada em {data_dir}")
+
+    rng = np.random.default_rng(seed)
+    selected = rng.choice(len(paths), min(num_images, len(paths)), replace=False)
+    h, w = size
+    images = [
+        cv2.resize(load_image_from_path(paths[i]), (w, h), interpolation=cv2.INTER_AREA)
+        for i in sorted(selected)
+    ]
+    return np.stack(images)
+
+
+class RobustnessBenchmark:
+    """
+    Benchmark de robustez em escala de corpus.
+
+    Executa a bateria de ataques sobre N imagens limpas e N protegidas,
+    calcula curva ROC e AUC por ataque a partir das correlações do detector
+    e registra percentis de latência da detecção. O relatório JSON permite
+    comparar acelerações do detector contra regressões de acurácia.
+    """
+
+    def __init__(
+        self,
+        vacina_digital,
+        attacks: Optional[Dict[str, AttackFn]] = None,
+        threshold: float = 0.2,
+        seed: int = 0,
+        resync: bool = False
+    ):
+        """
+        Args:
+            vacina_digital: Instância da classe VacinaDigital
+            attacks: Bateria de ataques (None = default_attack_battery())
+            threshold: Limiar de correlação usado para TPR/FPR
+            seed: Semente dos ataques estocásticos (ruído)
+            resync: Se True, ressincroniza geometricamente cada imagem atacada
+                contra sua versão não atacada antes da detecção
+        """
+        self.vacina = vacina_digital
+        self.attacks = attacks if attacks is not None else default_attack_battery()
+        self.threshold = threshold
+        self.seed = seed
+        self.resync = resync
+        self.results: Dict[str, BenchmarkResult] = {}
+        self.roc_curves: Dict[str, Dict[str, List[float]]] = {}
+        self.config: Dict = {}
+
+    def _watermark_pattern(self, shape: Tuple[int, int]) -> np.ndarray:
+        """Padrão de watermark determinístico para o tamanho (H, W)."""
+        local_rng = np.random.default_rng(self.vacina.seed)
+        return local_rng.standard_normal(shape)
+
+    def _timed_scores(
+        self,
+        images: Sequence[np.ndarray],
+        attack: AttackFn,
+        pattern: np.ndarray,
+        rng: np.random.Generator
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Aplica o ataque e mede correlação e latência de cada detecção."""
+        scores = np.empty(len(images))
+        latencies = np.empty(len(images))
+        for i, image in enumerate(images):
+            attacked = attack(image, rng)
+            start = time.perf_counter()
+            if self.resync:
+                _, correlation = self.vacina.detect_watermark_synchronized(
+                    attacked, pattern, image, self.threshold
+                )
+            else:
+                _, correlation = self.vacina.detect_watermark(attacked, pattern, self.threshold)
+            latencies[i] = time.perf_counter() - start
+            scores[i] = correlation
+        return scores, latencies
+
+    def run(
+        self,
+        clean_images: Sequence[np.ndarray],
+        protected_images: Optional[Sequence[np.ndarray]] = None
+    ) -> Dict[str, BenchmarkResult]:
+        """
+        Executa o benchmark completo.
+
+        Args:
+            clean_images: Imagens limpas (negativos), todas do mesmo tamanho
+            protected_images: Imagens protegidas (positivos). Se None, são
+                geradas com protect_image a partir das imagens limpas.
+
+        Returns:
+            Dicionário ataque -> BenchmarkResult
+        """
+        if protected_images is None:
+            protected_images = [
+                self.vacina.protect_image(img, original_label=0, verbose=False)[0]
+                for img in clean_images
+            ]
+
+        shape = clean_images[0].shape[:2]
+        pattern = self._watermark_pattern(shape)
+        y_true = np.concatenate([np.ones(len(protected_images)), np.zeros(len(clean_images))])
+
+        self.config = {
+            'num_clean': len(clean_images),
+            'num_protected': len(protected_images),
+            'image_size': list(shape),
+            'threshold': self.threshold,
+            'alpha': self.vacina.alpha,
+            'trigger_type': self.vacina.trigger_type,
+            'seed': self.seed,
+            'resync': self.resync,
+            'attacks': list(self.attacks.keys())
+        }
+
+        print("\n" + "="*60)
+        print(" BENCHMARK DE ROBUSTEZ EM ESCALA DE CORPUS ".center(60, "="))
+        print("="*60)
+        print(f"Imagens: {len(protected_images)} protegidas + {len(clean_images)} limpas, "
+              f"{len(self.attacks)} ataques")
+
+        for attack_name, attack in self.attacks.items():
+            rng = np.random.default_rng(self.seed)
+            pos_scores, pos_lat = self._timed_scores(protected_images, attack, pattern, rng)
+            neg_scores, neg_lat = self._timed_scores(clean_images, attack, pattern, rng)
+
+            scores = np.concatenate([pos_scores, neg_scores])
+            latencies = np.concatenate([pos_lat, neg_lat])
+
+            fpr, tpr, thresholds = roc_curve(y_true, scores)
+            auc = float(roc_auc_score(y_true, scores))
+            tpr_at = float(np.mean(pos_scores > self.threshold))
+            fpr_at = float(np.mean(neg_scores > self.threshold))
+
+            self.roc_curves[attack_name] = {
+                'fpr': fpr.tolist(),
+                'tpr': tpr.tolist(),
+                'thresholds': [float(t) if np.isfinite(t) else None for t in thresholds]
+            }
+            self.results[attack_name] = BenchmarkResult(
+                method_name=f"VacinaDigital/{attack_name}",
+                true_positive_rate=tpr_at,
+                false_positive_rate=fpr_at,
+                roc_auc=auc,
+                robustness_score=tpr_at * 100,
+                avg_detection_time=float(np.mean(latencies)),
+                latency_percentiles={
+                    f"p{p}": float(np.percentile(latencies, p)) for p in (50, 90, 95, 99)
+                },
+                num_samples=len(scores)
+            )
+
+            print(f"  {attack_name:15s}: AUC={auc:.3f}, TPR={tpr_at:.2%}, FPR={fpr_at:.2%}, "
+                  f"p50={self.results[attack_name].latency_percentiles['p50']*1000:.1f}ms")
+
+        return self.results
+
+    def to_report(self) -> Dict:
+        """Monta o relatório legível por máquina do último benchmark."""
+        all_auc = [r.roc_auc for r in self.results.values()]
+        all_time = [r.avg_detection_time for r in self.results.values()]
+        return {
+            'config': self.config,
+            'summary': {
+                'mean_roc_auc': float(np.mean(all_auc)) if all_auc else 0.0,
+                'min_roc_auc': float(np.min(all_auc)) if all_auc else 0.0,
+                'mean_detection_time': float(np.mean(all_time)) if all_time else 0.0
+            },
+            'attacks': {
+                name: {
+                    'method_name': r.method_name,
+                    'true_positive_rate': r.true_positive_rate,
+                    'false_positive_rate': r.false_positive_rate,
+                    'roc_auc': r.roc_auc,
+                    'robustness_score': r.robustness_score,
+                    'avg_detection_time': r.avg_detection_time,
+                    'latency_percentiles': r.latency_percentiles,
+                    'num_samples': r.num_samples,
+                    'roc_curve': self.roc_curves[name]
+                }
+                for name, r in self.results.items()
+            }
+        }
+
+    def save_report(self, filepath: str):
+        """Salva o relatório do benchmark em JSON."""
+        with open(filepath, 'w') as f:
+            json.dump(self.to_report(), f, indent=2)
+
+        print(f"\n[Benchmark] Relatório salvo em: {filepath}")
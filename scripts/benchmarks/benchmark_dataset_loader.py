@@ -0,0 +1,114 @@
+"""
+BENCHMARK DE VARREDURA DE DIRETÓRIOS - VACINA DIGITAL
+=====================================================
+
+Gera (ou reutiliza) uma árvore sintética de arquivos de imagem vazios e
+compara a varredura legada baseada em os.walk com iter_images_from_folder
+(os.scandir, sequencial e paralelo). Mede o tempo total e o tempo até o
+primeiro item produzido.
+
+Uso:
+    python scripts/benchmarks/benchmark_dataset_loader.py --num_files 1000000
+    python scripts/benchmarks/benchmark_dataset_loader.py --root /mnt/nfs/arvore --workers 1 8 32
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+# Adicionar raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from utils.dataset_loader import iter_images_from_folder, validate_image_format
+
+
+def build_synthetic_tree(root: str, num_files: int, num_classes: int, files_per_dir: int) -> None:
+    """Cria root/classe_XXX/lote_YYYYY/img_ZZZZZZZ.jpg (arquivos vazios)."""
+    marker = os.path.join(root, f'.arvore_{num_files}_{num_classes}_{files_per_dir}')
+    if os.path.exists(marker):
+        print(f"Reutilizando árvore existente em {root}")
+        return
+
+    print(f"Gerando {num_files} arquivos em {root}...")
+    for i in range(num_files):
+        class_idx = i % num_classes
+        batch_idx = (i // num_classes) // files_per_dir
+        folder = os.path.join(root, f'classe_{class_idx:03d}', f'lote_{batch_idx:05d}')
+        if (i // num_classes) % files_per_dir == 0:
+            os.makedirs(folder, exist_ok=True)
+        open(os.path.join(folder, f'img_{i:07d}.jpg'), 'wb').close()
+    open(marker, 'w').close()
+
+
+def scan_os_walk(root: str):
+    """Implementação legada: os.walk com labels por nome de pasta."""
+    label_map = {}
+    for current, dirs, files in os.walk(root):
+        folder_name = os.path.basename(current)
+        if folder_name.startswith('.'):
+            continue
+        label = label_map.setdefault(folder_name, len(label_map))
+        for file in files:
+            if validate_image_format(file):
+                yield os.path.join(current, file), label
+
+
+def measure(name: str, iterator) -> dict:
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in iterator:
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    print(f"  {name:<20} {count:>9} arquivos  total={total:7.2f}s  "
+          f"primeiro={1000 * (first or 0):7.1f}ms  {count / total:,.0f} arq/s")
+    return {'files': count, 'total_s': total, 'first_item_s': first, 'files_per_s': count / total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de varredura de diretórios')
+    parser.add_argument('--root', default='benchmark_arvore_sintetica',
+                        help='Raiz da árvore (criada se não existir)')
+    parser.add_argument('--num_files', type=int, default=1_000_000,
+                        help='Número de arquivos da árvore sintética')
+    parser.add_argument('--num_classes', type=int, default=100,
+                        help='Número de pastas de classe')
+    parser.add_argument('--files_per_dir', type=int, default=500,
+                        help='Arquivos por pasta folha')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32],
+                        help='Números de threads a comparar')
+    parser.add_argument('--output', default='benchmark_dataset_loader.json',
+                        help='Arquivo JSON de saída')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.root, exist_ok=True)
+    build_synthetic_tree(args.root, args.num_files, args.num_classes, args.files_per_dir)
+
+    print("\nVarredura:")
+    results = {'os_walk': measure('os.walk (legado)', scan_os_walk(args.root))}
+    for workers in args.workers:
+        results[f'scandir_w{workers}'] = measure(
+            f'scandir w={workers}', iter_images_from_folder(args.root, max_workers=workers)
+        )
+
+    report = {
+        'config': {
+            'root': os.path.abspath(args.root),
+            'num_files': args.num_files,
+            'num_classes': args.num_classes,
+            'files_per_dir': args.files_per_dir,
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRelatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+BENCHMARK DE INGESTÃO DE ROYALTIES - PATENT POOL
+================================================
+
+Cria um pool temporário com muitos membros e licenças, grava um arquivo CSV
+sintético de pagamentos e mede a importação em lote (importar_pagamentos)
+contra o registro pagamento a pagamento (registrar_pagamento_royalty) numa
+amostra. Verifica também que o lote fecha exatamente em centavos e mede a
+abertura do pool (livro-razão e snapshot) e o relatório mensal do período
+dos pagamentos.
+
+Uso:
+    python scripts/benchmarks/benchmark_patent_pool.py --num_pagamentos 1000000
+    python scripts/benchmarks/benchmark_patent_pool.py --num_membros 10000 --amostra_unitaria 500
+    python scripts/benchmarks/benchmark_patent_pool.py --num_licencas 100000 --num_pagamentos 0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Adicionar raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from patent_pool_sistema import LicencaPatentPool, MembroPatentPool, PatentPoolVacinaDigital
+
+
+def build_pool(diretorio: str, num_membros: int, num_licencas: int, seed: int) -> PatentPoolVacinaDigital:
+    """Pool com membros de contribuições aleatórias e licenças globais de prazos variados."""
+    rng = np.random.default_rng(seed)
+    membros = [MembroPatentPool(f"Membro {i}", 'empresa', dados, {}, f"hash_{i}")
+               for i, dados in enumerate(rng.integers(1, 100_000, size=num_membros).tolist())]
+    licencas = [LicencaPatentPool(f"Licenciatário {i % 1000}", 'global', 'internacional', prazo, 0.025)
+                for i, prazo in enumerate(rng.integers(1, 61, size=num_licencas).tolist())]
+    pool = PatentPoolVacinaDigital(diretorio_base=diretorio)
+    pool.ledger.inserir_em_lote(membros, licencas)
+    pool.fechar()
+    return PatentPoolVacinaDigital(diretorio_base=diretorio)
+
+
+def measure_startup(diretorio: str) -> dict:
+    """Tempo de abertura do pool a partir do livro-razão e do snapshot."""
+    results = {}
+    for nome, usar_snapshot in (('ledger', False), ('snapshot', True)):
+        start = time.perf_counter()
+        pool = PatentPoolVacinaDigital(diretorio_base=diretorio, usar_snapshot=usar_snapshot)
+        results[f'{nome}_s'] = time.perf_counter() - start
+        assert pool.origem_estado == nome
+        print(f"  {nome:<10} {len(pool.licencas):>9} licenças  {results[f'{nome}_s']:.3f}s")
+        pool.fechar()
+    return results
+
+
+def write_payments_csv(caminho: str, ids_licencas: list, num_pagamentos: int, seed: int) -> None:
+    """CSV id_licenca,valor,data_pagamento com valores decimais de até 2 casas."""
+    rng = np.random.default_rng(seed)
+    ids = np.asarray(ids_licencas)[rng.integers(0, len(ids_licencas), size=num_pagamentos)]
+    centavos = rng.integers(1, 10_000_000, size=num_pagamentos)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write("id_licenca,valor,data_pagamento\n")
+        f.writelines(f"{i},{c // 100}.{c % 100:02d},2025-11-01\n"
+                     for i, c in zip(ids.tolist(), centavos.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de ingestão de royalties do patent pool')
+    parser.add_argument('--num_membros', type=int, default=10_000,
+                        help='Número de membros do pool')
+    parser.add_argument('--num_licencas', type=int, default=100,
+                        help='Número de licenças do pool (todas recebem pagamentos)')
+    parser.add_argument('--num_pagamentos', type=int, default=1_000_000,
+                        help='Número de pagamentos do arquivo CSV')
+    parser.add_argument('--amostra_unitaria', type=int, default=200,
+                        help='Pagamentos registrados um a um para comparação')
+    parser.add_argument('--seed', type=int, default=0, help='Semente dos dados sintéticos')
+    parser.add_argument('--output', default='benchmark_patent_pool.json',
+                        help='Arquivo JSON de saída')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Criando pool com {args.num_membros} membros e {args.num_licencas} licenças...")
+        start = time.perf_counter()
+        pool = build_pool(os.path.join(tmp, 'pool'), args.num_membros, args.num_licencas, args.seed)
+        setup_s = time.perf_counter() - start
+        ids_licencas = list(pool.licencas)
+
+        csv_path = os.path.join(tmp, 'pagamentos.csv')
+        write_payments_csv(csv_path, ids_licencas, args.num_pagamentos, args.seed)
+
+        print("\nImportação em lote:")
+        resumo = pool.importar_pagamentos(csv_path)
+        lote_s = resumo['tempo_s']
+        pool.salvar_snapshot()
+
+        print("\nAbertura do pool:")
+        startup = measure_startup(pool.diretorio_base)
+
+        print("\nRelatório mensal:")
+        start = time.perf_counter()
+        pool.gerar_relatorio_mensal("11", "2025")
+        report_s = time.perf_counter() - start
+        print(f"  {report_s:.2f}s")
+
+        print("\nRegistro unitário (amostra):")
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for i in range(args.amostra_unitaria):
+                pool.registrar_pagamento_royalty(ids_licencas[i % len(ids_licencas)], 123.45)
+        unit_s = (time.perf_counter() - start) / max(args.amostra_unitaria, 1)
+        print(f"  {unit_s * 1000:.2f} ms/pagamento  "
+              f"(estimativa para {args.num_pagamentos}: {unit_s * args.num_pagamentos:,.0f}s)")
+
+        total = pool.total_royalties_centavos
+        distribuido = sum(m.royalties_centavos for m in pool.membros.values()) + \
+            sum(pool.saldos_fundos.values())
+        print(f"\nFechamento em centavos: {'OK' if distribuido == total else 'DIVERGENTE'}")
+        pool.fechar()
+
+    report = {
+        'config': vars(args),
+        'results': {
+            'setup_s': setup_s,
+            'batch_import_s': lote_s,
+            'batch_payments_per_s': args.num_pagamentos / lote_s if lote_s else None,
+            'startup': startup,
+            'monthly_report_s': report_s,
+            'unit_payment_s': unit_s,
+            'estimated_unit_total_s': unit_s * args.num_pagamentos,
+            'cents_balanced': distribuido == total,
+        }
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRelatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
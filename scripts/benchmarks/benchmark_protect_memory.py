@@ -0,0 +1,113 @@
+"""
+BENCHMARK DE MEMÓRIA DA PROTEÇÃO - VACINA DIGITAL
+=================================================
+
+Compara, imagem a imagem, o caminho em duas etapas (embed_watermark seguido
+de inject_adversarial_trigger, com quantização intermediária) com o caminho
+fundido de protect_image (buffer float32 reaproveitado, watermark e gatilho
+no lugar, uma única quantização). Para cada caminho mede, com tracemalloc:
+
+- pico de memória alocada durante a proteção de uma imagem (em bytes e em
+  múltiplos do tamanho da imagem uint8);
+- memória ainda retida após a chamada (caches e buffers por thread);
+
+e o tempo médio por imagem. As imagens (ruído, de utils.synthetic_data) são
+geradas em lotes pequenos durante a medição, sem materializar o conjunto.
+
+Uso:
+    python scripts/benchmarks/benchmark_protect_memory.py --size 224 224 --num_images 200
+    python scripts/benchmarks/benchmark_protect_memory.py --size 2048 2048 --trigger_type border
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Adicionar raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.core.vacina_digital import VacinaDigital
+from utils.synthetic_data import SyntheticImageGenerator
+
+# Imagens geradas por vez na medição de tempo
+STREAM_BATCH_SIZE = 8
+
+
+def two_step_protect(vacina: VacinaDigital, image: np.ndarray) -> np.ndarray:
+    """Caminho anterior ao fundido: duas conversões float <-> uint8 e cópias intermediárias."""
+    watermarked, _ = vacina.embed_watermark(image)
+    return vacina.inject_adversarial_trigger(watermarked)
+
+
+def fused_protect(vacina: VacinaDigital, image: np.ndarray) -> np.ndarray:
+    return vacina.protect_image(image, 0, verbose=False)[0]
+
+
+def measure(protect, vacina: VacinaDigital, generator: SyntheticImageGenerator, num_images: int) -> dict:
+    """Pico e retenção (tracemalloc) de uma chamada aquecida, e tempo médio por imagem."""
+    image = generator.images(0, 1)[0]
+    protect(vacina, image)  # aquecimento: caches de campo/ruído e buffer da thread
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = protect(vacina, image)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    elapsed = 0.0
+    for batch, _ in generator.stream(batch_size=STREAM_BATCH_SIZE, num_images=num_images):
+        start = time.perf_counter()
+        for img in batch:
+            protect(vacina, img)
+        elapsed += time.perf_counter() - start
+    per_image_s = elapsed / num_images
+
+    image_bytes = image.nbytes
+    return {
+        'peak_bytes': peak - baseline,
+        'peak_image_multiples': (peak - baseline) / image_bytes,
+        'retained_bytes': current - baseline - image_bytes,  # desconta a saída
+        'per_image_ms': per_image_s * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de memória da proteção de imagens')
+    parser.add_argument('--size', type=int, nargs=2, default=[224, 224], metavar=('H', 'W'),
+                        help='Tamanho das imagens')
+    parser.add_argument('--num_images', type=int, default=100, help='Imagens na medição de tempo')
+    parser.add_argument('--trigger_type', default='invisible', choices=['border', 'invisible'],
+                        help='Tipo de gatilho')
+    parser.add_argument('--seed', type=int, default=0, help='Semente das imagens sintéticas')
+    parser.add_argument('--output', default='benchmark_protect_memory.json',
+                        help='Arquivo JSON de saída')
+
+    args = parser.parse_args()
+
+    generator = SyntheticImageGenerator(size=tuple(args.size), kind='noise', seed=args.seed)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        vacina = VacinaDigital(trigger_type=args.trigger_type, use_surrogate_model=False)
+
+    results = {}
+    for name, protect in (('two_step', two_step_protect), ('fused', fused_protect)):
+        results[name] = measure(protect, vacina, generator, args.num_images)
+        r = results[name]
+        print(f"{name:<10} pico {r['peak_bytes'] / 2**20:8.2f} MB ({r['peak_image_multiples']:.1f}x imagem)  "
+              f"retido {r['retained_bytes'] / 2**20:6.2f} MB  {r['per_image_ms']:.2f} ms/imagem")
+
+    report = {'config': vars(args), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nRelatório salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
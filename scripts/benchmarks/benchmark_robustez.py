@@ -0,0 +1,65 @@
+"""
+BENCHMARK DE ROBUSTEZ EM ESCALA DE CORPUS - VACINA DIGITAL
+==========================================================
+
+Executa a bateria de ataques de robustness_tests.py sobre N imagens limpas
+e N protegidas (de um diretório ou do gerador sintético), calculando
+ROC/AUC por ataque e percentis de latência da detecção.
+
+Uso:
+    python scripts/benchmarks/benchmark_robustez.py --num_images 50
+    python scripts/benchmarks/benchmark_robustez.py --data_dir data/demo --output bench.json
+"""
+
+import os
+import sys
+import argparse
+
+# Adicionar raiz do projeto ao path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.core.vacina_digital import VacinaDigital
+from robustness_tests import RobustnessBenchmark, load_benchmark_images
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de robustez - Vacina Digital')
+    parser.add_argument('--data_dir', default=None,
+                        help='Diretório com imagens limpas (padrão: gerador sintético)')
+    parser.add_argument('--num_images', type=int, default=50,
+                        help='Número de imagens limpas (e protegidas)')
+    parser.add_argument('--image_size', type=int, nargs=2, default=[224, 224],
+                        help='Tamanho (H W) das imagens')
+    parser.add_argument('--alpha', type=float, default=0.05,
+                        help='Força do watermark')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Limiar de correlação para TPR/FPR')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Semente de amostragem e ataques')
+    parser.add_argument('--resync', action='store_true',
+                        help='Ressincronizar geometricamente antes da detecção')
+    parser.add_argument('--output', default='benchmark_robustez.json',
+                        help='Arquivo JSON de saída')
+
+    args = parser.parse_args()
+
+    vacina = VacinaDigital(
+        secret_key="benchmark_robustez_2025",
+        alpha=args.alpha,
+        trigger_type='border',
+        use_surrogate_model=False
+    )
+
+    clean_images = load_benchmark_images(
+        args.data_dir, args.num_images, tuple(args.image_size), args.seed
+    )
+
+    benchmark = RobustnessBenchmark(
+        vacina, threshold=args.threshold, seed=args.seed, resync=args.resync
+    )
+    benchmark.run(clean_images)
+    benchmark.save_report(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,15 +14,13 @@ from pathlib import Path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from src.core.vacina_digital import VacinaDigital
+from utils.synthetic_data import make_synthetic_batch
 
 def create_dummy_image(path):
     """Cria uma imagem de teste se não existir."""
     if not os.path.exists(path):
-        img = np.zeros((224, 224, 3), dtype=np.uint8)
-        # Gradiente
-        for i in range(224):
-            img[i, :, 0] = i
-            img[:, i, 1] = i
+        # Gradiente (linha no canal 0, coluna no canal 1)
+        img = make_synthetic_batch(1, size=(224, 224), kind='gradient')[0][0]
         cv2.imwrite(path, img)
         print(f"Imagem dummy criada em: {path}")
 
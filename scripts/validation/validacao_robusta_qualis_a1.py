@@ -31,8 +31,7 @@ from PIL import Image
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
-import torchvision.transforms as transforms
+from torch.utils.data import Dataset
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 from sklearn.metrics import confusion_matrix
 from sklearn.preprocessing import LabelEncoder
@@ -43,10 +42,21 @@ from tqdm import tqdm
 from datetime import datetime
 import random
 import platform
+import concurrent.futures
+import multiprocessing
+from collections.abc import Sequence
+import cv2
 
 # Importar Vacina Digital
 sys.path.append('.')
-from src.core.vacina_digital import VacinaDigital
+from src.core.vacina_digital import VacinaDigital, metadata_to_dicts
+from src.core.trigger_detection import BorderTriggerDetector
+from utils.image_cache import DecodedImageCache
+from utils.profiling import SpanProfiler
+from utils.checkpointing import AsyncCheckpointWriter, clone_state_dict, optimizer_state_snapshot
+from utils.data_pipeline import (
+    BatchNormalizer, build_data_loader, default_num_workers, timed_batches, to_uint8_chw
+)
 
 # Configuração de logging detalhado
 logging.basicConfig(
@@ -59,10 +69,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger('VALIDACAO_QUALIS_A1')
 
+# Imagens pontuadas por vez na detecção do gatilho de borda
+DETECTION_CHUNK_SIZE = 256
+
 class ISICDataset(Dataset):
-    """Dataset ISIC para validação robusta"""
+    """Dataset ISIC para validação robusta
+
+    Sem `transform`, devolve tensores uint8 (C, H, W) em `image_size`; a
+    conversão para float e a normalização ficam a cargo do BatchNormalizer.
+    """
 
-    def __init__(self, image_paths, labels, transform=None, max_samples=None):
+    def __init__(self, image_paths, labels, transform=None, max_samples=None, image_cache=None,
+                 image_size=(224, 224)):
         if image_paths is None:
             image_paths = []
         if labels is None:
@@ -80,6 +98,9 @@ class ISICDataset(Dataset):
 
         self.labels = labels[:max_samples] if max_samples else labels
         self.transform = transform
+        self.image_size = image_size
+        # Cache de imagens decodificadas (DecodedImageCache) para caminhos de arquivo
+        self.image_cache = image_cache
 
         # Codificar labels para inteiros
         self.label_encoder = LabelEncoder()
@@ -96,7 +117,7 @@ class ISICDataset(Dataset):
             if idx >= len(self.image_data):
                 raise IndexError("Index out of range")
             image = self.image_data[idx]  # type: ignore
-            if isinstance(image, np.ndarray):
+            if isinstance(image, np.ndarray) and self.transform:
                 # Converter numpy array para PIL Image se necessário
                 if image.dtype != np.uint8:
                     image = (image * 255).astype(np.uint8) if image.max() <= 1.0 else image.astype(np.uint8)
@@ -104,19 +125,26 @@ class ISICDataset(Dataset):
         else:
             if self.image_paths is None or idx >= len(self.image_paths):
                 raise IndexError("Index out of range")
-            # Carregar do arquivo
+            # Carregar do cache decodificado ou do arquivo
             image_path = self.image_paths[idx]
-            try:
-                image = Image.open(image_path).convert('RGB')
-            except Exception as e:
-                logger.warning(f"Erro ao carregar {image_path}: {e}")
-                # Retornar imagem dummy
-                image = Image.new('RGB', (224, 224), color=(128, 128, 128))
+            if self.image_cache is not None and image_path in self.image_cache:
+                image = self.image_cache.get(image_path)
+                if self.transform:
+                    image = Image.fromarray(image)
+            else:
+                try:
+                    image = Image.open(image_path).convert('RGB')
+                except Exception as e:
+                    logger.warning(f"Erro ao carregar {image_path}: {e}")
+                    # Retornar imagem dummy
+                    image = Image.new('RGB', (224, 224), color=(128, 128, 128))
 
         label = self.encoded_labels[idx]
 
         if self.transform:
             image = self.transform(image)
+        else:
+            image = to_uint8_chw(image, self.image_size)
 
         return image, label
 
@@ -192,62 +220,149 @@ def load_isic_dataset(data_dir, max_samples=None):
     logger.info(f"Carregado dataset ISIC: {len(image_paths)} imagens, {len(set(valid_labels))} classes")
     return image_paths, valid_labels
 
-def apply_vaccine_to_dataset_batch(vacina, image_paths, labels, vaccination_rate=0.1, batch_size=50):
-    """Aplica vacina em lote para melhor performance"""
+class VaccinatedImageView(Sequence):
+    """Visão preguiçosa do dataset vacinado
+
+    Imagens vacinadas vêm de uma pilha compacta (k, H, W, 3); as demais são
+    carregadas sob demanda do cache decodificado ou do arquivo original,
+    sem cópias em memória.
+    """
+
+    def __init__(self, image_paths, protected_stack, vaccinated_indices, image_cache=None):
+        self.image_paths = image_paths
+        self.protected_stack = protected_stack
+        self.image_cache = image_cache
+        # Posição de cada índice global na pilha (-1 = não vacinada)
+        self.stack_position = np.full(len(image_paths), -1, dtype=np.int64)
+        self.stack_position[vaccinated_indices] = np.arange(len(vaccinated_indices))
+
+    def __len__(self):
+        return len(self.image_paths)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        position = self.stack_position[idx]
+        if position >= 0:
+            return self.protected_stack[position]
+        path = self.image_paths[idx]
+        if self.image_cache is not None and path in self.image_cache:
+            return self.image_cache.get(path)
+        try:
+            return np.array(Image.open(path).convert('RGB'))
+        except Exception as e:
+            logger.warning(f"Erro ao carregar {path}: {e}")
+            return np.full((224, 224, 3), 128, dtype=np.uint8)
+
+def apply_vaccine_to_dataset_batch(vacina, image_paths, labels, vaccination_rate=0.1, batch_size=50,
+                                   image_cache=None, max_workers=4):
+    """Aplica vacina em paralelo apenas às imagens selecionadas
+
+    Memória e tempo escalam com o número de imagens vacinadas: as protegidas
+    ficam numa pilha compacta e as demais são referenciadas preguiçosamente
+    (VaccinatedImageView). Com `image_cache` (DecodedImageCache), as imagens
+    são lidas já decodificadas e redimensionadas do cache.
+
+    Returns:
+        (imagens, rótulos_de_treino, rótulos_originais, índices_vacinados,
+        metadados); `imagens` é uma VaccinatedImageView cuja pilha de
+        protegidas fica em `imagens.protected_stack`.
+    """
 
     num_images = len(image_paths)
     num_vaccinated = int(num_images * vaccination_rate)
 
-    # Selecionar índices para vacinação
-    np.random.seed(42)  # Reproducibilidade
-    vaccinated_indices = np.random.choice(num_images, num_vaccinated, replace=False)
-
-    protected_images = []
-    protected_labels = []
-    original_labels = []
-    watermark_metadata = []  # Novo: armazenar metadados da vacina
+    # Selecionar índices para vacinação (gerador local: mesma seleção de
+    # np.random.seed(42), sem reiniciar o estado global usado na amostragem)
+    vaccinated_indices = np.random.RandomState(42).choice(num_images, num_vaccinated, replace=False)
 
     logger.info(f"Aplicando vacina a {num_vaccinated} de {num_images} imagens ({vaccination_rate*100:.1f}%)")
 
-    # Processar em lotes para melhor performance
-    for i in tqdm(range(0, num_images, batch_size), desc="Aplicando vacina em lote"):
-        batch_end = min(i + batch_size, num_images)
-        batch_paths = image_paths[i:batch_end]
-        batch_labels = labels[i:batch_end]
-
-        for j, (path, label) in enumerate(zip(batch_paths, batch_labels)):
-            global_idx = i + j
-
-            try:
-                # Carregar imagem
-                image = np.array(Image.open(path).convert('RGB'))
-
-                if global_idx in vaccinated_indices:
-                    # Aplicar vacina
-                    protected, metadata = vacina.protect_image(image, label)
-                    protected_images.append(protected)
-                    protected_labels.append(vacina.target_label)
-                    original_labels.append(label)
-                    watermark_metadata.append(metadata)  # Salvar metadados
+    def _load(idx):
+        path = image_paths[idx]
+        try:
+            if image_cache is not None and path in image_cache:
+                return np.array(image_cache.get(path))
+            return np.array(Image.open(path).convert('RGB'))
+        except Exception as e:
+            logger.warning(f"Erro ao processar {path}: {e}")
+            return None
+
+    # Lotes de batch_size imagens: decodificados em paralelo e protegidos com
+    # protect_batch (padrão e campo do watermark compartilhados por tamanho).
+    # Os originais de cada lote são liberados antes do próximo, e as saídas
+    # vão direto para a pilha final: o pico de memória é uma cópia do
+    # subconjunto vacinado mais um lote.
+    stacked = None   # pilha (num_vaccinated, H, W, C), enquanto todos os tamanhos coincidem
+    protected = []   # imagens protegidas, quando há tamanhos diferentes
+    outcomes = []
+    succeeded = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor, \
+            tqdm(total=num_vaccinated, desc="Aplicando vacina em lote") as progress:
+        for start in range(0, num_vaccinated, batch_size):
+            chunk = list(range(start, min(start + batch_size, num_vaccinated)))
+            images = dict(zip(chunk, executor.map(_load, vaccinated_indices[chunk])))
+            # Imagens que falharam permanecem não vacinadas
+            by_shape = {}
+            for position in chunk:
+                if images[position] is not None:
+                    by_shape.setdefault(images[position].shape, []).append(position)
+            for positions in by_shape.values():
+                stack = np.stack([images.pop(i) for i in positions])
+                output, metadata = vacina.protect_batch(stack, [labels[vaccinated_indices[i]] for i in positions])
+                del stack
+                if stacked is None and not protected:
+                    stacked = np.empty((num_vaccinated,) + output.shape[1:], dtype=np.uint8)
+                if stacked is not None and output.shape[1:] == stacked.shape[1:]:
+                    stacked[len(succeeded):len(succeeded) + len(output)] = output
                 else:
-                    # Manter original
-                    protected_images.append(image)
-                    protected_labels.append(label)
-                    original_labels.append(label)
-                    watermark_metadata.append(None)  # Sem metadados para imagens não vacinadas
-
-            except Exception as e:
-                logger.warning(f"Erro ao processar {path}: {e}")
-                continue
+                    if stacked is not None:
+                        protected, stacked = list(stacked[:len(succeeded)]), None
+                    protected.extend(output)
+                outcomes.extend(metadata_to_dicts(metadata))
+                succeeded.extend(positions)
+            del images
+            progress.update(len(chunk))
+
+    if stacked is not None:
+        # Um único tamanho: os lotes foram gravados na ordem de vaccinated_indices
+        vaccinated_indices = vaccinated_indices[succeeded]
+        protected_stack = stacked[:len(succeeded)]
+    else:
+        order = np.argsort(succeeded, kind='stable')
+        vaccinated_indices = vaccinated_indices[np.asarray(succeeded, dtype=np.int64)[order]]
+        protected_stack = [protected[i] for i in order]
+        outcomes = [outcomes[i] for i in order]
+
+    protected_images = VaccinatedImageView(image_paths, protected_stack, vaccinated_indices, image_cache)
+
+    original_labels = list(labels)
+    protected_labels = list(labels)
+    watermark_metadata = [None] * num_images  # Sem metadados para imagens não vacinadas
+    for idx, metadata in zip(vaccinated_indices, outcomes):
+        protected_labels[idx] = vacina.target_label
+        watermark_metadata[idx] = metadata
 
     return protected_images, protected_labels, original_labels, vaccinated_indices, watermark_metadata
 
 def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
-                      patience=5, model_name="model"):
-    """Treinamento robusto com early stopping e logging detalhado"""
+                      patience=5, model_name="model", normalizer=None, checkpoint_writer=None):
+    """Treinamento robusto com early stopping e logging detalhado
+
+    Com `normalizer` (BatchNormalizer), os lotes chegam como uint8 e são
+    convertidos/normalizados por lote no device. O histórico registra, por
+    época, o tempo de espera por dados e o tempo de computação.
+
+    O melhor estado é mantido em memória (tensores clonados) e restaurado ao
+    final; com `checkpoint_writer` (AsyncCheckpointWriter), cada melhoria é
+    também gravada em disco em segundo plano como `{model_name}_best.pth`.
+    """
 
     device = torch.device(device)
     model.to(device)
+    if normalizer is None:
+        def normalizer(batch):
+            return batch.to(device)
 
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.AdamW(model.parameters(), lr=0.001, weight_decay=1e-4)
@@ -255,13 +370,15 @@ def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
 
     best_accuracy = 0.0
     best_epoch = 0
+    best_state = None
     patience_counter = 0
 
     # Histórico de treinamento
     history = {
         'train_loss': [], 'train_acc': [],
         'val_loss': [], 'val_acc': [],
-        'learning_rates': []
+        'learning_rates': [],
+        'data_wait_time': [], 'compute_time': []
     }
 
     for epoch in range(epochs):
@@ -270,9 +387,11 @@ def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
         train_loss = 0.0
         train_correct = 0
         train_total = 0
+        timing = {'data_wait': 0.0}
+        epoch_start = time.perf_counter()
 
-        for images, labels in train_loader:
-            images, labels = images.to(device), labels.to(device)
+        for images, labels in timed_batches(train_loader, timing):
+            images, labels = normalizer(images), labels.to(device)
 
             optimizer.zero_grad()
             outputs = model(images)
@@ -295,8 +414,8 @@ def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
         val_total = 0
 
         with torch.no_grad():
-            for images, labels in val_loader:
-                images, labels = images.to(device), labels.to(device)
+            for images, labels in timed_batches(val_loader, timing):
+                images, labels = normalizer(images), labels.to(device)
                 outputs = model(images)
                 loss = criterion(outputs, labels)
 
@@ -307,6 +426,7 @@ def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
 
         val_accuracy = 100 * val_correct / val_total
         avg_val_loss = val_loss / len(val_loader)
+        epoch_time = time.perf_counter() - epoch_start
 
         # Atualizar scheduler
         scheduler.step(val_accuracy)
@@ -317,33 +437,37 @@ def train_model_robust(model, train_loader, val_loader, epochs=20, device='cpu',
         history['val_loss'].append(avg_val_loss)
         history['val_acc'].append(val_accuracy)
         history['learning_rates'].append(optimizer.param_groups[0]['lr'])
+        history['data_wait_time'].append(timing['data_wait'])
+        history['compute_time'].append(epoch_time - timing['data_wait'])
 
         logger.info(f"Epoch {epoch+1:2d}: Train Loss={avg_train_loss:.4f}, Train Acc={train_accuracy:.2f}%, "
-                   f"Val Loss={avg_val_loss:.4f}, Val Acc={val_accuracy:.2f}%")
+                   f"Val Loss={avg_val_loss:.4f}, Val Acc={val_accuracy:.2f}% "
+                   f"[dados={timing['data_wait']:.2f}s, computação={epoch_time - timing['data_wait']:.2f}s]")
 
         # Early stopping
-        if val_accuracy > best_accuracy:
+        if best_state is None or val_accuracy > best_accuracy:
             best_accuracy = val_accuracy
             best_epoch = epoch
             patience_counter = 0
 
-            # Salvar melhor modelo
-            torch.save({
-                'epoch': epoch,
-                'model_state_dict': model.state_dict(),
-                'optimizer_state_dict': optimizer.state_dict(),
-                'accuracy': val_accuracy,
-                'loss': avg_val_loss
-            }, f'{model_name}_best.pth')
+            # Guardar melhor modelo em memória (e em disco, sem bloquear)
+            best_state = clone_state_dict(model.state_dict())
+            if checkpoint_writer is not None:
+                checkpoint_writer.submit(f'{model_name}_best.pth', {
+                    'epoch': epoch,
+                    'model_state_dict': best_state,
+                    'optimizer_state_dict': optimizer_state_snapshot(optimizer),
+                    'accuracy': val_accuracy,
+                    'loss': avg_val_loss
+                })
         else:
             patience_counter += 1
             if patience_counter >= patience:
                 logger.info(f"Early stopping at epoch {epoch+1}")
                 break
 
-    # Carregar melhor modelo
-    checkpoint = torch.load(f'{model_name}_best.pth')
-    model.load_state_dict(checkpoint['model_state_dict'])
+    # Restaurar melhor modelo
+    model.load_state_dict(best_state)
 
     return best_accuracy, history, best_epoch
 
@@ -353,58 +477,18 @@ def test_detection_robust(vacina, test_images, test_labels, vaccinated_indices,
 
     logger.info("Iniciando teste robusto de detecção...")
 
-    detections = []
-    confidences = []
-    true_labels = []
-
-    for i, (image, label) in enumerate(tqdm(zip(test_images, test_labels),
-                                          desc="Testando detecção")):
-        is_vaccinated = i in vaccinated_indices
-        true_labels.append(is_vaccinated)
-
-        try:
-            # Detecção simplificada baseada na borda colorida (data poisoning)
-            # Verificar se há borda magenta característica da vacina
-            border_color = np.array([255, 0, 255])  # BGR format
-            h, w = image.shape[:2]
-
-            # Verificar bordas
-            top_border = image[:3, :, :]  # Top 3 pixels
-            bottom_border = image[-3:, :, :]  # Bottom 3 pixels
-            left_border = image[:, :3, :]  # Left 3 pixels
-            right_border = image[:, -3:, :]  # Right 3 pixels
-
-            # Calcular similaridade com a cor da borda
-            def border_similarity(border_region, target_color):
-                # Calcular distância euclidiana média dos pixels da borda
-                diff = border_region.astype(float) - target_color.astype(float)
-                distances = np.sqrt(np.sum(diff**2, axis=2))  # Distância por pixel
-                return np.mean(distances < 50)  # Proporção de pixels similares
-
-            top_sim = border_similarity(top_border, border_color)
-            bottom_sim = border_similarity(bottom_border, border_color)
-            left_sim = border_similarity(left_border, border_color)
-            right_sim = border_similarity(right_border, border_color)
-
-            # Média das similaridades das bordas
-            border_confidence = (top_sim + bottom_sim + left_sim + right_sim) / 4.0
-
-            # Threshold para detecção
-            detected = border_confidence > 0.3  # 30% dos pixels da borda similares
-            confidence = float(border_confidence)
-
-            detections.append(detected)
-            confidences.append(confidence)
-
-        except Exception as e:
-            logger.warning(f"Erro na detecção da imagem {i}: {e}")
-            detections.append(False)
-            confidences.append(0.0)
+    # Detecção baseada na borda colorida (data poisoning), com a espessura e a
+    # cor configuradas na vacina, pontuando o conjunto em blocos: só um bloco
+    # de imagens decodificadas (da VaccinatedImageView) fica em memória por vez
+    detector = BorderTriggerDetector.from_vacina(vacina)
+    confidences = np.empty(len(test_images), dtype=np.float64)
+    for start in range(0, len(test_images), DETECTION_CHUNK_SIZE):
+        confidences[start:start + DETECTION_CHUNK_SIZE] = \
+            detector.scores(test_images[start:start + DETECTION_CHUNK_SIZE])
+    detections = confidences > detector.detection_threshold
 
-    # Calcular métricas
-    detections = np.array(detections)
-    confidences = np.array(confidences)
-    true_labels = np.array(true_labels)
+    true_labels = np.zeros(len(detections), dtype=bool)
+    true_labels[np.asarray(vaccinated_indices, dtype=np.int64)] = True
 
     # Métricas de classificação
     accuracy = accuracy_score(true_labels, detections)
@@ -763,6 +847,256 @@ def save_experiment_artifacts(all_results, output_dir):
 
     logger.info("Artefatos do experimento salvos com sucesso")
 
+# Configuração da Vacina Digital usada em todas as células do experimento
+VACINA_CONFIG = {
+    'secret_key': "validacao_qualis_a1_2025",
+    'alpha': 0.05,
+    'epsilon': 0.03,
+    'target_label': 999,  # Label especial para detecção
+    'trigger_type': 'border',
+    'border_thickness': 3,
+    'border_color': (255, 0, 255)
+}
+
+_cell_vacina = None
+
+def _get_cell_vacina():
+    """Vacina Digital do processo atual (criada uma vez por worker)"""
+    global _cell_vacina
+    if _cell_vacina is None:
+        _cell_vacina = VacinaDigital(**VACINA_CONFIG)
+    return _cell_vacina
+
+def build_experiment_grid(repetitions, vaccination_rates):
+    """Lista as células independentes do experimento (baseline + taxa x repetição)"""
+    cells = [{'kind': 'baseline', 'vaccination_rate': 0.0, 'repetition': rep}
+             for rep in range(repetitions)]
+    cells += [{'kind': 'vaccinated', 'vaccination_rate': rate, 'repetition': rep}
+              for rate in vaccination_rates for rep in range(repetitions)]
+    return cells
+
+def cell_id(cell):
+    """Identificador estável da célula (nome do arquivo de resultado)"""
+    if cell['kind'] == 'baseline':
+        return f"baseline_rep_{cell['repetition']}"
+    return f"vaccinated_rate_{cell['vaccination_rate']}_rep_{cell['repetition']}"
+
+def cell_seed(cell, base_seed=42):
+    """Seed determinística derivada da identidade da célula (não da ordem de execução)"""
+    spawn_key = (
+        0 if cell['kind'] == 'baseline' else 1,
+        int(round(cell['vaccination_rate'] * 10000)),
+        cell['repetition']
+    )
+    return int(np.random.SeedSequence(base_seed, spawn_key=spawn_key).generate_state(1)[0])
+
+def to_json_compatible(obj):
+    """Converte recursivamente tipos numpy em tipos nativos serializáveis em JSON"""
+    if isinstance(obj, dict):
+        return {str(k): to_json_compatible(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_json_compatible(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return to_json_compatible(obj.tolist())
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    return obj
+
+# Variáveis lidas pelas bibliotecas numéricas apenas na importação
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+def _init_cell_worker(threads_per_cell):
+    """Limita as threads de cada processo do grid para não disputar núcleos"""
+    # As variáveis de THREAD_ENV_VARS vêm do pai (o torch já foi importado aqui)
+    torch.set_num_threads(threads_per_cell)
+    cv2.setNumThreads(threads_per_cell)
+
+def run_grid_cell(cell, context):
+    """Executa uma célula do experimento (treino baseline ou vacinado + detecção)"""
+
+    seed = cell_seed(cell, context['base_seed'])
+    torch.manual_seed(seed)
+    np.random.seed(seed % 2**32)
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+
+    # Checkpoints em disco (opcionais) gravados em segundo plano
+    checkpoint_dir = context.get('checkpoint_dir')
+    writer = AsyncCheckpointWriter(checkpoint_dir) if checkpoint_dir else None
+    profiler = SpanProfiler(process_name=cell_id(cell))
+    try:
+        with profiler.span('cell', cell=cell_id(cell)):
+            result = _run_grid_cell(cell, context, seed, rng, writer, profiler)
+    finally:
+        if writer is not None:
+            writer.close()
+    result['profile'] = profiler.to_dict()
+    return result
+
+def _run_grid_cell(cell, context, seed, rng, writer, profiler):
+    """Corpo de run_grid_cell, com seeds já fixadas"""
+    image_paths = context['image_paths']
+    labels = context['labels']
+    image_cache = context['image_cache']
+    device_str = context['device']
+    loader_kwargs = context['loader_kwargs']
+    normalizer = BatchNormalizer(device_str)
+    rep = cell['repetition']
+
+    # Amostrar dados
+    indices = rng.choice(len(image_paths), context['sample_size'], replace=False)
+    rep_image_paths = [image_paths[i] for i in indices]
+    rep_labels = [labels[i] for i in indices]
+
+    if cell['kind'] == 'baseline':
+        logger.info(f"Repetição Baseline {rep+1} (seed={seed})")
+
+        # Criar dataset
+        dataset = ISICDataset(rep_image_paths, rep_labels, image_cache=image_cache)
+        train_size = int(0.8 * len(dataset))
+        train_dataset, val_dataset = torch.utils.data.random_split(
+            dataset, [train_size, len(dataset) - train_size]
+        )
+
+        train_loader = build_data_loader(train_dataset, shuffle=True, **loader_kwargs)
+        val_loader = build_data_loader(val_dataset, shuffle=False, **loader_kwargs)
+
+        # Treinar modelo
+        model = RobustCNN(num_classes=context['num_classes'])
+        with profiler.span('train', epochs=context['epochs']):
+            accuracy, history, best_epoch = train_model_robust(
+                model, train_loader, val_loader, context['epochs'], device_str,
+                model_name=cell_id(cell), normalizer=normalizer, checkpoint_writer=writer
+            )
+
+        return {
+            'repetition': rep,
+            'seed': seed,
+            'accuracy': accuracy,
+            'history': history,
+            'best_epoch': best_epoch
+        }
+
+    vaccination_rate = cell['vaccination_rate']
+    logger.info(f"Repetição Vacinada {rep+1} (taxa={vaccination_rate*100:.0f}%, seed={seed})")
+    vacina = _get_cell_vacina()
+
+    # Aplicar vacina
+    with profiler.span('vaccinate', rate=vaccination_rate):
+        protected_images, protected_labels, original_labels, vaccinated_indices, watermark_metadata = \
+            apply_vaccine_to_dataset_batch(vacina, rep_image_paths, rep_labels, vaccination_rate,
+                                           image_cache=image_cache)
+
+    # Criar dataset vacinado
+    protected_dataset = ISICDataset(protected_images, protected_labels)
+    train_size = int(0.8 * len(protected_dataset))
+    train_dataset, val_dataset = torch.utils.data.random_split(
+        protected_dataset, [train_size, len(protected_dataset) - train_size]
+    )
+
+    train_loader = build_data_loader(train_dataset, shuffle=True, **loader_kwargs)
+    val_loader = build_data_loader(val_dataset, shuffle=False, **loader_kwargs)
+
+    # Treinar modelo vacinado
+    model = RobustCNN(num_classes=len(set(protected_labels)))
+    with profiler.span('train', epochs=context['epochs']):
+        vaccinated_accuracy, history, best_epoch = train_model_robust(
+            model, train_loader, val_loader, context['epochs'], device_str,
+            model_name=cell_id(cell), normalizer=normalizer, checkpoint_writer=writer
+        )
+
+    # Testar detecção
+    with profiler.span('detect'):
+        detection_results = test_detection_robust(
+            vacina, protected_images, protected_labels, vaccinated_indices,
+            device_str, f"detection_rate_{vaccination_rate}_rep_{rep}",
+            watermark_metadata
+        )
+
+    return {
+        'vaccination_rate': vaccination_rate,
+        'repetition': rep,
+        'seed': seed,
+        'vaccinated_accuracy': vaccinated_accuracy,
+        'detection_results': detection_results,
+        'history': history,
+        'best_epoch': best_epoch,
+        'vaccinated_indices': vaccinated_indices.tolist()
+    }
+
+def run_experiment_grid(cells, context, output_dir, fingerprint, grid_workers=1, threads_per_cell=1):
+    """Executa as células em processos paralelos, persistindo cada uma ao concluir
+
+    Resultados ficam em <output_dir>/cells/<cell_id>.json; células já
+    concluídas com a mesma configuração (`fingerprint`) são reaproveitadas,
+    de modo que uma execução interrompida pode ser retomada.
+
+    Returns:
+        Dicionário cell_id -> resultado (apenas células concluídas)
+    """
+    cells_dir = os.path.join(output_dir, 'cells')
+    os.makedirs(cells_dir, exist_ok=True)
+
+    results = {}
+    pending = []
+    for cell in cells:
+        path = os.path.join(cells_dir, f"{cell_id(cell)}.json")
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                stored = json.load(f)
+            if stored.get('fingerprint') == fingerprint:
+                results[cell_id(cell)] = stored['result']
+                continue
+        pending.append(cell)
+
+    logger.info(f"Grid: {len(cells)} células, {len(results)} reaproveitadas, "
+                f"{len(pending)} a executar com {grid_workers} processo(s)")
+
+    def _persist(cell, result):
+        path = os.path.join(cells_dir, f"{cell_id(cell)}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'fingerprint': fingerprint, 'cell': cell,
+                       'result': to_json_compatible(result)}, f, indent=2)
+        os.replace(tmp_path, path)
+        results[cell_id(cell)] = to_json_compatible(result)
+
+    if grid_workers <= 1:
+        for cell in pending:
+            _persist(cell, run_grid_cell(cell, context))
+        return results
+
+    # Os processos 'spawn' herdam o ambiente do pai no momento em que são
+    # criados, antes de importar torch/numpy: só assim as variáveis valem
+    previous_env = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    os.environ.update({var: str(threads_per_cell) for var in THREAD_ENV_VARS})
+    mp_context = multiprocessing.get_context('spawn')
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=grid_workers, mp_context=mp_context,
+            initializer=_init_cell_worker, initargs=(threads_per_cell,)
+        ) as executor:
+            futures = {executor.submit(run_grid_cell, cell, context): cell for cell in pending}
+            for future in concurrent.futures.as_completed(futures):
+                cell = futures[future]
+                try:
+                    _persist(cell, future.result())
+                    logger.info(f"Célula concluída: {cell_id(cell)} ({len(results)}/{len(cells)})")
+                except Exception as e:
+                    logger.error(f"Falha na célula {cell_id(cell)}: {e}")
+    finally:
+        for var, value in previous_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description='Validação Robusta Qualis A1 - Vacina Digital')
     parser.add_argument('--data_dir', default='temp_data_extract',
@@ -778,9 +1112,32 @@ def main():
     parser.add_argument('--vaccination_rates', nargs='+', type=float,
                        default=[0.1, 0.2, 0.3, 0.4, 0.5],
                        help='Taxas de vacinação para testar')
+    parser.add_argument('--batch_size', type=int, default=32,
+                       help='Tamanho do lote de treinamento')
+    parser.add_argument('--num_workers', type=int, default=default_num_workers(),
+                       help='Processos do DataLoader (0 = thread principal)')
+    parser.add_argument('--prefetch_factor', type=int, default=2,
+                       help='Lotes antecipados por worker do DataLoader')
+    parser.add_argument('--persistent_workers', action='store_true',
+                       help='Manter workers do DataLoader vivos entre épocas')
+    parser.add_argument('--grid_workers', type=int, default=1,
+                       help='Processos paralelos do grid (células taxa x repetição)')
+    parser.add_argument('--threads_per_cell', type=int, default=None,
+                       help='Threads por célula do grid (padrão: núcleos / grid_workers)')
+    parser.add_argument('--checkpoint_dir', default=None,
+                       help='Diretório para gravar o melhor checkpoint de cada modelo '
+                            '(assíncrono; padrão: apenas em memória)')
+    parser.add_argument('--trace_file', default=None,
+                       help='Exportar spans de tempo no formato Chrome Trace (JSON)')
+    parser.add_argument('--cache_dir', default=None,
+                       help='Diretório do cache de imagens decodificadas '
+                            '(padrão: <output_dir>/cache_imagens)')
 
     args = parser.parse_args()
 
+    profiler = SpanProfiler(process_name='main')
+    experiment_start = time.perf_counter()
+
     # Criar diretório de saída
     os.makedirs(args.output_dir, exist_ok=True)
 
@@ -791,15 +1148,14 @@ def main():
         'epochs': args.epochs,
         'repetitions': args.repetitions,
         'vaccination_rates': args.vaccination_rates,
+        'image_size': [224, 224],
+        'batch_size': args.batch_size,
+        'num_workers': args.num_workers,
+        'grid_workers': args.grid_workers,
         'timestamp': datetime.now().isoformat(),
         'random_seed': 42
     }
 
-    # Fixar seeds para reprodutibilidade
-    torch.manual_seed(42)
-    np.random.seed(42)
-    random.seed(42)
-
     # Verificar dispositivo
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     device_str = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -807,124 +1163,79 @@ def main():
 
     # Carregar dataset
     logger.info("Carregando dataset ISIC...")
-    image_paths, labels = load_isic_dataset(args.data_dir, max_samples=args.sample_size * 2)
+    with profiler.span('load'):
+        image_paths, labels = load_isic_dataset(args.data_dir, max_samples=args.sample_size * 2)
 
     if len(image_paths) < args.sample_size:
         logger.error(f"Dataset insuficiente: {len(image_paths)} < {args.sample_size}")
         return
 
-    # Preparar transformações
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
-    # Inicializar Vacina Digital
-    vacina = VacinaDigital(
-        secret_key="validacao_qualis_a1_2025",
-        alpha=0.05,
-        epsilon=0.03,
-        target_label=999,  # Label especial para detecção
-        border_thickness=3,
-        border_color=(255, 0, 255)
-    )
-
-    # Resultados do experimento
-    baseline_results = []
-    vaccinated_results = []
-
-    # Experimentos baseline
-    logger.info("=== INICIANDO EXPERIMENTOS BASELINE ===")
-    for rep in range(args.repetitions):
-        logger.info(f"Repetição Baseline {rep+1}/{args.repetitions}")
-
-        # Amostrar dados
-        indices = np.random.choice(len(image_paths), args.sample_size, replace=False)
-        rep_image_paths = [image_paths[i] for i in indices]
-        rep_labels = [labels[i] for i in indices]
-
-        # Criar dataset
-        dataset = ISICDataset(rep_image_paths, rep_labels, transform)
-        train_size = int(0.8 * len(dataset))
-        train_dataset, val_dataset = torch.utils.data.random_split(
-            dataset, [train_size, len(dataset) - train_size]
-        )
-
-        train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-        val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False)
-
-        # Treinar modelo
-        num_classes = len(set(labels))
-        model = RobustCNN(num_classes=num_classes)
-        accuracy, history, best_epoch = train_model_robust(
-            model, train_loader, val_loader, args.epochs, device_str,
-            model_name=f"baseline_rep_{rep}"
+    # Decodificar e redimensionar uma única vez; todas as repetições, taxas
+    # de vacinação e DataLoaders leem do memmap
+    with profiler.span('decode_cache', images=len(image_paths)):
+        image_cache = DecodedImageCache(
+            args.cache_dir or os.path.join(args.output_dir, 'cache_imagens'), size=(224, 224)
+        ).build(image_paths)
+
+    threads_per_cell = args.threads_per_cell or max(1, (os.cpu_count() or 1) // max(1, args.grid_workers))
+    # Com várias células em paralelo, os workers do DataLoader de cada uma
+    # também entram no limite de threads da célula
+    cell_num_workers = args.num_workers if args.grid_workers <= 1 else min(args.num_workers, threads_per_cell)
+
+    # Cada célula recebe uma seed determinística derivada de (tipo, taxa, repetição)
+    context = {
+        'image_paths': image_paths,
+        'labels': labels,
+        'image_cache': image_cache,
+        'num_classes': len(set(labels)),
+        'sample_size': args.sample_size,
+        'epochs': args.epochs,
+        'device': device_str,
+        'base_seed': experiment_config['random_seed'],
+        'checkpoint_dir': args.checkpoint_dir,
+        # Conversão uint8 -> float e normalização ImageNet feitas por lote no device
+        'loader_kwargs': {
+            'batch_size': args.batch_size,
+            'num_workers': cell_num_workers,
+            'prefetch_factor': args.prefetch_factor,
+            'persistent_workers': args.persistent_workers,
+        },
+    }
+    # Parâmetros que alteram o resultado de uma célula (para retomada segura)
+    fingerprint = {k: experiment_config[k] for k in
+                   ('data_dir', 'sample_size', 'epochs', 'image_size', 'batch_size', 'random_seed',
+                    'vaccination_rates')}
+    # Comparada com o JSON gravado: tuplas viram listas
+    fingerprint = to_json_compatible(dict(fingerprint, vacina_config=VACINA_CONFIG))
+
+    cells = build_experiment_grid(args.repetitions, args.vaccination_rates)
+    logger.info("=== EXECUTANDO GRID DE EXPERIMENTOS (BASELINE + VACINADOS) ===")
+    with profiler.span('grid', cells=len(cells), grid_workers=args.grid_workers):
+        cell_results = run_experiment_grid(
+            cells, context, args.output_dir, fingerprint,
+            grid_workers=args.grid_workers, threads_per_cell=threads_per_cell
         )
 
-        baseline_results.append({
-            'repetition': rep,
-            'accuracy': accuracy,
-            'history': history,
-            'best_epoch': best_epoch
-        })
-
-    # Experimentos vacinados
-    logger.info("=== INICIANDO EXPERIMENTOS VACINADOS ===")
-    for vaccination_rate in args.vaccination_rates:
-        logger.info(f"Taxa de vacinação: {vaccination_rate*100:.0f}%")
-
-        for rep in range(args.repetitions):
-            logger.info(f"Repetição Vacinada {rep+1}/{args.repetitions} (taxa={vaccination_rate*100:.0f}%)")
-
-            # Amostrar dados
-            indices = np.random.choice(len(image_paths), args.sample_size, replace=False)
-            rep_image_paths = [image_paths[i] for i in indices]
-            rep_labels = [labels[i] for i in indices]
-
-            # Aplicar vacina
-            protected_images, protected_labels, original_labels, vaccinated_indices, watermark_metadata = \
-                apply_vaccine_to_dataset_batch(vacina, rep_image_paths, rep_labels, vaccination_rate)
-
-            # Criar dataset vacinado
-            protected_dataset = ISICDataset(protected_images, protected_labels, transform)
-            train_size = int(0.8 * len(protected_dataset))
-            train_dataset, val_dataset = torch.utils.data.random_split(
-                protected_dataset, [train_size, len(protected_dataset) - train_size]
-            )
-
-            train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True)
-            val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False)
-
-            # Treinar modelo vacinado
-            model = RobustCNN(num_classes=len(set(protected_labels)))
-            vaccinated_accuracy, history, best_epoch = train_model_robust(
-                model, train_loader, val_loader, args.epochs, device_str,
-                model_name=f"vaccinated_rate_{vaccination_rate}_rep_{rep}"
-            )
-
-            # Testar detecção
-            detection_results = test_detection_robust(
-                vacina, protected_images, protected_labels, vaccinated_indices,
-                device_str, f"detection_rate_{vaccination_rate}_rep_{rep}",
-                watermark_metadata
-            )
+    missing = [cell_id(c) for c in cells if cell_id(c) not in cell_results]
+    if missing:
+        logger.error(f"{len(missing)} célula(s) sem resultado: {missing}. "
+                     f"Execute novamente para retomar o grid.")
+        return
 
-            vaccinated_results.append({
-                'vaccination_rate': vaccination_rate,
-                'repetition': rep,
-                'vaccinated_accuracy': vaccinated_accuracy,
-                'detection_results': detection_results,
-                'history': history,
-                'best_epoch': best_epoch,
-                'vaccinated_indices': vaccinated_indices.tolist()
-            })
+    # Consolidar células na ordem do experimento (perfis das células vão para o profiler)
+    for result in cell_results.values():
+        profile = result.pop('profile', None)
+        if profile:
+            profiler.merge(profile)
+    baseline_results = [cell_results[cell_id(c)] for c in cells if c['kind'] == 'baseline']
+    vaccinated_results = [cell_results[cell_id(c)] for c in cells if c['kind'] == 'vaccinated']
 
     # Análise estatística
     logger.info("=== REALIZANDO ANÁLISE ESTATÍSTICA ===")
-    statistical_analysis_results = statistical_analysis(
-        baseline_results, vaccinated_results, args.vaccination_rates
-    )
+    with profiler.span('analyze'):
+        statistical_analysis_results = statistical_analysis(
+            baseline_results, vaccinated_results, args.vaccination_rates
+        )
 
     # Compilar todos os resultados
     all_results = {
@@ -935,15 +1246,21 @@ def main():
         'metadata': {
             'total_images_dataset': len(image_paths),
             'num_classes': len(set(labels)),
-            'experiment_duration': time.time() - time.time(),  # TODO: implementar timer
+            'experiment_duration': time.perf_counter() - experiment_start,
             'hostname': platform.node()
-        }
+        },
+        'profile': profiler.to_dict()
     }
 
     # Salvar artefatos
     logger.info("=== SALVANDO ARTEFATOS DO EXPERIMENTO ===")
-    save_experiment_artifacts(all_results, args.output_dir)
-    generate_qualis_a1_report(all_results, args.output_dir)
+    with profiler.span('report'):
+        save_experiment_artifacts(all_results, args.output_dir)
+        generate_qualis_a1_report(all_results, args.output_dir)
+
+    if args.trace_file:
+        profiler.export_chrome_trace(args.trace_file)
+        logger.info(f"Trace de tempo salvo em: {args.trace_file}")
 
     # Resumo final
     logger.info("=== EXPERIMENTO CONCLUÍDO ===")
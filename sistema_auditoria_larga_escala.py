@@ -28,7 +28,8 @@ import numpy as np
 import logging
 
 # Importar Vacina Digital
-from src.core.vacina_digital import VacinaDigital
+from src.core.vacina_digital import VacinaDigital, metadata_to_dicts
+from utils.synthetic_data import SyntheticImageGenerator
 
 class AuditoriaLargaEscala:
     """
@@ -45,6 +46,10 @@ class AuditoriaLargaEscala:
         """
         self.config = self._carregar_config(config_path)
         self.vacina = VacinaDigital(**self.config['vacina_params'])
+        self.gerador_sondas = SyntheticImageGenerator(
+            size=(224, 224), kind='noise',
+            seed=self.config['auditoria_params'].get('semente_sondas', 0)
+        )
         self.fila_auditorias = queue.Queue()
         self.resultados_auditorias = {}
         self.logger = self._configurar_logging()
@@ -76,7 +81,8 @@ class AuditoriaLargaEscala:
                 'num_queries_teste': 10,
                 'timeout_auditoria': 300,  # 5 minutos
                 'max_auditorias_simultaneas': 5,
-                'intervalo_monitoramento': 3600  # 1 hora
+                'intervalo_monitoramento': 3600,  # 1 hora
+                'semente_sondas': 0  # Imagens de sonda reprodutíveis entre auditorias
             },
             'integracoes': {
                 'huggingface_enabled': True,
@@ -124,25 +130,32 @@ class AuditoriaLargaEscala:
 
         return logger
 
-    def registrar_modelo_suspeito(self, nome_modelo: str, predict_fn: Callable,
-                                metadados: Optional[Dict] = None) -> str:
+    def registrar_modelo_suspeito(self, nome_modelo: str, predict_fn: Optional[Callable],
+                                metadados: Optional[Dict] = None,
+                                predict_batch_fn: Optional[Callable] = None) -> str:
         """
         Registra um modelo para auditoria.
 
         Args:
             nome_modelo: Nome identificador do modelo
-            predict_fn: Função de predição do modelo
+            predict_fn: Função de predição do modelo (imagem -> classe)
             metadados: Informações adicionais sobre o modelo
+            predict_batch_fn: Função opcional de predição em lote (lista de
+                imagens -> classes); quando informada, substitui predict_fn
 
         Returns:
             id_auditoria: ID único da auditoria registrada
         """
+        if predict_fn is None and predict_batch_fn is None:
+            raise ValueError("Informe predict_fn ou predict_batch_fn")
+
         id_auditoria = f"audit_{int(time.time())}_{nome_modelo.replace(' ', '_')}"
 
         tarefa_auditoria = {
             'id': id_auditoria,
             'nome_modelo': nome_modelo,
             'predict_fn': predict_fn,
+            'predict_batch_fn': predict_batch_fn,
             'metadados': metadados or {},
             'timestamp_registro': datetime.now().isoformat(),
             'status': 'pendente'
@@ -167,32 +180,37 @@ class AuditoriaLargaEscala:
         id_auditoria = tarefa_auditoria['id']
         nome_modelo = tarefa_auditoria['nome_modelo']
         predict_fn = tarefa_auditoria['predict_fn']
+        predict_batch_fn = tarefa_auditoria.get('predict_batch_fn')
 
         self.logger.info(f"Iniciando auditoria: {nome_modelo}")
 
         try:
-            # Gerar imagens de teste com proteção
-            imagens_teste = []
-            metadados_teste = []
+            # Imagens sintéticas de sonda (mesmo lote em todas as auditorias)
+            imagens_sonda, labels_sonda = self.gerador_sondas.generate(
+                self.config['auditoria_params']['num_queries_teste']
+            )
 
-            for i in range(self.config['auditoria_params']['num_queries_teste']):
-                # Criar imagem sintética
-                imagem = np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8)
-
-                # Aplicar proteção Vacina Digital
-                imagem_protegida, metadata = self.vacina.protect_image(imagem, original_label=i % 4)
-                imagens_teste.append(imagem_protegida)
-                metadados_teste.append(metadata)
+            # Aplicar proteção Vacina Digital à pilha de sondas de uma vez
+            imagens_teste, meta = self.vacina.protect_batch(imagens_sonda, labels_sonda)
+            metadados_teste = metadata_to_dicts(meta)
 
             # Executar queries de auditoria
             predicoes = []
-            for img in imagens_teste:
+            if predict_batch_fn is not None:
+                # Todas as queries numa única chamada em lote
                 try:
-                    pred = predict_fn(img)
-                    predicoes.append(pred)
+                    predicoes = [int(p) for p in predict_batch_fn(imagens_teste)]
                 except Exception as e:
-                    self.logger.error(f"Erro na predição: {e}")
-                    predicoes.append(None)
+                    self.logger.error(f"Erro na predição em lote: {e}")
+                    predicoes = [None] * len(imagens_teste)
+            else:
+                for img in imagens_teste:
+                    try:
+                        pred = predict_fn(img)
+                        predicoes.append(pred)
+                    except Exception as e:
+                        self.logger.error(f"Erro na predição: {e}")
+                        predicoes.append(None)
 
             # Analisar resultados
             target_label = self.vacina.target_label
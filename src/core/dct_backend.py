@@ -0,0 +1,264 @@
+"""
+Backends de DCT 2D ortonormal (tipo II) para o watermarking da Vacina Digital.
+
+Todos os backends transformam os dois últimos eixos de um array (..., H, W),
+de modo que uma pilha de blocos 8x8 é transformada numa única chamada, e
+preservam float32 (entradas inteiras são convertidas para float64):
+
+    - 'scipy':  scipy.fft.dctn/idctn com `workers` (paralelo sobre os blocos,
+                por padrão limitado às threads do processo; ver default_workers)
+    - 'cv2':    cv2.dct com DCT_ROWS (linhas e depois colunas, vetorizado);
+                tamanhos ímpares recaem no scipy.fft
+    - 'matmul': produto pelas matrizes DCT (C @ X @ C.T), em numpy puro;
+                muito eficiente para blocos pequenos
+
+get_dct_backend() escolhe o backend pelo nome, pela variável de ambiente
+VACINA_DCT_BACKEND ou, em 'auto', pelo mais rápido num micro-benchmark com a
+carga típica (blocos 8x8 de uma imagem 224x224), executado uma vez por processo.
+"""
+
+import os
+import sys
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Union
+
+import numpy as np
+import scipy.fft
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    cv2 = None
+    CV2_AVAILABLE = False
+
+DCT_BACKEND_ENV = 'VACINA_DCT_BACKEND'
+
+
+def default_workers() -> int:
+    """
+    Threads do scipy.fft quando `workers` não é informado: o limite do
+    processo, e não todos os núcleos. Segue torch.get_num_threads() se o
+    torch já estiver carregado (respeita torch.set_num_threads dos workers
+    do grid), senão OMP_NUM_THREADS ou os.cpu_count().
+    """
+    torch = sys.modules.get('torch')  # sem importar o torch (dependência opcional)
+    if torch is not None:
+        return max(1, torch.get_num_threads())
+    env = os.environ.get('OMP_NUM_THREADS', '')
+    if env.isdigit() and int(env) > 0:
+        return int(env)
+    return os.cpu_count() or 1
+
+
+def _as_float(x: np.ndarray) -> np.ndarray:
+    """Mantém float32/float64; demais tipos viram float64."""
+    x = np.asarray(x)
+    if x.dtype not in (np.float32, np.float64):
+        x = x.astype(np.float64)
+    return x
+
+
+class DCTBackend(ABC):
+    """Interface: DCT/IDCT 2D ortonormal sobre os dois últimos eixos."""
+
+    name = 'base'
+
+    @abstractmethod
+    def dct2(self, x: np.ndarray) -> np.ndarray:
+        """DCT 2D ortonormal (tipo II) sobre os dois últimos eixos."""
+
+    @abstractmethod
+    def idct2(self, x: np.ndarray) -> np.ndarray:
+        """Inversa de dct2."""
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name='{self.name}')"
+
+
+class ScipyFFTBackend(DCTBackend):
+    """scipy.fft (pocketfft), com paralelismo opcional sobre o lote."""
+
+    name = 'scipy'
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Threads do scipy.fft (-1 = todos os núcleos; None =
+                default_workers(), avaliado a cada chamada)
+        """
+        self.workers = workers
+
+    def _workers(self) -> int:
+        return default_workers() if self.workers is None else self.workers
+
+    def dct2(self, x: np.ndarray) -> np.ndarray:
+        return scipy.fft.dctn(_as_float(x), type=2, norm='ortho', axes=(-2, -1), workers=self._workers())
+
+    def idct2(self, x: np.ndarray) -> np.ndarray:
+        return scipy.fft.idctn(_as_float(x), type=2, norm='ortho', axes=(-2, -1), workers=self._workers())
+
+
+class CV2DCTBackend(DCTBackend):
+    """cv2.dct aplicado por linhas (DCT_ROWS) nos dois eixos."""
+
+    name = 'cv2'
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Args:
+            workers: Threads do scipy.fft usado nos tamanhos ímpares (ver ScipyFFTBackend)
+        """
+        if not CV2_AVAILABLE:
+            raise ImportError("OpenCV não disponível para o backend 'cv2'")
+        self._fallback = ScipyFFTBackend(workers)
+
+    @staticmethod
+    def _rows(x: np.ndarray, flags: int) -> np.ndarray:
+        """Transformada 1D ao longo do último eixo, para qualquer formato."""
+        flat = np.ascontiguousarray(x.reshape(-1, x.shape[-1]))
+        return cv2.dct(flat, flags=flags | cv2.DCT_ROWS).reshape(x.shape)
+
+    def _transform(self, x: np.ndarray, flags: int) -> np.ndarray:
+        rows = self._rows(x, flags)
+        return np.swapaxes(self._rows(np.swapaxes(rows, -1, -2), flags), -1, -2)
+
+    def _supported(self, x: np.ndarray) -> bool:
+        # cv2.dct só implementa comprimentos pares
+        return x.ndim >= 2 and x.shape[-1] % 2 == 0 and x.shape[-2] % 2 == 0 and x.size > 0
+
+    def dct2(self, x: np.ndarray) -> np.ndarray:
+        x = _as_float(x)
+        if not self._supported(x):
+            return self._fallback.dct2(x)
+        return self._transform(x, 0)
+
+    def idct2(self, x: np.ndarray) -> np.ndarray:
+        x = _as_float(x)
+        if not self._supported(x):
+            return self._fallback.idct2(x)
+        return self._transform(x, cv2.DCT_INVERSE)
+
+
+class MatmulDCTBackend(DCTBackend):
+    """DCT por multiplicação de matrizes (numpy puro), matrizes em cache por tamanho."""
+
+    name = 'matmul'
+
+    def __init__(self):
+        # Atribuição em dict é atômica; duas threads no máximo recalculam a mesma matriz
+        self._matrices: Dict[tuple, np.ndarray] = {}
+
+    def _matrix(self, n: int, dtype) -> np.ndarray:
+        key = (n, np.dtype(dtype).str)
+        matrix = self._matrices.get(key)
+        if matrix is None:
+            k = np.arange(n)[:, None]
+            i = np.arange(n)[None, :]
+            matrix = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+            matrix[0] /= np.sqrt(2.0)
+            matrix = matrix.astype(dtype)
+            self._matrices[key] = matrix
+        return matrix
+
+    def dct2(self, x: np.ndarray) -> np.ndarray:
+        x = _as_float(x)
+        rows = self._matrix(x.shape[-2], x.dtype)
+        cols = self._matrix(x.shape[-1], x.dtype)
+        return rows @ x @ cols.T
+
+    def idct2(self, x: np.ndarray) -> np.ndarray:
+        x = _as_float(x)
+        rows = self._matrix(x.shape[-2], x.dtype)
+        cols = self._matrix(x.shape[-1], x.dtype)
+        return rows.T @ x @ cols
+
+
+_BACKEND_FACTORIES = {
+    'scipy': ScipyFFTBackend,
+    'cv2': CV2DCTBackend,
+    'matmul': MatmulDCTBackend,
+}
+
+_auto_backend: Optional[DCTBackend] = None
+_auto_lock = threading.Lock()
+
+
+def available_backends() -> Dict[str, DCTBackend]:
+    """Instâncias de todos os backends disponíveis neste ambiente."""
+    backends = {}
+    for name, factory in _BACKEND_FACTORIES.items():
+        try:
+            backends[name] = factory()
+        except ImportError:
+            continue
+    return backends
+
+
+def benchmark_backends(
+    backends: Optional[Dict[str, DCTBackend]] = None,
+    block_shape: tuple = (3 * 55 * 55, 8, 8),
+    repeats: int = 3
+) -> Dict[str, float]:
+    """
+    Micro-benchmark: melhor tempo (s) de dct2 + idct2 sobre uma pilha de blocos.
+
+    O formato padrão corresponde aos blocos 8x8 com passo 4 dos três canais
+    de uma imagem 224x224.
+    """
+    blocks = np.random.default_rng(0).random(block_shape, dtype=np.float32)
+    timings = {}
+    if backends is None:
+        backends = available_backends()
+    for name, backend in backends.items():
+        backend.idct2(backend.dct2(blocks))  # aquecimento (caches, planos)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            backend.idct2(backend.dct2(blocks))
+            best = min(best, time.perf_counter() - start)
+        timings[name] = best
+    return timings
+
+
+# Backends cujo construtor aceita `workers` (threads do scipy.fft)
+_THREADED_BACKENDS = ('scipy', 'cv2')
+
+
+def get_dct_backend(
+    backend: Union[str, DCTBackend, None] = None,
+    workers: Optional[int] = None
+) -> DCTBackend:
+    """
+    Resolve o backend de DCT.
+
+    Args:
+        backend: Instância, nome ('scipy', 'cv2', 'matmul', 'auto') ou None
+            (usa VACINA_DCT_BACKEND, ou 'auto' se não definida)
+        workers: Threads do scipy.fft nos backends 'scipy' e 'cv2'
+            (None = default_workers(); ignorado pelo 'matmul' e por instâncias)
+    """
+    global _auto_backend
+
+    if isinstance(backend, DCTBackend):
+        return backend
+    name = (backend or os.environ.get(DCT_BACKEND_ENV) or 'auto').lower()
+
+    if name == 'auto':
+        with _auto_lock:
+            if _auto_backend is None:
+                backends = available_backends()
+                timings = benchmark_backends(backends)
+                _auto_backend = backends[min(timings, key=timings.get)]
+        if workers is None or _auto_backend.name not in _THREADED_BACKENDS:
+            return _auto_backend
+        name = _auto_backend.name
+
+    if name not in _BACKEND_FACTORIES:
+        raise ValueError(f"Backend de DCT '{name}' inválido. Use um de: "
+                         f"{list(_BACKEND_FACTORIES) + ['auto']}")
+    if name in _THREADED_BACKENDS:
+        return _BACKEND_FACTORIES[name](workers=workers)
+    return _BACKEND_FACTORIES[name]()
@@ -0,0 +1,247 @@
+"""
+Ressincronização geométrica para a detecção de watermark da Vacina Digital.
+
+O detector DCT assume alinhamento pixel a pixel com o padrão de watermark,
+portanto rotação, recorte e mudança de escala derrubam a correlação para o
+nível de ruído. Este módulo estima a transformação de similaridade
+(rotação, escala e translação) entre a imagem atacada e uma imagem de
+referência (template de sincronização, ex.: a cópia protegida mantida pelo
+proprietário) e desfaz a transformação antes da correlação.
+
+Estratégia coarse-to-fine:
+1. Estimativa grosseira de rotação/escala por correlação de fase log-polar
+   do espectro de magnitude (FFT), em resolução reduzida.
+2. Resolução da ambiguidade de 180° e estimativa de translação por
+   correlação de fase.
+3. Refinamento local por busca em padrão com orçamento fixo de avaliações,
+   pontuado por correlação normalizada de imagens passa-alta.
+"""
+
+import numpy as np
+import cv2
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass
+class SyncTransform:
+    """Transformação estimada (referência -> imagem atacada), em torno do centro."""
+    angle: float = 0.0
+    scale: float = 1.0
+    shift: Tuple[float, float] = (0.0, 0.0)
+    score: float = 0.0
+    evaluations: int = 0
+
+    def is_identity(self) -> bool:
+        return self.angle == 0.0 and self.scale == 1.0 and self.shift == (0.0, 0.0)
+
+
+class GeometricSynchronizer:
+    """
+    Estima e desfaz ataques geométricos (rotação, recorte, escala) por
+    registro contra uma imagem de referência.
+    """
+
+    def __init__(
+        self,
+        coarse_size: int = 128,
+        fine_size: Optional[int] = 512,
+        max_evaluations: int = 48,
+        highpass_sigma: float = 2.0
+    ):
+        """
+        Args:
+            coarse_size: Lado (px) usado na estimativa log-polar grosseira.
+            fine_size: Lado máximo (px) usado no refinamento (None = resolução total).
+            max_evaluations: Orçamento de avaliações da busca de refinamento.
+            highpass_sigma: Sigma do filtro passa-alta usado na pontuação.
+        """
+        self.coarse_size = coarse_size
+        self.fine_size = fine_size
+        self.max_evaluations = max_evaluations
+        self.highpass_sigma = highpass_sigma
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _gray(image: np.ndarray) -> np.ndarray:
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return image.astype(np.float32)
+
+    @staticmethod
+    def _resize(gray: np.ndarray, factor: float) -> np.ndarray:
+        if factor == 1.0:
+            return gray
+        h, w = gray.shape
+        return cv2.resize(gray, (max(int(round(w * factor)), 1), max(int(round(h * factor)), 1)),
+                          interpolation=cv2.INTER_AREA)
+
+    def _highpass(self, gray: np.ndarray) -> np.ndarray:
+        return gray - cv2.GaussianBlur(gray, (0, 0), self.highpass_sigma)
+
+    @staticmethod
+    def _central_square(gray: np.ndarray, size: int) -> np.ndarray:
+        """Recorte quadrado central redimensionado (preserva a razão de aspecto)."""
+        h, w = gray.shape
+        side = min(h, w)
+        top, left = (h - side) // 2, (w - side) // 2
+        square = gray[top:top + side, left:left + side]
+        return cv2.resize(square, (size, size), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _warp_inverse(image: np.ndarray, angle: float, scale: float,
+                      shift: Tuple[float, float]) -> np.ndarray:
+        h, w = image.shape[:2]
+        M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, scale)
+        M[:, 2] += shift
+        return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP)
+
+    @staticmethod
+    def _masked_ncc(ref: np.ndarray, warped: np.ndarray) -> float:
+        """Correlação normalizada restrita à área válida (não preenchida) do warp."""
+        valid = np.abs(warped) > 1e-6
+        if valid.sum() < 0.25 * valid.size:
+            return -1.0
+        a = ref[valid] - ref[valid].mean()
+        b = warped[valid] - warped[valid].mean()
+        denom = np.sqrt(np.sum(a * a) * np.sum(b * b))
+        return float(np.sum(a * b) / denom) if denom > 1e-12 else -1.0
+
+    @staticmethod
+    def _logpolar_spectrum(gray: np.ndarray) -> Tuple[np.ndarray, float]:
+        h, w = gray.shape
+        window = cv2.createHanningWindow((w, h), cv2.CV_32F)
+        magnitude = np.fft.fftshift(np.abs(np.fft.fft2(gray * window)))
+
+        # Filtro passa-alta para atenuar o pico DC e realçar a estrutura
+        y = np.cos(np.pi * (np.arange(h) / h - 0.5))
+        x = np.cos(np.pi * (np.arange(w) / w - 0.5))
+        emphasis = np.outer(y, x)
+        magnitude *= (1.0 - emphasis) * (2.0 - emphasis)
+
+        max_radius = min(h, w) / 2.0
+        log_polar = cv2.warpPolar(
+            np.log1p(magnitude).astype(np.float32), (w, h), (w / 2.0, h / 2.0),
+            max_radius, cv2.WARP_POLAR_LOG + cv2.INTER_LINEAR
+        )
+        return log_polar, max_radius
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def estimate(self, image: np.ndarray, reference: np.ndarray) -> SyncTransform:
+        """
+        Estima a transformação que leva `reference` até `image`.
+
+        Args:
+            image: Imagem suspeita (possivelmente atacada)
+            reference: Template de sincronização (ex.: imagem protegida original)
+
+        Returns:
+            SyncTransform; identidade se nenhum candidato superar o alinhamento atual.
+        """
+        ref_gray = self._gray(reference)
+        img_gray = self._gray(image)
+        if img_gray.shape != ref_gray.shape:
+            img_gray = cv2.resize(img_gray, (ref_gray.shape[1], ref_gray.shape[0]))
+
+        # --- Estágio grosseiro: rotação/escala por log-polar ---
+        size = self.coarse_size
+        ref_sq = self._central_square(ref_gray, size)
+        img_sq = self._central_square(img_gray, size)
+        lp_ref, max_radius = self._logpolar_spectrum(ref_sq)
+        lp_img, _ = self._logpolar_spectrum(img_sq)
+        (d_logr, d_theta), _ = cv2.phaseCorrelate(lp_ref, lp_img)
+
+        angle0 = (-d_theta * 360.0 / size + 90.0) % 180.0 - 90.0
+        scale0 = 1.0 / np.exp(d_logr * np.log(max_radius) / size)
+
+        # Ambiguidade de 180° do espectro de magnitude + hipótese identidade
+        ref_hp = self._highpass(ref_sq)
+        img_hp = self._highpass(img_sq)
+        candidates = [(0.0, 1.0), (angle0, scale0), (angle0 + 180.0, scale0)]
+        scores = [self._masked_ncc(ref_hp, self._warp_inverse(img_hp, a, s, (0.0, 0.0)))
+                  for a, s in candidates]
+        angle, scale = candidates[int(np.argmax(scores))]
+
+        # Translação por correlação de fase (janela de Hanning)
+        window = cv2.createHanningWindow((size, size), cv2.CV_32F)
+        (dx, dy), _ = cv2.phaseCorrelate(
+            ref_sq, self._warp_inverse(img_sq, angle, scale, (0.0, 0.0)), window
+        )
+        coarse_factor = min(ref_gray.shape) / size
+
+        # --- Estágio fino: busca em padrão com orçamento ---
+        factor = 1.0
+        if self.fine_size is not None and max(ref_gray.shape) > self.fine_size:
+            factor = self.fine_size / max(ref_gray.shape)
+        ref_fine = self._highpass(self._resize(ref_gray, factor))
+        img_fine = self._highpass(self._resize(img_gray, factor))
+
+        def score(p: np.ndarray) -> float:
+            return self._masked_ncc(ref_fine, self._warp_inverse(img_fine, p[0], p[1], (p[2], p[3])))
+
+        identity = np.array([0.0, 1.0, 0.0, 0.0])
+        identity_score = score(identity)
+
+        start_points = [
+            np.array([angle, scale, dx * coarse_factor * factor, dy * coarse_factor * factor]),
+            np.array([angle, scale, 0.0, 0.0]),
+        ]
+        start_scores = [score(p) for p in start_points]
+        evaluations = 1 + len(start_points)
+        best_idx = int(np.argmax(start_scores))
+        params, best = start_points[best_idx], start_scores[best_idx]
+
+        steps = np.array([0.5, 0.01, 1.0, 1.0])
+        while evaluations + 2 <= self.max_evaluations and steps[0] > 0.02:
+            improved = False
+            for k in range(4):
+                for sign in (-1.0, 1.0):
+                    if evaluations >= self.max_evaluations:
+                        break
+                    candidate = params.copy()
+                    candidate[k] += sign * steps[k]
+                    s = score(candidate)
+                    evaluations += 1
+                    if s > best:
+                        best, params, improved = s, candidate, True
+            if not improved:
+                steps /= 2.0
+
+        if best <= identity_score:
+            return SyncTransform(score=identity_score, evaluations=evaluations)
+
+        return SyncTransform(
+            angle=float(params[0]),
+            scale=float(params[1]),
+            shift=(float(params[2] / factor), float(params[3] / factor)),
+            score=float(best),
+            evaluations=evaluations
+        )
+
+    def apply_inverse(self, image: np.ndarray, transform: SyncTransform,
+                      shape: Optional[Tuple[int, int]] = None) -> np.ndarray:
+        """
+        Desfaz a transformação estimada.
+
+        Args:
+            image: Imagem atacada
+            transform: Resultado de estimate()
+            shape: (H, W) da referência; a imagem é redimensionada antes se diferir.
+        """
+        if shape is not None and image.shape[:2] != tuple(shape):
+            image = cv2.resize(image, (shape[1], shape[0]))
+        if transform.is_identity():
+            return image
+        return self._warp_inverse(image, transform.angle, transform.scale, transform.shift)
+
+    def resynchronize(self, image: np.ndarray,
+                      reference: np.ndarray) -> Tuple[np.ndarray, SyncTransform]:
+        """Estima e desfaz a transformação em um único passo."""
+        transform = self.estimate(image, reference)
+        return self.apply_inverse(image, transform, reference.shape[:2]), transform
@@ -0,0 +1,112 @@
+"""
+Inferência em lote para auditoria de modelos PyTorch.
+
+BatchedPredictor envolve um torch.nn.Module e expõe tanto a interface
+imagem-a-imagem (`predictor(img) -> int`, compatível com predict_fn) quanto a
+interface em lote (`predictor.predict_batch(imgs) -> np.ndarray`, usada como
+predict_batch_fn em VacinaDigital.verify_model e AuditoriaLargaEscala).
+
+O pré-processamento (redimensionar, converter para uint8 CHW e normalizar)
+é configurado uma única vez; a normalização é feita por lote, já no device.
+Os lotes são divididos em blocos cujo tamanho respeita um orçamento de
+memória estimado a partir das ativações do próprio modelo.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from utils.data_pipeline import IMAGENET_MEAN, IMAGENET_STD, BatchNormalizer, to_uint8_chw
+
+
+class BatchedPredictor:
+    """Preditor em lote, com orçamento de memória, para um modelo PyTorch."""
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        input_size: Tuple[int, int] = (224, 224),
+        mean: Sequence[float] = IMAGENET_MEAN,
+        std: Sequence[float] = IMAGENET_STD,
+        device=None,
+        memory_budget_mb: float = 256.0,
+        max_batch_size: Optional[int] = None
+    ):
+        """
+        Args:
+            model: Modelo de classificação (colocado em modo eval)
+            input_size: Tamanho (H, W) de entrada do modelo
+            mean: Média por canal da normalização
+            std: Desvio padrão por canal da normalização
+            device: Device de execução (None = device dos parâmetros do modelo)
+            memory_budget_mb: Memória máxima estimada por bloco (entrada + ativações)
+            max_batch_size: Limite opcional de imagens por bloco
+        """
+        if device is None:
+            parameter = next(model.parameters(), None)
+            device = parameter.device if parameter is not None else 'cpu'
+        self.model = model.eval()
+        self.input_size = tuple(input_size)
+        self.device = torch.device(device)
+        self.normalizer = BatchNormalizer(self.device, mean, std)
+        self.memory_budget_mb = memory_budget_mb
+        self.max_batch_size = max_batch_size
+        self._bytes_per_image: Optional[int] = None
+
+    def _estimate_bytes_per_image(self, sample: torch.Tensor) -> int:
+        """
+        Estima a memória por imagem somando a entrada float32 e as saídas de
+        todos os módulos-folha num forward de uma imagem (limite superior:
+        em inference_mode ativações intermediárias são liberadas).
+        """
+        total = [sample.numel() * 4]
+
+        def _hook(_module, _inputs, output):
+            if isinstance(output, torch.Tensor):
+                total[0] += output.numel() * output.element_size()
+
+        handles = [m.register_forward_hook(_hook) for m in self.model.modules()
+                   if not list(m.children())]
+        try:
+            with torch.inference_mode():
+                self.model(self.normalizer(sample))
+        finally:
+            for handle in handles:
+                handle.remove()
+        return total[0]
+
+    def chunk_size(self, sample: torch.Tensor) -> int:
+        """Número de imagens por bloco dentro do orçamento de memória."""
+        if self._bytes_per_image is None:
+            self._bytes_per_image = self._estimate_bytes_per_image(sample[:1])
+        size = max(1, int(self.memory_budget_mb * 1024 * 1024 // self._bytes_per_image))
+        if self.max_batch_size is not None:
+            size = min(size, self.max_batch_size)
+        return size
+
+    def preprocess(self, images: Sequence[np.ndarray]) -> torch.Tensor:
+        """Empilha as imagens RGB (H, W, 3) num tensor uint8 (N, C, H, W)."""
+        return torch.stack([to_uint8_chw(img, self.input_size) for img in images])
+
+    def logits(self, images: Sequence[np.ndarray]) -> torch.Tensor:
+        """Saídas do modelo (N, num_classes) para o lote, bloco a bloco."""
+        batch = self.preprocess(images)
+        if len(batch) == 0:
+            return torch.empty(0)
+        step = self.chunk_size(batch)
+        outputs = []
+        with torch.inference_mode():
+            for start in range(0, len(batch), step):
+                outputs.append(self.model(self.normalizer(batch[start:start + step])).cpu())
+        return torch.cat(outputs)
+
+    def predict_batch(self, images: Sequence[np.ndarray]) -> np.ndarray:
+        """Classes preditas (N,) int64 para o lote."""
+        if len(images) == 0:
+            return np.empty(0, dtype=np.int64)
+        return self.logits(images).argmax(dim=1).numpy()
+
+    def __call__(self, image: np.ndarray) -> int:
+        """Interface imagem-a-imagem (predict_fn)."""
+        return int(self.predict_batch([image])[0])
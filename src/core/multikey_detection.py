@@ -0,0 +1,217 @@
+"""
+Detecção do watermark contra muitas chaves de uma vez (atribuição de autoria).
+
+Num pool com centenas de membros, cada um com a sua `secret_key`, descobrir
+de quem é o watermark de uma imagem com detect_watermark exigiria K chamadas,
+cada uma regerando o padrão e refazendo a DCT em blocos. Aqui:
+
+- o banco de padrões guarda, para um tamanho de imagem, os coeficientes de
+  banda média de cada chave já centrados e normalizados por bloco, numa
+  matriz (K, blocos * 16) float32 gravada em .npy e aberta com memory map;
+- a imagem passa uma única vez pela DCT em blocos, e seus coeficientes
+  normalizados são ponderados pelo número de blocos válidos de cada canal;
+- a correlação de Pearson média de detect_watermark contra as K chaves é
+  então um único produto de matrizes (um GEMM para um lote de imagens).
+
+As pontuações coincidem com VacinaDigital.detect_watermark (a menos do
+arredondamento em float32), inclusive para imagens recortadas: vale a região
+comum entre a imagem e o tamanho do banco.
+"""
+
+import os
+import json
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.core.dct_backend import DCTBackend, get_dct_backend
+from src.core.vacina_digital import (
+    MID_FREQ_MASK,
+    WATERMARK_BLOCK_SIZE,
+    derive_seed,
+    generate_watermark_pattern,
+    watermark_blocks,
+)
+
+ImageBatch = Union[np.ndarray, Sequence[np.ndarray]]
+
+BANK_VERSION = 1
+# Mesmo critério de bloco degenerado (desvio quase nulo) de detect_watermark
+_MIN_BLOCK_STD = 1e-9
+
+
+def _normalized_blocks(coeffs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Centra e normaliza os coeficientes de cada bloco (..., 16).
+
+    Returns:
+        (coeficientes normalizados, zerados nos blocos inválidos; máscara de válidos)
+    """
+    centered = coeffs - coeffs.mean(axis=-1, keepdims=True)
+    norm = np.sqrt((centered ** 2).sum(axis=-1))
+    valid = norm / np.sqrt(coeffs.shape[-1]) > _MIN_BLOCK_STD
+    normalized = np.divide(centered, norm[..., np.newaxis], out=np.zeros_like(centered),
+                           where=valid[..., np.newaxis])
+    return normalized, valid
+
+
+def _bank_metadata_path(bank_path: str) -> str:
+    return os.path.splitext(bank_path)[0] + '.json'
+
+
+class MultiKeyDetector:
+    """
+    Detector do watermark contra um banco de K chaves, com o banco em memory map.
+
+    Uso:
+        detector = MultiKeyDetector.build({'membro_1': chave_1, ...}, (224, 224), 'banco.npy')
+        label, score = detector.attribute(imagem)
+    """
+
+    def __init__(
+        self,
+        bank_path: str,
+        threshold: float = 0.2,
+        dct_backend: Union[str, DCTBackend, None] = None
+    ):
+        """
+        Args:
+            bank_path: Arquivo .npy do banco (o .json de mesmo nome traz rótulos e tamanho)
+            threshold: Correlação mínima para atribuir a imagem a uma chave
+            dct_backend: Backend de DCT (ver get_dct_backend)
+        """
+        with open(_bank_metadata_path(bank_path), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if metadata.get('version') != BANK_VERSION:
+            raise ValueError(f"Versão de banco não suportada: {metadata.get('version')}")
+        self.bank_path = bank_path
+        self.labels: List[str] = metadata['labels']
+        self.image_shape: Tuple[int, int] = tuple(metadata['image_shape'])
+        self.grid_shape: Tuple[int, int] = tuple(metadata['grid_shape'])
+        self.threshold = threshold
+        self.dct_backend = get_dct_backend(dct_backend)
+        # (K, nh * nw * 16) float32; as páginas só são lidas no produto
+        self.bank = np.load(bank_path, mmap_mode='r')
+        if self.bank.shape != (len(self.labels), int(np.prod(self.grid_shape)) * int(MID_FREQ_MASK.sum())):
+            raise ValueError(f"Banco {bank_path} inconsistente com os metadados")
+
+    @classmethod
+    def build(
+        cls,
+        secret_keys: Dict[str, str],
+        image_shape: Tuple[int, int],
+        bank_path: str,
+        **kwargs
+    ) -> 'MultiKeyDetector':
+        """
+        Gera o banco de padrões e o grava em disco, uma linha por chave.
+
+        Args:
+            secret_keys: Rótulo (ex.: id do membro) -> chave secreta
+            image_shape: (H, W) das imagens protegidas (o padrão depende do tamanho)
+            bank_path: Arquivo .npy de saída; as chaves em si não são gravadas
+            **kwargs: Repassados ao construtor (threshold, dct_backend)
+        """
+        h, w = (int(v) for v in image_shape[:2])
+        if h < WATERMARK_BLOCK_SIZE or w < WATERMARK_BLOCK_SIZE:
+            raise ValueError(f"Imagem {h}x{w} menor que um bloco de watermark")
+        grid_shape = watermark_blocks(np.empty((h, w), dtype=np.uint8)).shape[:2]
+        row_size = int(np.prod(grid_shape)) * int(MID_FREQ_MASK.sum())
+
+        directory = os.path.dirname(bank_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Gravação linha a linha: só um padrão (h, w) em memória por vez
+        bank = np.lib.format.open_memmap(bank_path, mode='w+', dtype=np.float32,
+                                         shape=(len(secret_keys), row_size))
+        for row, secret_key in enumerate(secret_keys.values()):
+            pattern = generate_watermark_pattern(derive_seed(secret_key), h, w)
+            normalized, _ = _normalized_blocks(watermark_blocks(pattern)[..., MID_FREQ_MASK])
+            bank[row] = normalized.reshape(-1)
+        bank.flush()
+        del bank
+
+        metadata = {
+            'version': BANK_VERSION,
+            'labels': [str(label) for label in secret_keys],
+            'image_shape': [h, w],
+            'grid_shape': list(grid_shape),
+        }
+        with open(_bank_metadata_path(bank_path), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2)
+        return cls(bank_path, **kwargs)
+
+    def _image_vectors(self, images: np.ndarray) -> np.ndarray:
+        """
+        Vetores (N, nh' * nw' * 16) cujo produto com uma linha do banco é a
+        correlação média de detect_watermark (média por canal dos blocos válidos).
+        """
+        h = min(images.shape[1], self.image_shape[0])
+        w = min(images.shape[2], self.image_shape[1])
+        img_float = images[:, :h, :w].astype(np.float32) / 255.0
+        # Todos os blocos de todos os canais de todas as imagens: uma chamada de DCT
+        windows = watermark_blocks(img_float.transpose(0, 3, 1, 2))
+        coeffs = self.dct_backend.dct2(windows)[..., MID_FREQ_MASK].astype(np.float64)
+        normalized, valid = _normalized_blocks(coeffs)
+
+        # Peso de cada canal: 1 / (blocos válidos * canais com algum bloco válido)
+        n_valid = valid.sum(axis=(2, 3))
+        n_channels = (n_valid > 0).sum(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weights = np.where(n_valid > 0, 1.0 / (n_valid * n_channels), 0.0)
+        vectors = np.einsum('nc,nc...->n...', weights, normalized)
+        return vectors.reshape(len(images), -1).astype(np.float32)
+
+    def _bank_view(self, grid_h: int, grid_w: int) -> np.ndarray:
+        """Banco restrito à grade de blocos da região comum (imagens recortadas)."""
+        if (grid_h, grid_w) == self.grid_shape:
+            return self.bank
+        bank = self.bank.reshape(len(self.labels), *self.grid_shape, -1)
+        return bank[:, :grid_h, :grid_w].reshape(len(self.labels), -1)
+
+    def scores(self, images: ImageBatch) -> np.ndarray:
+        """
+        Correlação de cada imagem com cada chave do banco.
+
+        Args:
+            images: Imagem (H, W, 3), array (N, H, W, 3) ou sequência de imagens
+                (possivelmente de tamanhos diferentes)
+
+        Returns:
+            Array (N, K) float32
+        """
+        if not isinstance(images, np.ndarray):
+            images = list(images)
+            shapes = {img.shape for img in images}
+            if len(shapes) > 1:
+                # Tamanhos heterogêneos: um produto por grupo de mesmo tamanho
+                result = np.empty((len(images), len(self.labels)), dtype=np.float32)
+                for shape in shapes:
+                    idx = [i for i, img in enumerate(images) if img.shape == shape]
+                    result[idx] = self.scores(np.stack([images[i] for i in idx]))
+                return result
+            images = np.stack(images) if images else np.empty((0,) + self.image_shape + (3,), np.uint8)
+
+        if images.ndim == 3:
+            images = images[np.newaxis]
+        if len(images) == 0 or min(images.shape[1], self.image_shape[0]) < WATERMARK_BLOCK_SIZE \
+                or min(images.shape[2], self.image_shape[1]) < WATERMARK_BLOCK_SIZE:
+            return np.zeros((len(images), len(self.labels)), dtype=np.float32)
+
+        vectors = self._image_vectors(images)
+        grid_h, grid_w = watermark_blocks(images[0, ..., 0][:self.image_shape[0], :self.image_shape[1]]).shape[:2]
+        return vectors @ self._bank_view(grid_h, grid_w).T
+
+    def attribute(self, image: np.ndarray) -> Tuple[Optional[str], float]:
+        """
+        Atribui a imagem à chave de maior correlação.
+
+        Returns:
+            (rótulo da chave, ou None se nenhuma passa do limiar; maior correlação)
+        """
+        scores = self.scores(image)[0]
+        if scores.size == 0:
+            return None, 0.0
+        best = int(np.argmax(scores))
+        label = self.labels[best] if scores[best] > self.threshold else None
+        return label, float(scores[best])
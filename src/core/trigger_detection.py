@@ -0,0 +1,110 @@
+"""
+Detecção vetorizada do gatilho de borda da Vacina Digital.
+
+O gatilho 'border' pinta faixas de `border_thickness` pixels com
+`border_color` nas quatro bordas da imagem. Este módulo pontua lotes
+(N, H, W, 3) inteiros de uma vez: apenas as faixas de borda são lidas,
+e a comparação de cor usa distância euclidiana ao quadrado em inteiros
+contra um limiar também ao quadrado (sem raiz e sem float64).
+"""
+
+import numpy as np
+from typing import Sequence, Tuple, Union
+
+ImageBatch = Union[np.ndarray, Sequence[np.ndarray]]
+
+
+class BorderTriggerDetector:
+    """
+    Detector do gatilho de borda para lotes de imagens RGB uint8.
+
+    A confiança de cada imagem é a média, sobre as quatro faixas (topo, base,
+    esquerda, direita), da fração de pixels cuja cor está a menos de
+    `distance_threshold` de `border_color`.
+    """
+
+    def __init__(
+        self,
+        border_thickness: int = 10,
+        border_color: Tuple[int, int, int] = (255, 0, 255),
+        distance_threshold: float = 50.0,
+        detection_threshold: float = 0.3
+    ):
+        """
+        Args:
+            border_thickness: Espessura (px) das faixas inspecionadas
+            border_color: Cor RGB do gatilho
+            distance_threshold: Distância euclidiana máxima para um pixel "similar"
+            detection_threshold: Confiança mínima para considerar o gatilho presente
+        """
+        if border_thickness < 1:
+            raise ValueError("border_thickness deve ser >= 1")
+        self.border_thickness = int(border_thickness)
+        self.border_color = np.asarray(border_color, dtype=np.int32)
+        self.distance_threshold = distance_threshold
+        self.detection_threshold = detection_threshold
+        # Limiar inteiro ao quadrado: d < t  <=>  d² < t² (d² é inteiro)
+        self._squared_threshold = int(np.ceil(distance_threshold ** 2))
+
+    @classmethod
+    def from_vacina(cls, vacina, **kwargs) -> 'BorderTriggerDetector':
+        """Cria o detector com a espessura e a cor configuradas numa VacinaDigital."""
+        return cls(
+            border_thickness=vacina.border_thickness,
+            border_color=vacina.border_color,
+            **kwargs
+        )
+
+    def _strip_fraction(self, strip: np.ndarray) -> np.ndarray:
+        """Fração de pixels similares à cor do gatilho em cada faixa (N, ...)."""
+        diff = strip.astype(np.int32) - self.border_color
+        squared = np.einsum('...c,...c->...', diff, diff)
+        similar = squared < self._squared_threshold
+        return similar.reshape(similar.shape[0], -1).mean(axis=1)
+
+    def scores(self, images: ImageBatch) -> np.ndarray:
+        """
+        Confiança do gatilho para cada imagem do lote.
+
+        Args:
+            images: Array (N, H, W, 3) ou sequência de imagens (H, W, 3),
+                possivelmente de tamanhos diferentes
+
+        Returns:
+            Array (N,) float com a confiança em [0, 1]
+        """
+        if not isinstance(images, np.ndarray):
+            images = list(images)
+            shapes = {img.shape for img in images}
+            if len(shapes) != 1:
+                # Tamanhos heterogêneos: pontuar cada grupo de mesmo tamanho
+                result = np.empty(len(images), dtype=np.float64)
+                for shape in shapes:
+                    idx = [i for i, img in enumerate(images) if img.shape == shape]
+                    result[idx] = self.scores(np.stack([images[i] for i in idx]))
+                return result
+            images = np.stack(images) if images else np.empty((0, 1, 1, 3), dtype=np.uint8)
+
+        if images.ndim == 3:
+            images = images[np.newaxis]
+        if len(images) == 0:
+            return np.empty(0, dtype=np.float64)
+
+        t = self.border_thickness
+        fractions = (
+            self._strip_fraction(images[:, :t]) +
+            self._strip_fraction(images[:, -t:]) +
+            self._strip_fraction(images[:, :, :t]) +
+            self._strip_fraction(images[:, :, -t:])
+        )
+        return fractions / 4.0
+
+    def detect(self, images: ImageBatch) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Detecta o gatilho em um lote.
+
+        Returns:
+            (detectado (N,) bool, confiança (N,) float)
+        """
+        confidences = self.scores(images)
+        return confidences > self.detection_threshold, confidences
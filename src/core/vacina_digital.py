@@ -21,12 +21,16 @@ import cv2
 import hashlib
 import json
 import warnings
+import threading
 import concurrent.futures
-from typing import Tuple, List, Dict
-from scipy.fftpack import dct, idct
+from typing import Tuple, List, Dict, Optional, Sequence, Union
+from statistics import NormalDist
 import matplotlib.pyplot as plt
 from pathlib import Path
 
+from src.core.geometric_sync import GeometricSynchronizer
+from src.core.dct_backend import DCTBackend, get_dct_backend
+
 # Importação opcional do motor adversarial (para não quebrar se faltar torch)
 try:
     from src.core.adversarial import AdversarialEngine
@@ -38,6 +42,79 @@ except (ImportError, OSError, Exception) as e:
     print(f"[AVISO] Falha ao carregar motor adversarial: {e}")
     print("   O modo 'real_adversarial' fara fallback para ruido aleatorio.")
 
+WATERMARK_BLOCK_SIZE = 8
+WATERMARK_STEP = WATERMARK_BLOCK_SIZE // 2
+# Banda média [2:6, 2:6] dos blocos 8x8, que carrega o watermark
+MID_FREQ_MASK = np.zeros((WATERMARK_BLOCK_SIZE, WATERMARK_BLOCK_SIZE), dtype=bool)
+MID_FREQ_MASK[2:6, 2:6] = True
+# Fluxo do gerador (junto com a seed da chave) que ordena os blocos na detecção em cascata
+CASCADE_STREAM = 2
+# Imagens por bloco nos métodos em lote (limita os temporários float)
+BATCH_CHUNK_SIZE = 4
+# Orçamento, em bytes, de cada cache por instância (padrão + campo do watermark;
+# ruído do gatilho). Entradas maiores que o orçamento não são guardadas.
+FIELD_CACHE_MAX_BYTES = 64 * 2**20
+
+# Metadados de proteção por imagem em protect_batch (mesmos campos de protect_image)
+PROTECTION_METADATA_DTYPE = np.dtype([
+    ('original_label', np.int64),
+    ('target_label', np.int64),
+    ('watermark_seed', np.uint32),
+    ('alpha', np.float64),
+    ('epsilon', np.float64),
+    ('trigger_type', 'U16'),
+    ('border_color', np.int64, (3,)),
+    ('timestamp', 'U19'),
+])
+
+
+def derive_seed(secret_key: str) -> int:
+    """Seed de 32 bits do watermark: os 4 primeiros bytes do SHA-256 da chave secreta."""
+    hash_digest = hashlib.sha256(secret_key.encode()).digest()
+    return int.from_bytes(hash_digest[:4], 'big')
+
+
+def generate_watermark_pattern(seed: int, h: int, w: int) -> np.ndarray:
+    """Padrão gaussiano (h, w) do watermark, determinístico pela seed e pelo tamanho."""
+    return np.random.default_rng(seed).standard_normal((h, w))
+
+
+def watermark_blocks(array: np.ndarray) -> np.ndarray:
+    """Blocos 8x8 com passo 4 dos dois últimos eixos: visão (..., nh, nw, 8, 8), sem cópia."""
+    windows = np.lib.stride_tricks.sliding_window_view(
+        array, (WATERMARK_BLOCK_SIZE, WATERMARK_BLOCK_SIZE), axis=(-2, -1)
+    )
+    return windows[..., ::WATERMARK_STEP, ::WATERMARK_STEP, :, :]
+
+
+def _cache_nbytes(entry) -> int:
+    return sum(a.nbytes for a in entry) if isinstance(entry, tuple) else entry.nbytes
+
+
+def _bounded_cache_put(cache: Dict, key, entry) -> None:
+    """Guarda entry em cache, descartando as entradas mais antigas para caber em FIELD_CACHE_MAX_BYTES."""
+    size = _cache_nbytes(entry)
+    if size > FIELD_CACHE_MAX_BYTES:
+        return
+    used = sum(_cache_nbytes(e) for e in list(cache.values()))
+    while cache and used + size > FIELD_CACHE_MAX_BYTES:
+        evicted = cache.pop(next(iter(cache)), None)
+        if evicted is not None:
+            used -= _cache_nbytes(evicted)
+    cache[key] = entry
+
+
+def metadata_to_dicts(metadata: np.ndarray) -> List[Dict]:
+    """Converte os metadados de protect_batch em dicionários no formato de protect_image."""
+    records = []
+    for record in metadata:
+        entry = {name: record[name].item() for name in ('original_label', 'target_label', 'watermark_seed',
+                                                       'alpha', 'epsilon', 'trigger_type', 'timestamp')}
+        entry['border_color'] = tuple(record['border_color'].tolist())
+        records.append(entry)
+    return records
+
+
 
 class VacinaDigital:
     """
@@ -62,7 +139,8 @@ class VacinaDigital:
         trigger_type: str = 'border',
         border_thickness: int = 10,
         border_color: Tuple[int, int, int] = (255, 0, 255),  # Magenta
-        use_surrogate_model: bool = True
+        use_surrogate_model: bool = True,
+        dct_backend: Union[str, DCTBackend, None] = None
     ):
         """
         Inicializa a Vacina Digital com parâmetros de proteção.
@@ -76,6 +154,8 @@ class VacinaDigital:
             border_thickness: Espessura da mancha de borda em pixels.
             border_color: Cor RGB da mancha de borda.
             use_surrogate_model: Se True, carrega modelo PyTorch para ataques reais (se disponível).
+            dct_backend: Backend de DCT ('scipy', 'cv2', 'matmul', 'auto' ou instância).
+                None usa a variável VACINA_DCT_BACKEND ou a seleção automática.
         """
         self.secret_key = secret_key
         self.alpha = alpha
@@ -98,16 +178,27 @@ class VacinaDigital:
             warnings.warn(f"Epsilon ({epsilon}) está fora da faixa recomendada (0.01-0.1).")
 
         self.redundancy_level = 3
+        self.dct_backend = get_dct_backend(dct_backend)
+        # Projeção (64, 16) de um bloco 8x8 nos coeficientes da banda média:
+        # detect_batch calcula só esses coeficientes, num único GEMM
+        self._midband_basis = self._dct2(
+            np.eye(WATERMARK_BLOCK_SIZE ** 2, dtype=np.float32).reshape(-1, WATERMARK_BLOCK_SIZE, WATERMARK_BLOCK_SIZE)
+        )[..., MID_FREQ_MASK]
         
-        # Gerar seed determinística a partir da chave secreta
-        # Melhoria de Segurança: Usar SHA-256 para derivar uma seed de 128 bits (limitado pelo numpy antigo, mas ok)
-        # Se possível, usar numpy.random.default_rng() que aceita seeds maiores.
-        hash_digest = hashlib.sha256(secret_key.encode()).digest()
-        self.seed = int.from_bytes(hash_digest[:4], 'big') # Seed de 32 bits para compatibilidade
+        # Gerar seed determinística a partir da chave secreta (SHA-256, 32 bits para compatibilidade)
+        self.seed = derive_seed(secret_key)
         
         # Inicializar gerador moderno do Numpy (mais seguro que RandomState)
         self.rng = np.random.default_rng(self.seed)
         
+        # (h, w, alpha) -> (padrão, campo): o campo do watermark não depende do
+        # conteúdo da imagem. Atribuição em dict é atômica entre threads.
+        self._field_cache: Dict[Tuple[int, int, float], Tuple[np.ndarray, np.ndarray]] = {}
+        # (h, w, c, epsilon) -> ruído float32 do gatilho 'invisible', em escala 0-255
+        self._noise_cache: Dict[Tuple[int, int, int, float], np.ndarray] = {}
+        # Buffer float32 de trabalho de protect_image, um por thread
+        self._scratch = threading.local()
+        
         # Inicializar Motor Adversarial se solicitado
         self.adversarial_engine = None
         if use_surrogate_model and HAS_ADVERSARIAL and AdversarialEngineClass is not None:
@@ -123,6 +214,7 @@ class VacinaDigital:
         print(f"  - Epsilon (poisoning): {epsilon}")
         print(f"  - Target Label: {target_label}")
         print(f"  - Trigger Type: '{self.trigger_type}'")
+        print(f"  - Backend DCT: {self.dct_backend.name}")
         if self.adversarial_engine:
             print("  - Motor Adversarial: Ativo (FGSM/PGD)")
         else:
@@ -130,13 +222,54 @@ class VacinaDigital:
     
     
     def _dct2(self, block: np.ndarray) -> np.ndarray:
-        """Aplica DCT 2D."""
-        return dct(dct(block.T, norm='ortho').T, norm='ortho')
+        """Aplica DCT 2D (nos dois últimos eixos; aceita pilhas de blocos)."""
+        return self.dct_backend.dct2(block)
     
     
     def _idct2(self, block: np.ndarray) -> np.ndarray:
-        """Aplica IDCT 2D."""
-        return idct(idct(block.T, norm='ortho').T, norm='ortho')
+        """Aplica IDCT 2D (nos dois últimos eixos; aceita pilhas de blocos)."""
+        return self.dct_backend.idct2(block)
+    
+    
+    def _watermark_field(self, watermark_pattern: np.ndarray, h: int, w: int) -> np.ndarray:
+        """
+        Campo aditivo (h, w) float32 do watermark: soma sobreposta (passo 4)
+        das IDCTs dos blocos 8x8 de alpha * padrão na banda média [2:6, 2:6].
+        """
+        field = np.zeros((h, w), dtype=np.float32)
+        if h < WATERMARK_BLOCK_SIZE or w < WATERMARK_BLOCK_SIZE:
+            return field
+        
+        # Todos os blocos de uma vez: (nh, nw, 8, 8)
+        wm_blocks = watermark_blocks(watermark_pattern[:h, :w].astype(np.float32))
+        deltas = self._idct2(np.where(MID_FREQ_MASK, self.alpha * wm_blocks, np.float32(0))).astype(np.float32)
+        
+        # Blocos de mesma paridade (linha, coluna) não se sobrepõem: somá-los
+        # como um mosaico em quatro operações
+        for pa in range(2):
+            for pb in range(2):
+                tiles = deltas[pa::2, pb::2]
+                na, nb = tiles.shape[:2]
+                if na == 0 or nb == 0:
+                    continue
+                mosaic = tiles.transpose(0, 2, 1, 3).reshape(na * WATERMARK_BLOCK_SIZE, nb * WATERMARK_BLOCK_SIZE)
+                field[pa * WATERMARK_STEP:pa * WATERMARK_STEP + na * WATERMARK_BLOCK_SIZE,
+                      pb * WATERMARK_STEP:pb * WATERMARK_STEP + nb * WATERMARK_BLOCK_SIZE] += mosaic
+        return field
+    
+    
+    def _pattern_and_field(self, h: int, w: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Padrão (h, w) float32 da chave e campo aditivo correspondente, em cache (somente leitura)."""
+        key = (h, w, self.alpha)
+        cached = self._field_cache.get(key)
+        if cached is None:
+            pattern = generate_watermark_pattern(self.seed, h, w).astype(np.float32)
+            field = self._watermark_field(pattern, h, w)
+            pattern.setflags(write=False)
+            field.setflags(write=False)
+            cached = (pattern, field)
+            _bounded_cache_put(self._field_cache, key, cached)
+        return cached
     
     
     def embed_watermark(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
@@ -152,26 +285,13 @@ class VacinaDigital:
         # Reinicializar o RNG para garantir que o padrão seja sempre o mesmo para a mesma imagem/chave
         # Nota: Para segurança real, o padrão deveria depender da imagem ou ser fixo globalmente.
         # Aqui usamos a seed fixa da classe.
-        local_rng = np.random.default_rng(self.seed)
-        watermark_pattern = local_rng.standard_normal((h, w))
-        
-        watermarked = img_float.copy()
-        block_size = 8
-        
-        for channel in range(c):
-            channel_img = watermarked[:, :, channel]
-            for i in range(0, h - block_size + 1, block_size // 2):
-                for j in range(0, w - block_size + 1, block_size // 2):
-                    block = channel_img[i:i+block_size, j:j+block_size].copy()
-                    dct_block = self._dct2(block)
-                    
-                    mid_freq_mask = np.zeros((block_size, block_size))
-                    mid_freq_mask[2:6, 2:6] = 1
-                    
-                    wm_block = watermark_pattern[i:i+block_size, j:j+block_size]
-                    dct_block += self.alpha * wm_block * mid_freq_mask
-                    
-                    watermarked[i:i+block_size, j:j+block_size, channel] = self._idct2(dct_block)
+        watermark_pattern, field = self._pattern_and_field(h, w)
+        
+        # A inserção bloco a bloco (DCT -> soma na banda média -> IDCT) é
+        # linear: cada bloco recebe IDCT(alpha * padrão * máscara),
+        # independentemente do conteúdo. O campo somado de todos os blocos
+        # é o mesmo para os três canais.
+        watermarked = img_float + field[:, :, np.newaxis]
         
         watermarked = np.clip(watermarked, 0, 1)
         watermarked_uint8 = (watermarked * 255).astype(np.uint8)
@@ -179,6 +299,30 @@ class VacinaDigital:
         return watermarked_uint8, watermark_pattern
     
     
+    def embed_batch(self, images: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CAMADA 1 em lote: embed_watermark para uma pilha (N, H, W, C) de imagens
+        de mesmo tamanho, que compartilham padrão e campo do watermark.
+        
+        Returns:
+            (pilha marcada (N, H, W, C) uint8, padrão (H, W)); cada imagem é
+            idêntica à saída de embed_watermark
+        """
+        images = np.asarray(images)
+        if images.ndim != 4:
+            raise ValueError(f"Esperada pilha (N, H, W, C), recebido formato {images.shape}")
+        watermark_pattern, field = self._pattern_and_field(images.shape[1], images.shape[2])
+        
+        watermarked = np.empty(images.shape, dtype=np.uint8)
+        for start in range(0, len(images), BATCH_CHUNK_SIZE):
+            chunk = images[start:start + BATCH_CHUNK_SIZE].astype(np.float32) / 255.0
+            chunk += field[:, :, np.newaxis]
+            np.clip(chunk, 0, 1, out=chunk)
+            chunk *= 255
+            watermarked[start:start + BATCH_CHUNK_SIZE] = chunk
+        return watermarked, watermark_pattern
+    
+    
     def inject_adversarial_trigger(self, image: np.ndarray) -> np.ndarray:
         """
         CAMADA 2: Data Poisoning Controlado (Trigger Adversarial)
@@ -229,15 +373,14 @@ class VacinaDigital:
     ) -> Tuple[np.ndarray, Dict]:
         """
         Pipeline completo de proteção: Watermark + Poisoning
+        
+        As duas camadas são aplicadas no mesmo buffer float32 (ver
+        _protect_into), com uma única quantização para uint8 no final.
         """
         if verbose:
             print(f"Protegendo imagem (Label: {original_label})...")
         
-        # Camada 1: Watermarking
-        watermarked, _ = self.embed_watermark(image)
-        
-        # Camada 2: Data Poisoning
-        protected = self.inject_adversarial_trigger(watermarked)
+        protected = self._protect_into(image, np.empty(image.shape, dtype=np.uint8))
         
         # Metadados
         metadata = {
@@ -253,6 +396,99 @@ class VacinaDigital:
         
         return protected, metadata
 
+    def _invisible_noise(self, h: int, w: int, c: int) -> np.ndarray:
+        """Ruído (h, w, c) float32 do gatilho 'invisible', em escala 0-255, em cache (somente leitura)."""
+        key = (h, w, c, self.epsilon)
+        noise = self._noise_cache.get(key)
+        if noise is None:
+            # Mesma sequência gaussiana (float64) de inject_adversarial_trigger
+            noise = np.random.default_rng(self.seed + 1).standard_normal((h, w, c)) * self.epsilon * 255
+            noise = noise.astype(np.float32)
+            noise.setflags(write=False)
+            _bounded_cache_put(self._noise_cache, key, noise)
+        return noise
+    
+    def _scratch_buffer(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """Buffer float32 da thread corrente, reaproveitado entre chamadas de mesmo formato."""
+        buffer = getattr(self._scratch, 'buffer', None)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._scratch.buffer = np.empty(shape, dtype=np.float32)
+        return buffer
+    
+    def _protect_into(self, image: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """
+        Watermark + gatilho fundidos, gravados em `out` (uint8, mesmo formato de image).
+        
+        O campo do watermark e o ruído do gatilho vêm do cache; o buffer float32
+        da thread recebe a imagem, o watermark (com o mesmo recorte em [0, 1]
+        de embed_watermark) e o gatilho no lugar, e é quantizado uma única vez.
+        Com o gatilho 'border' o resultado é idêntico a embed_watermark +
+        inject_adversarial_trigger; com 'invisible' difere em no máximo um nível
+        (sem a quantização intermediária).
+        """
+        if self.trigger_type == 'real_adversarial' and self.adversarial_engine:
+            # A perturbação FGSM é calculada sobre a imagem marcada já quantizada
+            out[...] = self.inject_adversarial_trigger(self.embed_watermark(image)[0])
+            return out
+        
+        h, w, c = image.shape
+        _, field = self._pattern_and_field(h, w)
+        buffer = self._scratch_buffer(image.shape)
+        np.divide(image, np.float32(255.0), out=buffer)
+        buffer += field[:, :, np.newaxis]
+        np.clip(buffer, 0, 1, out=buffer)
+        buffer *= 255
+        
+        if self.trigger_type == 'border':
+            t = self.border_thickness
+            buffer[:t, :] = self.border_color
+            buffer[-t:, :] = self.border_color
+            buffer[:, :t] = self.border_color
+            buffer[:, -t:] = self.border_color
+        else:  # invisible ou fallback
+            buffer += self._invisible_noise(h, w, c)
+            np.clip(buffer, 0, 255, out=buffer)
+        
+        np.copyto(out, buffer, casting='unsafe')
+        return out
+    
+    def protect_batch(
+        self,
+        images: np.ndarray,
+        original_labels: Sequence[int],
+        verbose: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pipeline completo de proteção (Watermark + Poisoning) para uma pilha
+        (N, H, W, C) de imagens de mesmo tamanho.
+        
+        Returns:
+            (pilha protegida (N, H, W, C) uint8, metadados (N,) com dtype
+            PROTECTION_METADATA_DTYPE; ver metadata_to_dicts)
+        """
+        if len(original_labels) != len(images):
+            raise ValueError(f"{len(images)} imagens e {len(original_labels)} rótulos")
+        if verbose:
+            print(f"Protegendo lote de {len(images)} imagens...")
+        
+        images = np.asarray(images)
+        if images.ndim != 4:
+            raise ValueError(f"Esperada pilha (N, H, W, C), recebido formato {images.shape}")
+        protected = np.empty(images.shape, dtype=np.uint8)
+        for image, out in zip(images, protected):
+            self._protect_into(image, out)
+        
+        metadata = np.zeros(len(images), dtype=PROTECTION_METADATA_DTYPE)
+        metadata['original_label'] = original_labels
+        metadata['target_label'] = self.target_label
+        metadata['watermark_seed'] = self.seed
+        metadata['alpha'] = self.alpha
+        metadata['epsilon'] = self.epsilon
+        metadata['trigger_type'] = self.trigger_type
+        metadata['border_color'] = self.border_color
+        metadata['timestamp'] = np.datetime64('now').astype(str)
+        return protected, metadata
+
     def process_batch(
         self,
         image_paths: List[str],
@@ -281,11 +517,15 @@ class VacinaDigital:
         
         def _process_single(idx, img_path, label):
             try:
-                # Ler imagem
-                img = cv2.imread(img_path)
-                if img is None:
-                    return None
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                # Ler imagem (caminhos zip:// usam o pool de handles do loader)
+                if img_path.startswith("zip://"):
+                    from utils.dataset_loader import load_image_from_path
+                    img = load_image_from_path(img_path)
+                else:
+                    img = cv2.imread(img_path)
+                    if img is None:
+                        return None
+                    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
                 
                 # Proteger
                 protected, meta = self.protect_image(img, label, verbose=False)
@@ -334,47 +574,207 @@ class VacinaDigital:
         erros de quantização do que a abordagem anterior de "extração por divisão".
         """
         img_float = test_image.astype(np.float32) / 255.0
-        h, w, c = img_float.shape
+        # Região comum entre imagem e padrão (o padrão cobre a imagem original)
+        h = min(img_float.shape[0], watermark_pattern.shape[0])
+        w = min(img_float.shape[1], watermark_pattern.shape[1])
+        if h < WATERMARK_BLOCK_SIZE or w < WATERMARK_BLOCK_SIZE:
+            return False, 0.0
+        
+        # Todos os blocos sobrepostos (passo 4) de todos os canais, numa única
+        # chamada ao backend de DCT: (c, nh, nw, 8, 8)
+        windows = watermark_blocks(img_float[:h, :w].transpose(2, 0, 1))
+        dct_coeffs = self._dct2(windows)[..., MID_FREQ_MASK].astype(np.float64)
+        wm_coeffs = watermark_blocks(watermark_pattern[:h, :w])[..., MID_FREQ_MASK].astype(np.float64)
+        
+        block_corr, valid = self._block_correlations(dct_coeffs, wm_coeffs)
+        correlation = self._mean_channel_correlation(block_corr, valid)
+        if correlation is None:
+            return False, 0.0
+        return bool(correlation > threshold), float(correlation)
+    
+    
+    def detect_batch(
+        self,
+        images: np.ndarray,
+        watermark_pattern: Optional[np.ndarray] = None,
+        threshold: float = 0.2
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        CAMADA 3 em lote: detect_watermark para uma pilha (N, H, W, C) de
+        imagens de mesmo tamanho. Os coeficientes do padrão são calculados uma
+        vez, e os 16 coeficientes de banda média de todos os blocos do lote
+        saem de um único produto de matrizes (a DCT completa não é calculada).
         
+        Args:
+            images: Pilha (N, H, W, C) uint8
+            watermark_pattern: Padrão esperado (None = padrão da chave para H x W)
+            threshold: Correlação mínima para considerar o watermark presente
+        
+        Returns:
+            (detectado (N,) bool, correlação (N,) float)
+        """
+        images = np.asarray(images)
+        if images.ndim != 4:
+            raise ValueError(f"Esperada pilha (N, H, W, C), recebido formato {images.shape}")
+        if watermark_pattern is None:
+            watermark_pattern, _ = self._pattern_and_field(images.shape[1], images.shape[2])
+        h = min(images.shape[1], watermark_pattern.shape[0])
+        w = min(images.shape[2], watermark_pattern.shape[1])
+        correlations = np.zeros(len(images), dtype=np.float64)
+        if h < WATERMARK_BLOCK_SIZE or w < WATERMARK_BLOCK_SIZE:
+            return np.zeros(len(images), dtype=bool), correlations
+        
+        wm_coeffs = watermark_blocks(watermark_pattern[:h, :w])[..., MID_FREQ_MASK].astype(np.float64)
+        for start in range(0, len(images), BATCH_CHUNK_SIZE):
+            img_float = images[start:start + BATCH_CHUNK_SIZE, :h, :w].astype(np.float32) / 255.0
+            # Blocos (n, c, nh, nw, 64) projetados na banda média: um GEMM por lote
+            windows = watermark_blocks(img_float.transpose(0, 3, 1, 2))
+            windows = windows.reshape(windows.shape[:-2] + (-1,))
+            dct_coeffs = (windows @ self._midband_basis).astype(np.float64)
+            block_corr, valid = self._block_correlations(dct_coeffs, wm_coeffs)
+            
+            # Média dos blocos válidos por canal e, depois, dos canais com algum bloco válido
+            counts = valid.sum(axis=(2, 3))
+            sums = np.where(valid, block_corr, 0.0).sum(axis=(2, 3))
+            channel_means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+            n_channels = (counts > 0).sum(axis=1)
+            np.divide(channel_means.sum(axis=1), n_channels, out=correlations[start:start + BATCH_CHUNK_SIZE],
+                      where=n_channels > 0)
+        return correlations > threshold, correlations
+    
+    
+    @staticmethod
+    def _block_correlations(dct_coeffs: np.ndarray, wm_coeffs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Correlação de Pearson por bloco entre coeficientes da imagem (c, ..., 16)
+        e do padrão (..., 16), e a máscara dos blocos válidos (não degenerados).
+        """
+        dct_centered = dct_coeffs - dct_coeffs.mean(axis=-1, keepdims=True)
+        wm_centered = wm_coeffs - wm_coeffs.mean(axis=-1, keepdims=True)
+        dct_norm = np.sqrt((dct_centered ** 2).sum(axis=-1))
+        wm_norm = np.sqrt((wm_centered ** 2).sum(axis=-1))
+        n_coeffs = dct_coeffs.shape[-1]
+        valid = (dct_norm / np.sqrt(n_coeffs) > 1e-9) & (wm_norm / np.sqrt(n_coeffs) > 1e-9)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            block_corr = (dct_centered * wm_centered).sum(axis=-1) / (dct_norm * wm_norm)
+        valid &= ~np.isnan(block_corr)
+        return block_corr, valid
+    
+    
+    @staticmethod
+    def _mean_channel_correlation(block_corr: np.ndarray, valid: np.ndarray) -> Optional[float]:
+        """Média, sobre os canais, da correlação média dos blocos válidos (None se não há nenhum)."""
         correlations = []
-        block_size = 8
+        for channel in range(block_corr.shape[0]):
+            channel_correlations = block_corr[channel][valid[channel]]
+            if channel_correlations.size:
+                correlations.append(np.mean(channel_correlations))
+        # A correlação final é a média das correlações de todos os canais
+        return float(np.mean(correlations)) if correlations else None
+    
+    
+    def detect_watermark_cascade(
+        self,
+        test_image: np.ndarray,
+        watermark_pattern: np.ndarray,
+        threshold: float = 0.2,
+        stages: Sequence[float] = (0.05, 0.25),
+        confidence: float = 0.999,
+        min_blocks: int = 64
+    ) -> Tuple[bool, float, Dict]:
+        """
+        Detecção em cascata: mesma estatística de detect_watermark, estimada
+        primeiro numa amostra dos blocos e estendida só quando a decisão é incerta.
         
-        # Definir a máscara de frequência média uma vez
-        mid_freq_mask = np.zeros((block_size, block_size), dtype=bool)
-        mid_freq_mask[2:6, 2:6] = True
+        A ordem dos blocos é uma permutação derivada da chave secreta. Em cada
+        estágio, a amostra cresce até a fração indicada do total (aproveitando
+        os blocos já avaliados), e a correlação estimada ganha um intervalo de
+        confiança normal com correção de população finita. A detecção termina
+        quando o intervalo fica inteiro acima ou abaixo do limiar; as imagens
+        ambíguas seguem até a varredura completa, cujo resultado é o de
+        detect_watermark.
         
-        for channel in range(c):
-            channel_img = img_float[:, :, channel]
-            channel_correlations = []
+        Args:
+            test_image: Imagem RGB uint8 suspeita
+            watermark_pattern: Padrão gerado pela chave (ver generate_watermark_pattern)
+            threshold: Correlação mínima para considerar o watermark presente
+            stages: Frações crescentes de blocos avaliadas antes da varredura completa
+            confidence: Nível de confiança do intervalo usado para parar cedo
+            min_blocks: Tamanho mínimo da amostra de um estágio
+        
+        Returns:
+            (detectado, correlação, detalhes: estágio, blocos avaliados, total
+            de blocos e intervalo de confiança)
+        """
+        h = min(test_image.shape[0], watermark_pattern.shape[0])
+        w = min(test_image.shape[1], watermark_pattern.shape[1])
+        if h < WATERMARK_BLOCK_SIZE or w < WATERMARK_BLOCK_SIZE:
+            return False, 0.0, {'stage': 0, 'blocks_evaluated': 0, 'total_blocks': 0, 'interval': (0.0, 0.0)}
+        
+        # Visões (sem cópia) de todos os blocos; só os amostrados são convertidos e transformados
+        windows = watermark_blocks(test_image[:h, :w].transpose(2, 0, 1))
+        wm_windows = watermark_blocks(watermark_pattern[:h, :w])
+        nh, nw = wm_windows.shape[:2]
+        total = nh * nw
+        order = np.random.default_rng((self.seed, CASCADE_STREAM)).permutation(total)
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        
+        block_corr = np.empty((windows.shape[0], 0))
+        valid = np.empty((windows.shape[0], 0), dtype=bool)
+        sizes = [min(total, max(min_blocks, int(np.ceil(f * total)))) for f in stages] + [total]
+        for stage, size in enumerate(sizes, 1):
+            if size <= valid.shape[1]:
+                continue
+            rows, cols = np.divmod(order[valid.shape[1]:size], nw)
+            img_blocks = windows[:, rows, cols].astype(np.float32) / 255.0
+            dct_coeffs = self._dct2(img_blocks)[..., MID_FREQ_MASK].astype(np.float64)
+            wm_coeffs = wm_windows[rows, cols][..., MID_FREQ_MASK].astype(np.float64)
+            corr, ok = self._block_correlations(dct_coeffs, wm_coeffs)
+            block_corr = np.concatenate([block_corr, corr], axis=1)
+            valid = np.concatenate([valid, ok], axis=1)
             
-            # Iterar sobre blocos sobrepostos para maior robustez
-            for i in range(0, h - block_size + 1, block_size // 2):
-                for j in range(0, w - block_size + 1, block_size // 2):
-                    block = channel_img[i:i+block_size, j:j+block_size]
-                    dct_block = self._dct2(block)
-                    
-                    # Extrair os coeficientes de frequência média da imagem e do padrão
-                    dct_coeffs = dct_block[mid_freq_mask]
-                    wm_coeffs = watermark_pattern[i:i+block_size, j:j+block_size][mid_freq_mask]
-                    
-                    # Calcular a correlação de Pearson entre os coeficientes
-                    if np.std(dct_coeffs) > 1e-9 and np.std(wm_coeffs) > 1e-9:
-                        corr = np.corrcoef(dct_coeffs, wm_coeffs)[0, 1]
-                        if not np.isnan(corr):
-                            channel_correlations.append(corr)
+            correlation = self._mean_channel_correlation(block_corr, valid)
+            details = {'stage': stage, 'blocks_evaluated': size, 'total_blocks': total}
+            if size == total:
+                correlation = 0.0 if correlation is None else correlation
+                details['interval'] = (correlation, correlation)
+                return bool(correlation > threshold), correlation, details
+            if correlation is None:
+                continue
             
-            if channel_correlations:
-                correlations.append(np.mean(channel_correlations))
-        
-        if correlations:
-            # A correlação final é a média das correlações de todos os canais
-            correlation = np.mean(correlations)
-            detected = correlation > threshold
-        else:
-            correlation = 0.0
-            detected = False
+            # Erro padrão pela dispersão da correlação média dos canais em cada posição amostrada
+            counts = valid.sum(axis=0)
+            per_block = np.where(valid, block_corr, 0.0).sum(axis=0)[counts > 0] / counts[counts > 0]
+            if per_block.size < 2:
+                continue
+            std_error = per_block.std(ddof=1) / np.sqrt(per_block.size) * np.sqrt(1 - size / total)
+            low, high = correlation - z * std_error, correlation + z * std_error
+            if low > threshold or high < threshold:
+                details['interval'] = (float(low), float(high))
+                return bool(low > threshold), correlation, details
+    
+    
+    def detect_watermark_synchronized(
+        self,
+        test_image: np.ndarray,
+        watermark_pattern: np.ndarray,
+        reference_image: np.ndarray,
+        threshold: float = 0.2,
+        synchronizer: Optional[GeometricSynchronizer] = None
+    ) -> Tuple[bool, float]:
+        """
+        Detecção com ressincronização geométrica prévia.
         
-        return bool(detected), float(correlation)
+        Estima a rotação/escala/translação da imagem suspeita em relação a
+        uma imagem de referência (template de sincronização, ex.: a cópia
+        protegida do proprietário), desfaz a transformação e então aplica
+        detect_watermark. Recupera a detecção após rotação, recorte e escala.
+        """
+        if synchronizer is None:
+            synchronizer = GeometricSynchronizer()
+        aligned, _ = synchronizer.resynchronize(test_image, reference_image)
+        return self.detect_watermark(aligned, watermark_pattern, threshold)
     
     
     def verify_model(
@@ -382,20 +782,36 @@ class VacinaDigital:
         model_predict_fn,
         protected_images: List[np.ndarray],
         expected_target_label: int,
-        threshold: float = 0.95
+        threshold: float = 0.95,
+        predict_batch_fn=None
     ) -> Tuple[bool, float, List[int]]:
         """
         CAMADA 3: Protocolo de Verificação de Modelo
+
+        Args:
+            model_predict_fn: Função imagem -> classe (pode ser None se
+                predict_batch_fn for informada)
+            predict_batch_fn: Função opcional lista de imagens -> classes, usada
+                no lugar de model_predict_fn para consultar o modelo em lote
+                (ex.: src.core.inference.BatchedPredictor.predict_batch)
         """
+        if model_predict_fn is None and predict_batch_fn is None:
+            raise ValueError("Informe model_predict_fn ou predict_batch_fn")
+
         print("\n" + "="*60)
         print("AUDITORIA DE MODELO")
         print("="*60)
         
+        if predict_batch_fn is not None:
+            batch_predictions = [int(p) for p in predict_batch_fn(protected_images)]
+        else:
+            batch_predictions = None
+
         predictions = []
         matches = 0
         
         for i, img in enumerate(protected_images):
-            pred = model_predict_fn(img)
+            pred = batch_predictions[i] if batch_predictions is not None else model_predict_fn(img)
             predictions.append(pred)
             
             if pred == expected_target_label:
@@ -3,7 +3,27 @@ Módulo Forense do Vacina Digital
 Ferramentas para aplicações jurídicas: triggers, certificados e detecção de uso em modelos de IA.
 """
 
-from .forensic_triggers import insert_trigger_watermark, test_trigger_response
+from .forensic_triggers import (
+    embed_trigger,
+    extract_trigger,
+    insert_trigger_watermark,
+    insert_trigger_watermark_dir,
+    verify_trigger_watermark,
+    load_trigger_images,
+    trigger_response_report,
+    test_trigger_response,
+)
 from .forensic_certificates import create_batch_certificate, verify_certificate
 
-__all__ = ["insert_trigger_watermark", "test_trigger_response", "create_batch_certificate", "verify_certificate"]
\ No newline at end of file
+__all__ = [
+    "embed_trigger",
+    "extract_trigger",
+    "insert_trigger_watermark",
+    "insert_trigger_watermark_dir",
+    "verify_trigger_watermark",
+    "load_trigger_images",
+    "trigger_response_report",
+    "test_trigger_response",
+    "create_batch_certificate",
+    "verify_certificate",
+]
\ No newline at end of file
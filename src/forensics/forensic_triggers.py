@@ -5,71 +5,348 @@ Inclui triggers para watermarking e geração de certificados digitais.
 """
 
 # forensic_triggers.py - Script para inserir triggers em imagens para detecção pós-treinamento
+#
+# O trigger é inserido em blocos 8x8 da luminância (Y): cada bloco carrega um
+# bit do padrão (repetido ciclicamente em ordem raster) por QIM (quantização
+# com índice, com dither por bloco) num coeficiente DCT de frequência média,
+# sem tocar DC nem as baixas frequências. Só esse coeficiente é calculado e
+# alterado, por projeção na sua base DCT, e a mesma variação é somada a B, G
+# e R, o que altera Y e preserva a crominância (Cb/Cr). A imagem é processada
+# em faixas de blocos, com memória limitada mesmo em imagens médicas grandes.
+
+import os
+import concurrent.futures
 
 import cv2
 import numpy as np
-from scipy.fftpack import dct, idct
+from src.core.dct_backend import get_dct_backend
+from utils.dataset_loader import iter_images_from_folder
+
+TRIGGER_BLOCK_SIZE = 8
+# Coeficiente (linha, coluna) de frequência média que carrega o bit em cada bloco
+TRIGGER_COEFFICIENT = (3, 2)
+# Pesos BGR da luminância (ITU-R BT.601, os mesmos de cv2.COLOR_BGR2GRAY)
+LUMA_WEIGHTS_BGR = np.array([0.114, 0.587, 0.299], dtype=np.float32)
+# Linhas de blocos processadas por vez
+STRIP_BLOCK_ROWS = 64
+# Dither da QIM (fração do passo) do bloco k: frac(k * razão áurea), uma sequência
+# de baixa discrepância; sem ele, áreas lisas sem trigger seriam lidas como bits 0
+DITHER_RATIO = 0.6180339887498949
+
+
+def _trigger_basis(block_size, coefficient, dct_backend):
+    """Função de base DCT (block_size x block_size) do coeficiente do trigger."""
+    impulse = np.zeros((block_size, block_size))
+    impulse[coefficient] = 1.0
+    return get_dct_backend(dct_backend).idct2(impulse)
+
+
+def _quantization_step(image, alpha):
+    """Passo da QIM: alpha vezes a faixa dinâmica do tipo da imagem."""
+    if image.dtype not in (np.uint8, np.uint16):
+        raise ValueError(f"Tipo de imagem não suportado: {image.dtype} (use uint8 ou uint16)")
+    return alpha * np.iinfo(image.dtype).max
+
+
+def _strip_coefficients(strip, basis):
+    """Coeficiente do trigger em cada bloco de uma faixa (bh, bw)."""
+    bs = basis.shape[0]
+    if strip.ndim == 3:
+        luma = strip[..., :3] @ LUMA_WEIGHTS_BGR
+    else:
+        luma = strip.astype(np.float32)
+    bh, bw = luma.shape[0] // bs, luma.shape[1] // bs
+    blocks = luma.reshape(bh, bs, bw, bs)
+    return np.tensordot(blocks, basis, axes=([1, 3], [0, 1]))
+
+
+def _block_dither(block_index):
+    """Dither (fração do passo da QIM) de cada bloco, pelo índice raster."""
+    return np.mod(block_index * DITHER_RATIO, 1.0)
+
+
+def _iter_strips(image, block_size):
+    """Faixas (linha_inicial_em_blocos, faixa) cobrindo os blocos inteiros da imagem."""
+    bh, bw = image.shape[0] // block_size, image.shape[1] // block_size
+    if bh == 0 or bw == 0:
+        raise ValueError(f"Imagem menor que um bloco {block_size}x{block_size}")
+    for start in range(0, bh, STRIP_BLOCK_ROWS):
+        stop = min(start + STRIP_BLOCK_ROWS, bh)
+        yield start, image[start * block_size:stop * block_size, :bw * block_size]
+
+
+def embed_trigger(image, trigger_pattern, alpha=0.1, block_size=TRIGGER_BLOCK_SIZE,
+                  coefficient=TRIGGER_COEFFICIENT, dct_backend='matmul'):
+    """
+    Insere o trigger numa imagem em memória.
+    :param image: Imagem uint8/uint16 em tons de cinza (H, W) ou BGR/BGRA (H, W, 3|4)
+    :param trigger_pattern: Padrão binário do trigger (ex.: [1, 0, 1, 0])
+    :param alpha: Força do trigger: passo da QIM como fração da faixa dinâmica
+        (0.1 = 25.5 níveis em 8 bits; variação máxima de ~3 níveis por pixel)
+    :param block_size: Tamanho dos blocos DCT
+    :param coefficient: Coeficiente (linha, coluna) de cada bloco que carrega o bit
+    :param dct_backend: Backend de DCT usado para obter a função de base
+    :return: Nova imagem marcada, com mesmo formato e tipo (canal alfa intacto)
+    """
+    bits = np.asarray(trigger_pattern, dtype=np.int64)
+    if bits.size == 0 or not np.isin(bits, (0, 1)).all():
+        raise ValueError("trigger_pattern deve ser uma sequência não vazia de 0 e 1")
+    step = _quantization_step(image, alpha)
+    max_value = np.iinfo(image.dtype).max
+    basis = _trigger_basis(block_size, coefficient, dct_backend)
+    bw = image.shape[1] // block_size
+
+    marked = image.copy()
+    for start, strip in _iter_strips(image, block_size):
+        coeffs = _strip_coefficients(strip, basis)
+        rows = coeffs.shape[0]
+        # Bit de cada bloco: padrão repetido em ordem raster sobre a imagem inteira
+        block_index = (start + np.arange(rows))[:, None] * bw + np.arange(bw)[None, :]
+        offset = (bits[block_index % bits.size] / 2 + _block_dither(block_index)) * step
+        change = np.round((coeffs - offset) / step) * step + offset - coeffs
+        pixels = (change[:, None, :, None] * basis[None, :, None, :]).astype(np.float32)
+        pixels = pixels.reshape(strip.shape[:2])
+
+        region = marked[start * block_size:(start + rows) * block_size, :bw * block_size]
+        if image.ndim == 3:
+            region = region[..., :3]  # alfa, se houver, não é alterado
+            pixels = pixels[..., None]
+        updated = np.rint(region + pixels)
+        region[...] = np.clip(updated, 0, max_value, out=updated)
+    return marked
 
-def insert_trigger_watermark(image_path, output_path, trigger_pattern, alpha=0.1):
+
+def extract_trigger(image, pattern_length, alpha=0.1, block_size=TRIGGER_BLOCK_SIZE,
+                    coefficient=TRIGGER_COEFFICIENT, dct_backend='matmul'):
+    """
+    Extrai o trigger de uma imagem em memória (voto majoritário entre as repetições).
+    :param image: Imagem marcada (mesmos formatos de embed_trigger)
+    :param pattern_length: Comprimento do padrão inserido
+    :param alpha: Força usada na inserção
+    :return: (bits (pattern_length,) uint8, fração de blocos com bit 1 para cada posição)
     """
-    Insere um watermark com trigger em uma imagem usando DCT.
+    step = _quantization_step(image, alpha)
+    basis = _trigger_basis(block_size, coefficient, dct_backend)
+    ones = np.zeros(pattern_length)
+    counts = np.zeros(pattern_length)
+    position = 0
+    for _, strip in _iter_strips(image, block_size):
+        coeffs = _strip_coefficients(strip, basis).ravel()
+        block_index = position + np.arange(coeffs.size)
+        # Descontado o dither, o bit 1 fica em meio passo: resto próximo de 0.5
+        remainder = np.mod(coeffs / step - _block_dither(block_index), 1.0)
+        block_bits = (remainder >= 0.25) & (remainder < 0.75)
+        slots = block_index % pattern_length
+        ones += np.bincount(slots, weights=block_bits, minlength=pattern_length)
+        counts += np.bincount(slots, minlength=pattern_length)
+        position += coeffs.size
+    fraction = np.divide(ones, counts, out=np.full(pattern_length, 0.5), where=counts > 0)
+    return (fraction > 0.5).astype(np.uint8), fraction
+
+
+def _write_image(output_path, image, jpeg_quality):
+    """Grava no formato indicado pela extensão de output_path."""
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    params = []
+    if os.path.splitext(output_path)[1].lower() in ('.jpg', '.jpeg'):
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    if not cv2.imwrite(output_path, image, params):
+        raise ValueError(f"Não foi possível gravar {output_path}")
+
+
+def insert_trigger_watermark(image_path, output_path, trigger_pattern, alpha=0.1, dct_backend='matmul',
+                             jpeg_quality=95):
+    """
+    Insere um watermark com trigger em uma imagem usando DCT em blocos (ver embed_trigger).
     :param image_path: Caminho da imagem original
-    :param output_path: Caminho para salvar a imagem marcada
+    :param output_path: Caminho para salvar a imagem marcada (formato pela extensão)
     :param trigger_pattern: Padrão binário do trigger (ex.: [1, 0, 1, 0])
-    :param alpha: Força do watermark
+    :param alpha: Força do watermark (passo da QIM como fração da faixa dinâmica)
+    :param dct_backend: Backend de DCT
+    :param jpeg_quality: Qualidade de gravação quando a saída é JPEG
     """
-    img = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
     if img is None:
         raise ValueError("Imagem não encontrada")
 
-    # Aplicar DCT
-    dct_img = dct(dct(img.T, norm='ortho').T, norm='ortho')
+    _write_image(output_path, embed_trigger(img, trigger_pattern, alpha, dct_backend=dct_backend), jpeg_quality)
+    print(f"Imagem com trigger salva em {output_path}")
+
+
+def insert_trigger_watermark_dir(input_dir, output_dir, trigger_pattern, alpha=0.1, max_workers=8,
+                                 dct_backend='matmul', jpeg_quality=95):
+    """
+    Insere o trigger em todas as imagens de um diretório (recursivo) com um pool de threads
+    (leitura, codificação e álgebra liberam o GIL). As saídas mantêm a estrutura de
+    subpastas, o nome e o formato de cada original.
+    :param input_dir: Diretório de entrada
+    :param output_dir: Diretório de saída
+    :param trigger_pattern: Padrão binário do trigger
+    :param alpha: Força do watermark
+    :param max_workers: Número de threads
+    :param dct_backend: Backend de DCT
+    :param jpeg_quality: Qualidade de gravação das saídas JPEG
+    :return: Lista de caminhos gravados (arquivos ilegíveis são ignorados)
+    """
+    get_dct_backend(dct_backend)  # resolve (e, em 'auto', mede) o backend uma única vez
 
-    # Inserir trigger nos coeficientes médios
-    h, w = dct_img.shape
-    for i, bit in enumerate(trigger_pattern):
-        if i < h * w:
-            row, col = divmod(i, w)
-            dct_img[row, col] += alpha * (2 * bit - 1)  # +1 para 1, -1 para 0
+    def _process(path):
+        img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return None
+        output_path = os.path.join(output_dir, os.path.relpath(path, input_dir))
+        _write_image(output_path, embed_trigger(img, trigger_pattern, alpha, dct_backend=dct_backend),
+                     jpeg_quality)
+        return output_path
 
-    # Inverter DCT
-    watermarked = idct(idct(dct_img.T, norm='ortho').T, norm='ortho')
-    watermarked = np.clip(watermarked, 0, 255).astype(np.uint8)
+    paths = [path for path, _ in iter_images_from_folder(input_dir, max_workers=max_workers)]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        written = [out for out in executor.map(_process, paths) if out is not None]
 
-    cv2.imwrite(output_path, watermarked)
-    print(f"Imagem com trigger salva em {output_path}")
+    print(f"{len(written)} de {len(paths)} imagens com trigger salvas em {output_dir}")
+    return written
 
-def test_trigger_response(model, trigger_images, expected_responses):
+
+def verify_trigger_watermark(image_path, trigger_pattern, alpha=0.1, threshold=0.75, dct_backend='matmul'):
     """
-    Testa se um modelo responde aos triggers.
-    :param model: Modelo PyTorch carregado
+    Verifica se uma imagem contém o trigger.
+    :param image_path: Caminho da imagem
+    :param trigger_pattern: Padrão binário esperado
+    :param alpha: Força usada na inserção
+    :param threshold: Concordância mínima para considerar o trigger presente
+        (imagens sem trigger ficam em torno de 0.5)
+    :return: Dicionário com bits extraídos, acurácia de bits, concordância e decisão
+    """
+    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Imagem não encontrada")
+    expected = np.asarray(trigger_pattern, dtype=np.uint8)
+    bits, ones = extract_trigger(img, len(expected), alpha, dct_backend=dct_backend)
+    # Fração média de blocos que concordam com o bit esperado
+    agreement = float(np.mean(np.where(expected == 1, ones, 1.0 - ones)))
+    return {
+        'bits': bits.tolist(),
+        'bit_accuracy': float(np.mean(bits == expected)),
+        'agreement': agreement,
+        'detected': agreement >= threshold,
+    }
+
+
+def load_trigger_images(trigger_images, grayscale=True, max_workers=8):
+    """
+    Decodifica o conjunto de triggers em paralelo, uma única vez, para reutilizá-lo
+    contra vários modelos candidatos (ver test_trigger_response).
     :param trigger_images: Lista de caminhos de imagens trigger
+    :param grayscale: Lê em tons de cinza (como a inserção espera a resposta do modelo)
+    :param max_workers: Número de threads de leitura (cv2.imread libera o GIL)
+    :return: Array empilhado (N, H, W[, C]) se todas têm o mesmo formato; senão, lista de arrays
+    """
+    flag = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        images = list(executor.map(lambda path: cv2.imread(path, flag), trigger_images))
+    for path, img in zip(trigger_images, images):
+        if img is None:
+            raise ValueError(f"Imagem trigger não encontrada: {path}")
+    if images and len({img.shape for img in images}) == 1:
+        return np.stack(images)
+    return images
+
+
+def _trigger_batches(images, batch_size):
+    """Índices e lotes (n, C, H, W) das imagens, agrupadas por formato."""
+    import torch
+
+    if isinstance(images, np.ndarray):
+        groups = {images.shape[1:]: np.arange(len(images))}
+    else:
+        groups = {}
+        for index, img in enumerate(images):
+            groups.setdefault(np.shape(img), []).append(index)
+    for indices in groups.values():
+        indices = np.asarray(indices)
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            if isinstance(images, np.ndarray):
+                batch = images[chunk[0]:chunk[-1] + 1]  # visão, sem cópia
+            else:
+                batch = np.stack([images[i] for i in chunk])
+            batch = torch.from_numpy(batch)
+            # Mesmo layout de transforms.ToTensor: (H, W) -> (1, H, W); (H, W, C) -> (C, H, W)
+            batch = batch.unsqueeze(1) if batch.ndim == 3 else batch.permute(0, 3, 1, 2)
+            yield chunk, batch
+
+
+def trigger_response_report(model, trigger_images, expected_responses, batch_size=8, device=None,
+                            max_workers=8):
+    """
+    Avalia em lote a resposta de um modelo aos triggers, sem grafo de autograd.
+    :param model: Modelo PyTorch carregado (colocado em modo eval)
+    :param trigger_images: Caminhos das imagens trigger ou o conjunto já decodificado
+        (array (N, H, W[, C]) ou lista de arrays, ver load_trigger_images)
     :param expected_responses: Respostas esperadas (ex.: classes)
-    :return: Taxa de sucesso
+    :param batch_size: Imagens por forward
+    :param device: Device de execução (None = device dos parâmetros do modelo)
+    :param max_workers: Threads de leitura quando trigger_images são caminhos
+    :return: Dicionário com taxa global, taxa por classe esperada e predições
     """
     import torch
-    from torchvision import transforms
 
-    transform = transforms.Compose([transforms.ToTensor()])
-    correct = 0
-    total = len(trigger_images)
+    if len(trigger_images) and isinstance(trigger_images[0], str):
+        trigger_images = load_trigger_images(trigger_images, max_workers=max_workers)
+    expected = np.asarray(expected_responses, dtype=np.int64)
+    if len(expected) != len(trigger_images):
+        raise ValueError(f"{len(trigger_images)} imagens trigger e {len(expected)} respostas esperadas")
+    if device is None:
+        parameter = next(model.parameters(), None)
+        device = parameter.device if parameter is not None else 'cpu'
+
+    model.eval()
+    predictions = np.empty(len(expected), dtype=np.int64)
+    with torch.inference_mode():
+        for indices, batch in _trigger_batches(trigger_images, batch_size):
+            batch = batch.to(device)
+            # Conversão para float só do lote corrente; uint8 em [0, 1] como ToTensor
+            batch = batch.float().div_(255) if batch.dtype == torch.uint8 else batch.float()
+            predictions[indices] = model(batch).argmax(dim=1).cpu().numpy()
+
+    hits = predictions == expected
+    classes, inverse = np.unique(expected, return_inverse=True)
+    per_class = np.bincount(inverse, weights=hits, minlength=len(classes)) / np.bincount(inverse)
+    return {
+        'accuracy': float(hits.mean()) if len(hits) else 0.0,
+        'per_class': {int(c): float(rate) for c, rate in zip(classes, per_class)},
+        'predictions': predictions,
+    }
+
+
+def test_trigger_response(model, trigger_images, expected_responses, batch_size=8, device=None, max_workers=8):
+    """
+    Testa se um modelo responde aos triggers (ver trigger_response_report).
+    :param model: Modelo PyTorch carregado
+    :param trigger_images: Lista de caminhos de imagens trigger ou conjunto pré-carregado
+    :param expected_responses: Respostas esperadas (ex.: classes)
+    :param batch_size: Imagens por forward
+    :param device: Device de execução
+    :param max_workers: Threads de leitura
+    :return: Taxa de sucesso
+    """
+    report = trigger_response_report(model, trigger_images, expected_responses, batch_size, device, max_workers)
+    print(f"Taxa de resposta aos triggers: {report['accuracy']:.2%}")
+    for cls, rate in report['per_class'].items():
+        print(f"  classe {cls}: {rate:.2%}")
+    return report['accuracy']
 
-    for img_path, expected in zip(trigger_images, expected_responses):
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
-        img = transform(img).unsqueeze(0)
-        output = model(img)
-        pred = torch.argmax(output, dim=1).item()
-        if pred == expected:
-            correct += 1
 
-    accuracy = correct / total
-    print(f"Taxa de resposta aos triggers: {accuracy:.2%}")
-    return accuracy
+# Função de biblioteca, não um teste do pytest (o nome começa com "test_")
+test_trigger_response.__test__ = False
 
 # Exemplo de uso
 if __name__ == "__main__":
     # Inserir trigger
     insert_trigger_watermark("data/demo/imagem_medica_original_demo.jpg", "data/demo/imagem_trigger_demo.jpg", [1, 0, 1, 0])
+    print(verify_trigger_watermark("data/demo/imagem_trigger_demo.jpg", [1, 0, 1, 0]))
 
     # Testar (assumindo modelo carregado)
-    # test_trigger_response(model, ["data/demo/imagem_trigger_demo.jpg"], [0])
\ No newline at end of file
+    # test_trigger_response(model, ["data/demo/imagem_trigger_demo.jpg"], [0])
@@ -25,20 +25,30 @@ from PIL import Image
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
-from torchvision import transforms
+from torch.utils.data import Dataset
+import time
 import warnings
 from src.core.vacina_digital import VacinaDigital
+from utils.data_pipeline import (
+    BatchNormalizer, build_data_loader, default_num_workers, timed_batches, to_uint8_chw
+)
+from src.core.inference import BatchedPredictor
+from utils.synthetic_data import make_synthetic_batch
 
 warnings.filterwarnings('ignore')
 
 class ImagemDataset(Dataset):
-    """Dataset personalizado para imagens com proteção Vacina Digital."""
+    """Dataset personalizado para imagens com proteção Vacina Digital.
 
-    def __init__(self, imagens, labels, transform=None):
+    Sem `transform`, devolve tensores uint8 (C, H, W) em `tamanho`; a
+    normalização é feita por lote (BatchNormalizer).
+    """
+
+    def __init__(self, imagens, labels, transform=None, tamanho=(224, 224)):
         self.imagens = imagens
         self.labels = labels
         self.transform = transform
+        self.tamanho = tamanho
 
     def __len__(self):
         return len(self.imagens)
@@ -49,6 +59,8 @@ class ImagemDataset(Dataset):
 
         if self.transform:
             imagem = self.transform(imagem)
+        else:
+            imagem = to_uint8_chw(imagem, self.tamanho)
 
         return imagem, label
 
@@ -74,38 +86,17 @@ class ModeloCNN(nn.Module):
         x = self.fc2(x)
         return x
 
-def criar_dados_sinteticos(num_amostras=1000, tamanho=(224, 224)):
-    """Cria dataset sintético para demonstração."""
+def criar_dados_sinteticos(num_amostras=1000, tamanho=(224, 224), seed=0):
+    """Cria dataset sintético para demonstração.
+
+    Fundo aleatório com uma forma geométrica por classe (círculo, quadrado,
+    triângulo, losango), gerado em lotes vetorizados por utils.synthetic_data.
+    Retorna um array (N, H, W, 3) uint8 e a lista de rótulos.
+    """
     print("🔧 Criando dataset sintético...")
 
-    imagens = []
-    labels = []
-
-    # Criar imagens de diferentes "classes" (formas geométricas)
-    for i in range(num_amostras):
-        # Fundo aleatório
-        imagem = np.random.randint(0, 255, (tamanho[0], tamanho[1], 3), dtype=np.uint8)
-
-        # Adicionar forma geométrica baseada na classe
-        classe = i % 4  # 4 classes diferentes
-
-        if classe == 0:  # Círculo
-            cv2.circle(imagem, (112, 112), 50, (255, 0, 0), -1)
-            label = 0
-        elif classe == 1:  # Quadrado
-            cv2.rectangle(imagem, (62, 62), (162, 162), (0, 255, 0), -1)
-            label = 1
-        elif classe == 2:  # Triângulo
-            pts = np.array([[112, 62], [62, 162], [162, 162]], np.int32)
-            cv2.fillPoly(imagem, [pts], (0, 0, 255))
-            label = 2
-        else:  # Losango
-            pts = np.array([[112, 62], [162, 112], [112, 162], [62, 112]], np.int32)
-            cv2.fillPoly(imagem, [pts], (255, 255, 0))
-            label = 3
-
-        imagens.append(imagem)
-        labels.append(label)
+    imagens, labels = make_synthetic_batch(num_amostras, size=tamanho, kind='shapes', seed=seed)
+    labels = labels.tolist()
 
     print(f"✅ Dataset criado: {len(imagens)} imagens, {len(set(labels))} classes")
     return imagens, labels
@@ -136,20 +127,24 @@ def aplicar_vacina_dataset(imagens, labels, vacina, frac_vacinados=0.3):
     print(f"✅ Proteção aplicada: {len(indices_protegidos)} imagens vacinadas")
     return imagens_protegidas, labels_protegidas, indices_protegidos
 
-def treinar_modelo_pytorch(imagens, labels, nome_modelo, epochs=10):
-    """Treina um modelo PyTorch."""
+def treinar_modelo_pytorch(imagens, labels, nome_modelo, epochs=10, num_workers=None,
+                           prefetch_factor=2, persistent_workers=True):
+    """Treina um modelo PyTorch.
+
+    Os lotes chegam como uint8 e são normalizados por lote; o tempo de
+    espera por dados e o de computação de cada época são reportados.
+    """
     print(f"🚀 Treinando modelo {nome_modelo} com PyTorch...")
 
     # Preparar dados
-    transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-
-    dataset = ImagemDataset(imagens, labels, transform=transform)
-    dataloader = DataLoader(dataset, batch_size=32, shuffle=True)
+    if num_workers is None:
+        num_workers = default_num_workers()
+    dataset = ImagemDataset(imagens, labels)
+    dataloader = build_data_loader(
+        dataset, batch_size=32, shuffle=True, num_workers=num_workers,
+        prefetch_factor=prefetch_factor, persistent_workers=persistent_workers
+    )
+    normalizador = BatchNormalizer('cpu')
 
     # Modelo
     modelo = ModeloCNN(num_classes=1000)
@@ -162,9 +157,11 @@ def treinar_modelo_pytorch(imagens, labels, nome_modelo, epochs=10):
 
     for epoch in range(epochs):
         perda_total = 0
-        for imagens_batch, labels_batch in dataloader:
+        tempos = {'data_wait': 0.0}
+        inicio = time.perf_counter()
+        for imagens_batch, labels_batch in timed_batches(dataloader, tempos):
             otimizador.zero_grad()
-            outputs = modelo(imagens_batch)
+            outputs = modelo(normalizador(imagens_batch))
             perda = criterio(outputs, labels_batch)
             perda.backward()
             otimizador.step()
@@ -172,7 +169,9 @@ def treinar_modelo_pytorch(imagens, labels, nome_modelo, epochs=10):
 
         perda_media = perda_total / len(dataloader)
         historico_perda.append(perda_media)
-        print(f"  Epoch {epoch+1}/{epochs}: Loss = {perda_media:.4f}")
+        tempo_computacao = time.perf_counter() - inicio - tempos['data_wait']
+        print(f"  Epoch {epoch+1}/{epochs}: Loss = {perda_media:.4f} "
+              f"(dados: {tempos['data_wait']:.2f}s, computação: {tempo_computacao:.2f}s)")
 
     # Salvar modelo
     os.makedirs("results/modelos_reais", exist_ok=True)
@@ -199,27 +198,11 @@ def testar_deteccao(modelo, imagens_teste, labels_teste, vacina, nome_teste):
         img_com_trigger[:, -8:, :] = [255, 0, 255]  # Borda direita
         imagens_com_trigger.append(img_com_trigger)
 
-    # Simular função de predição do modelo
-    def predict_fn(img):
-        # Converter para tensor
-        transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
-        tensor = transform(img).unsqueeze(0)
-
-        with torch.no_grad():
-            output = modelo(tensor)
-            pred = torch.argmax(output, dim=1).item()
-        return pred
+    # Preditor em lote: pré-processamento configurado uma vez, inference_mode
+    preditor = BatchedPredictor(modelo, input_size=(224, 224))
 
     # Testar detecção com imagens que têm trigger
-    deteccoes_trigger = []
-    for img in imagens_com_trigger:
-        pred = predict_fn(img)
-        deteccoes_trigger.append(pred)
+    deteccoes_trigger = preditor.predict_batch(imagens_com_trigger).tolist()
 
     # Calcular taxa de detecção: quantas vezes o modelo prediz target_label quando vê trigger
     target_label = vacina.target_label
@@ -227,12 +210,9 @@ def testar_deteccao(modelo, imagens_teste, labels_teste, vacina, nome_teste):
     taxa_deteccao = predicoes_target / len(imagens_com_trigger) * 100
 
     # Testar acurácia normal (sem trigger)
-    corretas = 0
     total = len(imagens_teste)
-    for img, label in zip(imagens_teste, labels_teste):
-        pred = predict_fn(img)
-        if pred == label:
-            corretas += 1
+    predicoes = preditor.predict_batch(imagens_teste)
+    corretas = int(np.sum(predicoes == np.asarray(labels_teste)))
 
     acuracia_normal = corretas / total * 100
 
@@ -0,0 +1,15 @@
+import pytest
+from utils.synthetic_data import SyntheticImageGenerator
+
+# --- Fixtures compartilhadas ---
+
+@pytest.fixture(scope="session")
+def synthetic_images():
+    """
+    Fábrica de lotes sintéticos (N, H, W, 3) uint8 determinísticos.
+    Uso: synthetic_images(4, size=(64, 64), kind='noise', seed=0).
+    """
+    def _make(num_images, size=(64, 64), kind='noise', seed=0):
+        images, _ = SyntheticImageGenerator(size=size, kind=kind, seed=seed).generate(num_images)
+        return images
+    return _make
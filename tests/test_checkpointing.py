@@ -0,0 +1,30 @@
+import torch
+import torch.nn as nn
+from utils.checkpointing import AsyncCheckpointWriter, clone_state_dict
+
+# --- Testes ---
+
+def test_cloned_state_is_decoupled_from_model():
+    """O estado clonado não deve mudar quando o modelo continua treinando."""
+    model = nn.Linear(4, 2)
+    snapshot = clone_state_dict(model.state_dict())
+    with torch.no_grad():
+        model.weight.add_(1.0)
+    assert not torch.equal(snapshot["weight"], model.weight)
+
+def test_async_writer_persists_latest_checkpoint(tmp_path):
+    """Submissões repetidas do mesmo arquivo gravam o estado mais recente."""
+    model = nn.Linear(4, 2)
+    with AsyncCheckpointWriter(str(tmp_path / "ckpt")) as writer:
+        for epoch in range(5):
+            with torch.no_grad():
+                model.bias.fill_(epoch)
+            writer.submit("modelo_best.pth", {
+                "epoch": epoch,
+                "model_state_dict": clone_state_dict(model.state_dict()),
+            })
+
+    checkpoint = torch.load(tmp_path / "ckpt" / "modelo_best.pth")
+    assert checkpoint["epoch"] == 4
+    assert torch.all(checkpoint["model_state_dict"]["bias"] == 4)
+    assert [p.name for p in (tmp_path / "ckpt").iterdir()] == ["modelo_best.pth"]
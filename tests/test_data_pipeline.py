@@ -0,0 +1,38 @@
+import pytest
+import torch
+from torch.utils.data import TensorDataset
+from torchvision import transforms
+from utils.data_pipeline import (
+    BatchNormalizer,
+    build_data_loader,
+    timed_batches,
+    to_uint8_chw,
+)
+
+# --- Testes ---
+
+def test_batch_normalizer_matches_torchvision(synthetic_images):
+    """Normalizar o lote uint8 deve equivaler a ToTensor + Normalize por imagem."""
+    images = synthetic_images(4, size=(16, 16))
+
+    reference = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    expected = torch.stack([reference(img) for img in images])
+    batch = torch.stack([to_uint8_chw(img) for img in images])
+
+    assert batch.dtype == torch.uint8
+    torch.testing.assert_close(BatchNormalizer()(batch), expected, atol=1e-5, rtol=1e-5)
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_loader_with_workers_and_wait_timing(num_workers):
+    """O DataLoader aceita a configuração de workers e o tempo de espera é medido."""
+    dataset = TensorDataset(torch.zeros(10, 3, 8, 8, dtype=torch.uint8), torch.arange(10))
+    loader = build_data_loader(dataset, batch_size=4, num_workers=num_workers,
+                               prefetch_factor=2, persistent_workers=True)
+    timing = {}
+    labels = torch.cat([y for _, y in timed_batches(loader, timing)])
+
+    assert labels.tolist() == list(range(10))
+    assert timing["data_wait"] > 0
@@ -0,0 +1,133 @@
+import io
+import os
+import zipfile
+import pytest
+import numpy as np
+from PIL import Image
+from utils import dataset_loader
+from utils.dataset_loader import (
+    close_zip_handles,
+    get_dataset_info,
+    iter_images_from_folder,
+    load_image_from_path,
+    load_images_from_folder,
+    load_images_from_zip,
+    probe_dataset,
+    validate_dataset,
+)
+
+# --- Fixtures ---
+
+@pytest.fixture
+def dataset_dir(tmp_path):
+    """Árvore pequena com classes, subpastas aninhadas, pasta oculta e não-imagens."""
+    layout = {
+        "gatos": ["b.jpg", "a.png", "notas.txt"],
+        "gatos/filhotes": ["c.jpeg"],
+        "cachorros": ["d.jpg"],
+        ".cache": ["e.jpg"],
+        ".cache/interno": ["f.jpg"],
+    }
+    for folder, files in layout.items():
+        (tmp_path / folder).mkdir(parents=True, exist_ok=True)
+        for name in files:
+            (tmp_path / folder / name).write_bytes(b"")
+    return tmp_path
+
+# --- Testes ---
+
+def test_scan_is_deterministic_and_prunes_hidden(dataset_dir):
+    """Ordem e labels seguem a pré-ordem por nome; pastas ocultas são ignoradas."""
+    label_map = {}
+    items = list(iter_images_from_folder(str(dataset_dir), label_map=label_map))
+    names = [(p.split(str(dataset_dir))[1].lstrip("/\\"), label) for p, label in items]
+
+    assert [n.replace("\\", "/") for n, _ in names] == [
+        "cachorros/d.jpg", "gatos/a.png", "gatos/b.jpg", "gatos/filhotes/c.jpeg"
+    ]
+    assert label_map == {"cachorros": 0, "gatos": 1, "filhotes": 2}
+
+def test_parallel_scan_matches_sequential(dataset_dir):
+    """A varredura paralela deve produzir exatamente a mesma sequência da sequencial."""
+    sequential = list(iter_images_from_folder(str(dataset_dir), max_workers=1))
+    parallel = list(iter_images_from_folder(str(dataset_dir), max_workers=4, prefetch=1))
+    assert parallel == sequential
+
+def test_load_images_from_folder_limits(dataset_dir):
+    """max_images e recursive=False continuam respeitados."""
+    paths, labels = load_images_from_folder(str(dataset_dir), max_images=2)
+    assert len(paths) == len(labels) == 2
+
+    paths, _ = load_images_from_folder(str(dataset_dir), recursive=False)
+    assert not any("filhotes" in p for p in paths)
+    assert len(paths) == 3
+
+def test_zip_handles_are_pooled(tmp_path):
+    """Leituras zip:// repetidas devem reutilizar um único ZipFile aberto."""
+    zip_path = tmp_path / "fotos.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        for i in range(3):
+            buffer = io.BytesIO()
+            Image.fromarray(np.full((8, 8, 3), i, dtype=np.uint8)).save(buffer, format="PNG")
+            zf.writestr(f"classe/img_{i}.png", buffer.getvalue())
+
+    close_zip_handles()
+    paths, _ = load_images_from_zip(str(zip_path))
+    images = [load_image_from_path(p) for p in paths]
+
+    assert [int(img[0, 0, 0]) for img in images] == [0, 1, 2]
+    assert len(dataset_loader._zip_pool) == 1
+    close_zip_handles()
+    assert not dataset_loader._zip_pool
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requer os.fork")
+def test_zip_pool_is_recreated_after_fork(tmp_path):
+    """Um filho criado com o lock do pool adquirido deve ler o ZIP sem travar."""
+    zip_path = tmp_path / "fotos.zip"
+    with zipfile.ZipFile(zip_path, "w") as zf:
+        buffer = io.BytesIO()
+        Image.fromarray(np.full((8, 8, 3), 7, dtype=np.uint8)).save(buffer, format="PNG")
+        zf.writestr("classe/img.png", buffer.getvalue())
+
+    close_zip_handles()
+    paths, _ = load_images_from_zip(str(zip_path))
+    with dataset_loader._zip_pool_lock:
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                ok = int(load_image_from_path(paths[0])[0, 0, 0]) == 7
+            finally:
+                os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    close_zip_handles()
+
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+def test_header_probe_statistics_and_cache(tmp_path, monkeypatch):
+    """Estatísticas vêm só dos cabeçalhos e a segunda execução usa o índice lateral."""
+    paths = []
+    for i, size in enumerate([(10, 20), (30, 40)]):
+        path = tmp_path / f"img_{i}.png"
+        Image.new("RGB", (size[1], size[0])).save(path)
+        paths.append(str(path))
+    corrupted = tmp_path / "quebrada.jpg"
+    corrupted.write_bytes(b"nao e imagem")
+    paths.append(str(corrupted))
+    cache_path = str(tmp_path / "headers.json")
+
+    info = get_dataset_info(paths, [0, 0, 1], cache_path=cache_path)
+    assert info["min_image_size"] == (10, 20)
+    assert info["max_image_size"] == (30, 40)
+    assert info["mode_distribution"] == {"RGB": 2}
+
+    validation = validate_dataset(paths, [0, 0, 1], cache_path=cache_path)
+    assert validation["valid_images"] == 2
+    assert validation["corrupted_images"] == [str(corrupted)]
+
+    # Com o índice válido, nenhum cabeçalho de imagem boa é relido
+    def _fail(path):
+        raise AssertionError(f"cabeçalho relido: {path}")
+    monkeypatch.setattr(dataset_loader, "probe_image_header", _fail)
+    headers = probe_dataset(paths[:2], cache_path=cache_path)
+    assert [(h["height"], h["width"]) for h in headers] == [(10, 20), (30, 40)]
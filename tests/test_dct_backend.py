@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+from scipy.fftpack import dct, idct
+from src.core import dct_backend as dct_backend_module
+from src.core.dct_backend import DCTBackend, ScipyFFTBackend, available_backends, get_dct_backend
+from src.core.vacina_digital import VacinaDigital
+
+BACKENDS = sorted(available_backends())
+
+# --- Testes ---
+
+@pytest.mark.parametrize("name", BACKENDS)
+def test_backend_matches_reference_dct(name):
+    """Cada backend equivale à DCT ortonormal de referência, em pilhas e em tamanhos ímpares."""
+    backend = get_dct_backend(name)
+    rng = np.random.default_rng(0)
+    for shape in [(5, 8, 8), (9, 15)]:
+        x = rng.random(shape)
+        expected = np.stack([dct(dct(b.T, norm='ortho').T, norm='ortho') for b in x.reshape(-1, *shape[-2:])])
+        np.testing.assert_allclose(backend.dct2(x).reshape(expected.shape), expected, atol=1e-10)
+        np.testing.assert_allclose(backend.idct2(backend.dct2(x)), x, atol=1e-10)
+
+    blocks = rng.random((4, 8, 8), dtype=np.float32)
+    assert backend.dct2(blocks).dtype == np.float32
+
+@pytest.mark.parametrize("embed_name", BACKENDS)
+def test_watermark_detectable_across_backends(embed_name, synthetic_images):
+    """Uma imagem marcada com um backend é detectada com a mesma correlação por todos."""
+    image = synthetic_images(1, size=(64, 64), kind='smooth', seed=2)[0]
+    embedder = VacinaDigital(secret_key="dct_key", alpha=0.05, use_surrogate_model=False,
+                             dct_backend=embed_name)
+    watermarked, pattern = embedder.embed_watermark(image)
+
+    correlations = []
+    for name in BACKENDS:
+        detector = VacinaDigital(secret_key="dct_key", use_surrogate_model=False, dct_backend=name)
+        detected, correlation = detector.detect_watermark(watermarked, pattern)
+        assert detected, f"Watermark de '{embed_name}' não detectado com '{name}'"
+        correlations.append(correlation)
+    np.testing.assert_allclose(correlations, correlations[0], atol=1e-6)
+
+def test_backend_selection_env_and_auto(monkeypatch):
+    """VACINA_DCT_BACKEND força o backend; 'auto' escolhe um disponível e nomes inválidos falham."""
+    monkeypatch.setenv("VACINA_DCT_BACKEND", "matmul")
+    assert get_dct_backend().name == "matmul"
+
+    monkeypatch.delenv("VACINA_DCT_BACKEND")
+    monkeypatch.setattr(dct_backend_module, "_auto_backend", None)
+    assert get_dct_backend("auto").name in BACKENDS
+
+    with pytest.raises(ValueError):
+        get_dct_backend("fftw")
+
+def test_backend_interface_and_workers(monkeypatch):
+    """A interface é abstrata e o scipy.fft usa por padrão o limite de threads do processo."""
+    with pytest.raises(TypeError):
+        DCTBackend()
+
+    calls = []
+    monkeypatch.setattr(dct_backend_module, "default_workers", lambda: 3)
+    monkeypatch.setattr(dct_backend_module.scipy.fft, "dctn", lambda x, **kw: calls.append(kw["workers"]) or x)
+    ScipyFFTBackend().dct2(np.zeros((8, 8)))
+    get_dct_backend("scipy", workers=2).dct2(np.zeros((8, 8)))
+    assert calls == [3, 2]
@@ -0,0 +1,128 @@
+import os
+import cv2
+import numpy as np
+import pytest
+import torch
+from src.forensics.forensic_triggers import (
+    embed_trigger,
+    extract_trigger,
+    insert_trigger_watermark,
+    insert_trigger_watermark_dir,
+    load_trigger_images,
+    test_trigger_response,
+    trigger_response_report,
+    verify_trigger_watermark,
+)
+
+PATTERN = [1, 0, 1, 1, 0, 0, 1]
+
+# --- Fixtures ---
+
+@pytest.fixture
+def color_image(synthetic_images):
+    """Imagem BGR 96x136 (largura não múltipla de 8) com textura suave."""
+    return synthetic_images(1, size=(96, 136), kind='smooth', seed=3)[0]
+
+class MeanThresholdModel(torch.nn.Module):
+    """Classe 1 se a média da imagem passa de 0.5; registra os formatos de entrada."""
+
+    def __init__(self):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.zeros(1))
+        self.input_shapes = []
+
+    def forward(self, x):
+        self.input_shapes.append(tuple(x.shape))
+        assert not torch.is_grad_enabled() and x.dtype == torch.float32 and x.max() <= 1.0
+        mean = x.mean(dim=(1, 2, 3))
+        return torch.stack([0.5 - mean, mean - 0.5], dim=1) + self.weight
+
+# --- Testes ---
+
+def test_embed_preserves_color_and_is_extracted(color_image):
+    """O trigger altera só a luminância, de forma discreta, e é extraído sem erros."""
+    marked = embed_trigger(color_image, PATTERN)
+    assert marked.shape == color_image.shape and marked.dtype == np.uint8
+    assert np.abs(marked.astype(int) - color_image).max() <= 4
+    # Borda fora dos blocos inteiros intacta
+    np.testing.assert_array_equal(marked[:, 136 // 8 * 8:], color_image[:, 136 // 8 * 8:])
+
+    to_ycc = lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb).astype(int)
+    assert np.abs(to_ycc(marked)[..., 1:] - to_ycc(color_image)[..., 1:]).mean() < 0.1
+
+    bits, ones = extract_trigger(marked, len(PATTERN))
+    assert bits.tolist() == PATTERN and np.all((ones == 0) | (ones == 1))
+
+@pytest.mark.parametrize("pattern", [[0, 0, 0, 0], PATTERN])
+def test_unmarked_image_not_detected(color_image, tmp_path, pattern):
+    """Sem trigger, a concordância fica perto do acaso, mesmo para padrões só de zeros."""
+    path = str(tmp_path / "original.png")
+    cv2.imwrite(path, color_image)
+    result = verify_trigger_watermark(path, pattern)
+    assert not result['detected'] and abs(result['agreement'] - 0.5) < 0.15
+
+@pytest.mark.parametrize("extension", [".jpg", ".png"])
+def test_insert_keeps_format_and_survives_encoding(color_image, tmp_path, extension):
+    """A imagem marcada é gravada no formato original e o trigger sobrevive à codificação."""
+    source = str(tmp_path / f"original{extension}")
+    output = str(tmp_path / "saida" / f"marcada{extension}")
+    cv2.imwrite(source, color_image)
+    insert_trigger_watermark(source, output, PATTERN)
+
+    result = verify_trigger_watermark(output, PATTERN)
+    assert result['detected'] and result['bits'] == PATTERN
+    assert cv2.imread(output, cv2.IMREAD_UNCHANGED).shape == color_image.shape
+
+def test_grayscale_16bit_and_alpha_supported(color_image):
+    """Tons de cinza (inclusive 16 bits) e BGRA mantêm formato; o canal alfa não muda."""
+    gray16 = cv2.cvtColor(color_image, cv2.COLOR_BGR2GRAY).astype(np.uint16) * 257
+    marked16 = embed_trigger(gray16, PATTERN)
+    assert marked16.dtype == np.uint16 and marked16.ndim == 2
+    assert extract_trigger(marked16, len(PATTERN))[0].tolist() == PATTERN
+
+    bgra = cv2.cvtColor(color_image, cv2.COLOR_BGR2BGRA)
+    bgra[..., 3] = np.arange(bgra.shape[1], dtype=np.uint8)
+    marked = embed_trigger(bgra, PATTERN)
+    np.testing.assert_array_equal(marked[..., 3], bgra[..., 3])
+    assert extract_trigger(marked, len(PATTERN))[0].tolist() == PATTERN
+
+    with pytest.raises(ValueError):
+        embed_trigger(color_image, [2, 0])
+
+def test_directory_batch_mirrors_tree(synthetic_images, tmp_path):
+    """O lote percorre subpastas e grava cada saída no mesmo caminho relativo e formato."""
+    images = synthetic_images(3, size=(64, 64), kind='smooth', seed=5)
+    relative = ["a.png", os.path.join("sub", "b.jpg"), os.path.join("sub", "c.bmp")]
+    for name, image in zip(relative, images):
+        os.makedirs(os.path.dirname(str(tmp_path / "in" / name)), exist_ok=True)
+        cv2.imwrite(str(tmp_path / "in" / name), image)
+    (tmp_path / "in" / "notas.txt").write_text("não é imagem")
+
+    written = insert_trigger_watermark_dir(str(tmp_path / "in"), str(tmp_path / "out"), PATTERN, max_workers=2)
+    assert sorted(written) == sorted(str(tmp_path / "out" / name) for name in relative)
+    for path in written:
+        assert verify_trigger_watermark(path, PATTERN)['detected']
+
+def test_trigger_response_batched_and_preloaded(tmp_path):
+    """Lotes agrupados por formato, taxa por classe e reuso do conjunto decodificado."""
+    values = [30, 220, 200, 40, 240]
+    shapes = [(16, 16), (16, 16), (24, 20), (16, 16), (24, 20)]
+    paths = []
+    for i, (value, shape) in enumerate(zip(values, shapes)):
+        paths.append(str(tmp_path / f"t{i}.png"))
+        cv2.imwrite(paths[-1], np.full(shape, value, dtype=np.uint8))
+    expected = [0, 1, 1, 1, 1]  # a quarta imagem (escura) não responde
+
+    model = MeanThresholdModel()
+    report = trigger_response_report(model, paths, expected, batch_size=2)
+    assert report['predictions'].tolist() == [0, 1, 1, 0, 1]
+    assert report['accuracy'] == pytest.approx(0.8)
+    assert report['per_class'] == {0: 1.0, 1: pytest.approx(0.75)}
+    assert sorted(model.input_shapes) == [(1, 1, 16, 16), (2, 1, 16, 16), (2, 1, 24, 20)]
+
+    preloaded = load_trigger_images(paths[:2] + paths[3:4])
+    assert isinstance(preloaded, np.ndarray) and preloaded.shape == (3, 16, 16)
+    assert test_trigger_response(MeanThresholdModel(), preloaded, [0, 1, 0]) == 1.0
+
+    with pytest.raises(ValueError):
+        load_trigger_images([str(tmp_path / "inexistente.png")])
@@ -0,0 +1,48 @@
+import pytest
+import numpy as np
+from src.core.vacina_digital import VacinaDigital
+from src.core.geometric_sync import GeometricSynchronizer
+from robustness_tests import (
+    attack_cropping,
+    attack_rotation,
+    load_benchmark_images,
+)
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def vacina() -> VacinaDigital:
+    """Instância sem motor adversarial para manter o teste rápido."""
+    return VacinaDigital(secret_key="sync_key", alpha=0.05, use_surrogate_model=False)
+
+@pytest.fixture(scope="module")
+def protected(vacina):
+    """Imagem protegida (referência de sincronização) e padrão de watermark."""
+    image = load_benchmark_images(num_images=1, size=(224, 224), seed=3)[0]
+    protected_image, _ = vacina.protect_image(image, original_label=0, verbose=False)
+    _, pattern = vacina.embed_watermark(image)
+    return protected_image, pattern
+
+# --- Testes ---
+
+def test_identity_is_preserved(protected):
+    """Sem ataque geométrico, a ressincronização não deve alterar a imagem."""
+    image, _ = protected
+    aligned, transform = GeometricSynchronizer().resynchronize(image.copy(), image)
+    assert transform.is_identity()
+    np.testing.assert_array_equal(aligned, image)
+
+@pytest.mark.parametrize("attack", [
+    lambda img: attack_rotation(img, -10),
+    lambda img: attack_cropping(img, 0.8),
+], ids=["rotation_-10", "cropping_0.8"])
+def test_resync_recovers_detection(vacina, protected, attack):
+    """Rotação e recorte derrubam a detecção direta, mas não a ressincronizada."""
+    image, pattern = protected
+    attacked = attack(image)
+
+    detected_plain, _ = vacina.detect_watermark(attacked, pattern)
+    detected_sync, correlation = vacina.detect_watermark_synchronized(attacked, pattern, image)
+
+    assert not detected_plain
+    assert detected_sync, f"Correlação após ressincronização: {correlation:.3f}"
@@ -0,0 +1,77 @@
+import os
+import pickle
+import pytest
+import numpy as np
+from PIL import Image
+from utils import image_cache as image_cache_module
+from utils.image_cache import DecodedImageCache
+
+# --- Fixtures ---
+
+@pytest.fixture
+def image_paths(tmp_path):
+    """Três PNGs de tamanhos diferentes com cores distintas."""
+    paths = []
+    for i, size in enumerate([(40, 60), (64, 64), (100, 30)]):
+        path = tmp_path / f"img_{i}.png"
+        Image.new("RGB", (size[1], size[0]), color=(50 * i, 10, 200)).save(path)
+        paths.append(str(path))
+    return paths
+
+# --- Testes ---
+
+def test_cache_decodes_once_and_resizes(tmp_path, image_paths, monkeypatch):
+    """O cache guarda uint8 no tamanho pedido e não redecodifica em nova instância."""
+    cache_dir = str(tmp_path / "cache")
+    cache = DecodedImageCache(cache_dir, size=(32, 48)).build(image_paths)
+
+    assert cache.array.shape == (3, 32, 48, 3)
+    assert cache.get(image_paths[1]).dtype == np.uint8
+    assert tuple(cache.get(image_paths[2])[0, 0]) == (100, 10, 200)
+
+    def _fail(path):
+        raise AssertionError(f"imagem redecodificada: {path}")
+    monkeypatch.setattr(image_cache_module, "load_image_from_path", _fail)
+
+    reopened = DecodedImageCache(cache_dir, size=(32, 48)).build(image_paths)
+    np.testing.assert_array_equal(reopened.array, cache.array)
+    np.testing.assert_array_equal(reopened.rows(image_paths[::-1]), [2, 1, 0])
+
+    # Instâncias enviadas a workers do DataLoader não carregam o memmap
+    clone = pickle.loads(pickle.dumps(reopened))
+    np.testing.assert_array_equal(clone.get(image_paths[0]), cache.get(image_paths[0]))
+
+def test_cache_refreshes_modified_files(tmp_path, image_paths):
+    """Arquivos alterados (mtime/tamanho) são redecodificados na mesma linha."""
+    cache_dir = str(tmp_path / "cache")
+    DecodedImageCache(cache_dir, size=(16, 16)).build(image_paths)
+
+    Image.new("RGB", (20, 20), color=(1, 2, 3)).save(image_paths[0])
+    stat = os.stat(image_paths[0])
+    os.utime(image_paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache = DecodedImageCache(cache_dir, size=(16, 16)).build(image_paths)
+    assert len(cache) == 3
+    assert tuple(cache.get(image_paths[0])[5, 5]) == (1, 2, 3)
+
+def test_cache_retries_failed_decodes(tmp_path, image_paths, monkeypatch):
+    """Uma falha de leitura não é servida pelo cache e é decodificada de novo no próximo build()."""
+    cache_dir = str(tmp_path / "cache")
+    original = image_cache_module.load_image_from_path
+
+    def flaky(path):
+        if path == image_paths[1]:
+            raise OSError("erro de E/S transitório")
+        return original(path)
+
+    monkeypatch.setattr(image_cache_module, "load_image_from_path", flaky)
+    cache = DecodedImageCache(cache_dir, size=(16, 16)).build(image_paths)
+    assert image_paths[1] not in cache and image_paths[2] in cache
+    with pytest.raises(KeyError):
+        cache.get(image_paths[1])
+
+    monkeypatch.setattr(image_cache_module, "load_image_from_path", original)
+    cache = DecodedImageCache(cache_dir, size=(16, 16)).build(image_paths)
+    assert image_paths[1] in cache
+    assert tuple(cache.get(image_paths[1])[0, 0]) == (50, 10, 200)
+    np.testing.assert_array_equal(cache.rows(image_paths), [0, 1, 2])
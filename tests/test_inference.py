@@ -0,0 +1,57 @@
+import pytest
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import transforms
+from src.core.inference import BatchedPredictor
+from src.core.vacina_digital import VacinaDigital
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def model() -> nn.Module:
+    """CNN pequena e determinística."""
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(3, 8, 3, padding=1), nn.ReLU(), nn.AdaptiveAvgPool2d(4),
+        nn.Flatten(), nn.Linear(8 * 16, 5)
+    ).eval()
+
+# --- Testes ---
+
+def test_batched_predictions_match_per_image_transform(model, synthetic_images):
+    """Lote em blocos pelo orçamento de memória = transform + forward imagem a imagem."""
+    images = synthetic_images(7, size=(32, 32), kind='smooth')
+    reference = transforms.Compose([
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    with torch.no_grad():
+        expected = [model(reference(img).unsqueeze(0)).argmax(1).item() for img in images]
+
+    # Orçamento minúsculo: força blocos de uma imagem
+    predictor = BatchedPredictor(model, input_size=(32, 32), memory_budget_mb=1e-3)
+    assert predictor.chunk_size(predictor.preprocess(images)) == 1
+    assert predictor.predict_batch(images).tolist() == expected
+    assert predictor(images[0]) == expected[0]
+
+    roomy = BatchedPredictor(model, input_size=(32, 32), max_batch_size=3)
+    assert roomy.chunk_size(roomy.preprocess(images)) == 3
+    assert roomy.predict_batch(list(images)).tolist() == expected
+
+def test_verify_model_accepts_predict_batch_fn():
+    """verify_model usa predict_batch_fn numa única chamada quando informada."""
+    vacina = VacinaDigital(target_label=7, use_surrogate_model=False)
+    calls = []
+
+    def predict_batch(images):
+        calls.append(len(images))
+        return np.full(len(images), 7)
+
+    detected, match_rate, predictions = vacina.verify_model(
+        None, [np.zeros((16, 16, 3), np.uint8)] * 4, 7, predict_batch_fn=predict_batch
+    )
+    assert calls == [4]
+    assert detected and match_rate == 1.0 and predictions == [7] * 4
+    with pytest.raises(ValueError):
+        vacina.verify_model(None, [], 7)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from src.core.vacina_digital import VacinaDigital, generate_watermark_pattern
+from src.core.multikey_detection import MultiKeyDetector
+
+KEYS = {f"membro_{i}": f"chave_membro_{i}" for i in range(6)}
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def vacinas():
+    """Uma VacinaDigital por membro do banco."""
+    return {label: VacinaDigital(secret_key=key, alpha=0.05, use_surrogate_model=False, dct_backend='matmul')
+            for label, key in KEYS.items()}
+
+@pytest.fixture(scope="module")
+def detector(tmp_path_factory):
+    """Banco 64x72 com as seis chaves."""
+    path = str(tmp_path_factory.mktemp("banco") / "padroes.npy")
+    return MultiKeyDetector.build(KEYS, (64, 72), path, dct_backend='matmul')
+
+# --- Testes ---
+
+def test_scores_match_detect_watermark(detector, vacinas, synthetic_images):
+    """Cada coluna coincide com detect_watermark da respectiva chave, inclusive em recortes."""
+    image = synthetic_images(1, size=(64, 72), kind='smooth', seed=1)[0]
+    marked, _ = vacinas["membro_3"].embed_watermark(image)
+    batch = [marked, image, marked[5:50, :40]]
+    scores = detector.scores(batch)
+    assert scores.shape == (3, len(KEYS)) and scores.dtype == np.float32
+
+    for row, test_image in enumerate(batch):
+        for col, (label, vacina) in enumerate(vacinas.items()):
+            pattern = generate_watermark_pattern(vacina.seed, 64, 72)
+            _, expected = vacina.detect_watermark(test_image, pattern)
+            assert scores[row, col] == pytest.approx(expected, abs=1e-4)
+
+def test_attribute_and_reopen(detector, synthetic_images):
+    """A imagem é atribuída ao dono; sem watermark, a ninguém. O banco reabre do disco."""
+    image = synthetic_images(1, size=(64, 72), kind='smooth', seed=2)[0]
+    owner = VacinaDigital(secret_key=KEYS["membro_4"], alpha=0.05, use_surrogate_model=False)
+    marked, _ = owner.embed_watermark(image)
+
+    reopened = MultiKeyDetector(detector.bank_path)
+    assert isinstance(reopened.bank, np.memmap)
+    label, score = reopened.attribute(marked)
+    assert label == "membro_4" and score > 0.3
+    assert reopened.attribute(image)[0] is None
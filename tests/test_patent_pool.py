@@ -0,0 +1,264 @@
+import os
+import json
+import shutil
+from datetime import datetime
+import threading
+import pytest
+from patent_pool_sistema import (
+    MODELO_RELATORIO_LICENCA, MembroPatentPool, PatentPoolVacinaDigital, _modelo_posicional,
+    centavos_de_texto, limites_periodo, para_centavos, ratear_centavos
+)
+
+# --- Fixtures ---
+
+@pytest.fixture
+def pool(tmp_path):
+    """Pool com três membros e uma licença, persistido em diretório temporário."""
+    pool = PatentPoolVacinaDigital(diretorio_base=str(tmp_path / "pool"))
+    for nome, dados in [("A", 500), ("B", 2000), ("C", 100)]:
+        pool.adicionar_membro(MembroPatentPool(nome, 'empresa', dados, {}, f"hash_{nome}"))
+    pool.id_licenca = pool.conceder_licenca("Licenciatário", 'global', 'internacional', 12)
+    yield pool
+    pool.fechar()
+
+# --- Testes ---
+
+def test_rateio_preserva_centavos():
+    """O método dos maiores restos distribui exatamente o valor, proporcionalmente."""
+    cotas = ratear_centavos(1000, [1, 1, 1]).tolist()
+    assert sum(cotas) == 1000 and sorted(cotas) == [333, 333, 334]
+    assert ratear_centavos(10, [0, 0]).tolist() == [0, 0]
+    # Produto valor * peso acima de int64 não transborda
+    assert ratear_centavos(10 ** 15, [10 ** 6, 1]).sum() == 10 ** 15
+
+def test_centavos_de_texto_equivale_a_para_centavos():
+    """A conversão vetorizada de texto arredonda como a conversão de um único valor."""
+    textos = ['10.005', '0.01', '3.3', '7', '-2.345', '1e2', '99999.994']
+    assert centavos_de_texto(textos).tolist() == [para_centavos(t) for t in textos]
+
+def test_centavos_de_texto_rejeita_valores_nao_decimais():
+    """Valores vazios, só sinal ou não numéricos não viram zero centavos."""
+    for invalido in ('', ' ', '-', '+', '.', 'abc', 'nan', '1,5', '1e'):
+        with pytest.raises(ValueError):
+            centavos_de_texto(['1.00', invalido])
+    assert centavos_de_texto(['.5', '5.', '+1']).tolist() == [50, 500, 100]
+
+def test_fundos_rateados_sobre_o_total_do_lote(pool):
+    """Os fundos recebem a fração exata do lote, sem perder o resto de cada pagamento."""
+    resumo = pool.registrar_pagamentos_em_lote([pool.id_licenca] * 1000, [7] * 1000)
+    assert resumo['fundos_centavos'] == {'fundo_reserva': 700, 'fundo_pesquisa': 350,
+                                         'fundo_juridico': 350, 'nao_distribuido': 0}
+    assert sum(m.royalties_centavos for m in pool.membros.values()) == 7000 - 1400
+
+def test_pagamento_distribui_sem_perder_centavos(pool):
+    """Cada pagamento fecha em centavos entre fundos e membros, sem exportar JSON."""
+    for valor in (0.07, 1234.56, 99999.99):
+        assert pool.registrar_pagamento_royalty(pool.id_licenca, valor)
+    assert not pool.registrar_pagamento_royalty("inexistente", 10.0)
+
+    total = pool.total_royalties_centavos
+    assert total == 7 + 123456 + 9999999
+    membros = sum(m.royalties_centavos for m in pool.membros.values())
+    assert membros + sum(pool.saldos_fundos.values()) == total
+    assert pool.licencas[pool.id_licenca].royalties_centavos == total
+    assert os.listdir(os.path.join(pool.diretorio_base, "membros")) == []
+
+    assert pool.exportar_json() == 4
+    assert len(os.listdir(os.path.join(pool.diretorio_base, "membros"))) == 3
+
+def test_livro_razao_e_fonte_de_verdade_entre_instancias(pool):
+    """Instâncias concorrentes no mesmo diretório somam seus lotes; reabrir restaura o estado."""
+    outras = [PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base) for _ in range(3)]
+
+    def pagar(instancia):
+        for _ in range(20):
+            instancia.registrar_pagamento_royalty(pool.id_licenca, 10.01)
+
+    threads = [threading.Thread(target=pagar, args=(o,)) for o in outras]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    reaberto = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+    stats = reaberto.obter_estatisticas()
+    assert reaberto.id == pool.id
+    assert stats['total_membros'] == 3 and stats['licencas_ativas'] == 1
+    assert reaberto.total_royalties_centavos == 60 * 1001
+    assert sum(m.royalties_centavos for m in reaberto.membros.values()) + \
+        sum(reaberto.saldos_fundos.values()) == 60 * 1001
+    for instancia in outras + [reaberto]:
+        instancia.fechar()
+
+def test_rateio_usa_membros_do_livro_razao(pool):
+    """Um membro incluído por outra instância entra no rateio de uma instância já aberta."""
+    outra = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+    novo = outra.adicionar_membro(MembroPatentPool("D", 'empresa', 2600, {}, "hash_D"))
+    outra.fechar()
+
+    pool.registrar_pagamento_royalty(pool.id_licenca, 1000.0)
+    assert novo not in pool.membros
+
+    reaberto = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base, usar_snapshot=False)
+    cotas = {m.nome: m.royalties_centavos for m in reaberto.membros.values()}
+    assert cotas["D"] == cotas["A"] + cotas["B"] + cotas["C"] > 0
+    assert sum(cotas.values()) + sum(reaberto.saldos_fundos.values()) == 100000
+    reaberto.fechar()
+
+def test_importacao_em_lote_csv_e_jsonl(pool, tmp_path):
+    """Importações CSV/JSONL fecham em centavos; licença desconhecida rejeita o lote inteiro."""
+    csv_path = tmp_path / "pagamentos.csv"
+    csv_path.write_text(
+        "id_licenca,valor,data_pagamento\n"
+        f"{pool.id_licenca},10.005,2025-11-01\n"
+        f"{pool.id_licenca},0.01,\n"
+    )
+    resumo = pool.importar_pagamentos(str(csv_path))
+    assert resumo['num_pagamentos'] == 2 and resumo['total_centavos'] == 1002
+
+    jsonl_path = tmp_path / "pagamentos.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(r) for r in [
+        {'id_licenca': pool.id_licenca, 'valor': 0.1},
+        {'id_licenca': pool.id_licenca, 'valor': "3.30"},
+    ]))
+    assert pool.importar_pagamentos(str(jsonl_path))['total_centavos'] == 340
+
+    total = pool.total_royalties_centavos
+    assert total == 1342
+    assert sum(m.royalties_centavos for m in pool.membros.values()) + \
+        sum(pool.saldos_fundos.values()) == total
+
+    with pytest.raises(ValueError):
+        pool.registrar_pagamentos_em_lote([pool.id_licenca, "inexistente"], [100, 100])
+    csv_path.write_text(f"id_licenca,valor\n{pool.id_licenca},5.00\n{pool.id_licenca},\n")
+    with pytest.raises(ValueError):
+        pool.importar_pagamentos(str(csv_path))
+    jsonl_path.write_text(json.dumps({'id_licenca': pool.id_licenca}))
+    with pytest.raises(ValueError):
+        pool.importar_pagamentos(str(jsonl_path))
+    assert pool.total_royalties_centavos == total
+    assert pool.ledger.consultar("SELECT COUNT(*) FROM pagamentos")[0][0] == 4
+
+def test_snapshot_restaura_indices_e_invalida_apos_escrita(pool):
+    """O snapshot reproduz os índices do livro-razão e é ignorado após nova escrita."""
+    for prazo in (1, 6, 24):
+        pool.conceder_licenca("Outro", 'individual', 'nacional', prazo)
+    pool.salvar_snapshot()
+
+    do_snapshot = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+    do_ledger = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base, usar_snapshot=False)
+    assert do_snapshot.origem_estado == 'snapshot' and do_ledger.origem_estado == 'ledger'
+    for instancia in (do_snapshot, do_ledger):
+        assert set(instancia.licencas) == set(pool.licencas)
+        assert instancia.licencas_por_licenciatario == pool.licencas_por_licenciatario
+        assert instancia.licencas_por_status == pool.licencas_por_status
+        assert instancia.licencas_por_expiracao == pool.licencas_por_expiracao
+        assert sorted(instancia._fila_expiracoes) == sorted(pool._fila_expiracoes)
+
+    do_ledger.conceder_licenca("Novo", 'global', 'internacional', 12)
+    reaberto = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+    assert reaberto.origem_estado == 'ledger' and len(reaberto.licencas) == 5
+    for instancia in (do_snapshot, do_ledger, reaberto):
+        instancia.fechar()
+
+def test_snapshot_invalido_cai_no_livro_razao(pool):
+    """Snapshot corrompido ou com estrutura inesperada é tratado como ausente."""
+    pool.salvar_snapshot()
+    with open(pool.caminho_snapshot, 'r', encoding='utf-8') as f:
+        estado = json.load(f)
+    del estado['indices']
+    for conteudo in ("\x80\x04 não é JSON", json.dumps(estado)):
+        with open(pool.caminho_snapshot, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        reaberto = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+        assert reaberto.origem_estado == 'ledger'
+        assert set(reaberto.licencas) == set(pool.licencas)
+        reaberto.fechar()
+
+def test_indices_e_heap_de_expiracoes(pool):
+    """Consultas por índice, próximas expirações pelo heap e expiração persistida."""
+    curta = pool.conceder_licenca("Outro", 'individual', 'nacional', 1)
+    media = pool.conceder_licenca("Outro", 'empresarial', 'nacional', 6)
+
+    assert [l.id for l in pool.buscar_licencas(licenciatario="Outro")] == [curta, media]
+    assert [l.id for l in pool.proximas_expiracoes(2)] == [curta, media]
+    assert len(pool._fila_expiracoes) == 3
+
+    referencia = pool.licencas[media].data_expiracao
+    assert pool.expirar_licencas(referencia) == [curta, media]
+    assert pool.licencas_ativas == 1
+    assert [l.id for l in pool.buscar_licencas(licenciatario="Outro", status='expirada')] == [curta, media]
+    assert pool.proximas_expiracoes(5) == [pool.licencas[pool.id_licenca]]
+
+    reaberto = PatentPoolVacinaDigital(diretorio_base=pool.diretorio_base)
+    assert reaberto.licencas[curta].status == 'expirada' and reaberto.licencas_ativas == 1
+    reaberto.fechar()
+
+def test_importar_diretorio_json_reconstroi_pool(pool, tmp_path):
+    """Um pool novo é reconstruído a partir da exportação JSON, lida em paralelo."""
+    pool.registrar_pagamento_royalty(pool.id_licenca, 100.0)
+    pool.exportar_json()
+
+    novo = PatentPoolVacinaDigital(diretorio_base=str(tmp_path / "novo"))
+    assert novo.importar_diretorio_json(pool.diretorio_base, max_workers=4, tamanho_bloco=1) == \
+        {'membros': 3, 'licencas': 1}
+    assert novo.importar_diretorio_json(pool.diretorio_base) == {'membros': 0, 'licencas': 0}
+    assert {m.id: m.royalties_centavos for m in novo.membros.values()} == \
+        {m.id: m.royalties_centavos for m in pool.membros.values()}
+    assert novo.total_dados_protegidos == pool.total_dados_protegidos
+    assert novo.buscar_licencas(licenciatario="Licenciatário")[0].id == pool.id_licenca
+    novo.fechar()
+
+def test_livro_razao_novo_importa_json_existentes(pool, tmp_path):
+    """Um diretório só com os JSON (sem livro-razão) é importado ao abrir o pool."""
+    pool.exportar_json()
+    destino = tmp_path / "copia"
+    for subdiretorio in ("membros", "licencas"):
+        shutil.copytree(os.path.join(pool.diretorio_base, subdiretorio), destino / subdiretorio)
+
+    copia = PatentPoolVacinaDigital(diretorio_base=str(destino))
+    assert set(copia.membros) == set(pool.membros) and set(copia.licencas) == set(pool.licencas)
+    copia.fechar()
+    reaberto = PatentPoolVacinaDigital(diretorio_base=str(destino), usar_snapshot=False)
+    assert len(reaberto.membros) == 3 and len(reaberto.licencas) == 1
+    reaberto.fechar()
+
+def test_modelo_posicional_equivale_ao_nomeado():
+    """O modelo reescrito por posições produz o mesmo texto que o modelo nomeado."""
+    colunas = ['id', 'licenciatario', 'tipo_licenca', 'abrangencia', 'valor_royalty',
+               'recebido_periodo', 'recebido_total', 'status', 'data_expiracao']
+    linha = ('x{y}', 'A', 'global', 'nacional', 0.025, 1.5, 10.0, 'ativa', '2026-01-01')
+    assert _modelo_posicional(MODELO_RELATORIO_LICENCA, colunas).format(*linha) == \
+        MODELO_RELATORIO_LICENCA.format_map(dict(zip(colunas, linha)))
+    assert limites_periodo("12", "2025") == ("2025-12-01", "2026-01-01")
+
+def test_relatorio_mensal_filtra_periodo_e_pool_vazio(pool, tmp_path):
+    """Pagamentos fora do período não entram; pool vazio não divide por zero."""
+    agora = datetime.now()
+    mes, ano = f"{agora.month:02d}", str(agora.year)
+    inicio, fim = limites_periodo(mes, ano)
+    pool.registrar_pagamentos_em_lote([pool.id_licenca] * 2, [1000, 250], [inicio, fim])
+
+    texto = open(pool.gerar_relatorio_mensal(mes, ano), encoding='utf-8').read()
+    assert "Membros Ativos: 3" in texto and "Licenças Vigentes no Período: 1" in texto
+    assert "Pagamentos no Período: 1 (R$ 10.00)" in texto
+    assert "Recebido no Período: R$ 10.00" in texto and "Recebido (total): R$ 12.50" in texto
+
+    antigo = open(pool.gerar_relatorio_mensal("01", "2000"), encoding='utf-8').read()
+    assert "Licenças Vigentes no Período: 0" in antigo and "n/d" in antigo
+
+    vazio = PatentPoolVacinaDigital(diretorio_base=str(tmp_path / "vazio"))
+    assert "Membros Ativos: 0" in open(vazio.gerar_relatorio_mensal(mes, ano), encoding='utf-8').read()
+    vazio.fechar()
+
+def test_relatorios_mensais_em_paralelo(pool):
+    """Vários períodos geram um arquivo cada, iguais aos gerados individualmente."""
+    periodos = [("01", "2030"), ("02", "2030"), ("03", "2030")]
+    caminhos = pool.gerar_relatorios_mensais(periodos, max_workers=2)
+    assert [os.path.basename(c) for c in caminhos] == \
+        ["relatorio_2030_01.txt", "relatorio_2030_02.txt", "relatorio_2030_03.txt"]
+    paralelo = open(caminhos[1], encoding='utf-8').read().splitlines()
+    individual = open(pool.gerar_relatorio_mensal("02", "2030"), encoding='utf-8').read().splitlines()
+    # Ignora a linha com a data de geração
+    assert [l for l in paralelo if not l.startswith("Data de")] == \
+        [l for l in individual if not l.startswith("Data de")]
@@ -0,0 +1,39 @@
+import json
+import time
+from utils.profiling import SpanProfiler
+
+# --- Testes ---
+
+def test_nested_spans_record_wall_and_cpu():
+    """Spans aninhados registram caminho, profundidade, parede, CPU e RSS."""
+    profiler = SpanProfiler()
+    with profiler.span("treino", epochs=2):
+        with profiler.span("epoca"):
+            sum(i * i for i in range(200_000))
+        time.sleep(0.02)
+
+    summary = profiler.summary()
+    assert set(summary) == {"treino", "treino/epoca"}
+    assert summary["treino"]["wall_s"] >= summary["treino/epoca"]["wall_s"] + 0.02
+    assert summary["treino/epoca"]["cpu_s"] > 0
+    assert [s["depth"] for s in profiler.to_dict()["spans"]] == [0, 1]
+
+def test_merged_profiles_export_chrome_trace(tmp_path):
+    """Perfis de processos filhos são mesclados e exportados como eventos 'X'."""
+    main, child = SpanProfiler("main"), SpanProfiler("celula")
+    with child.span("train"):
+        pass
+    child_profile = json.loads(json.dumps(child.to_dict()))
+    child_profile["spans"][0]["pid"] = main.pid + 1
+
+    with main.span("grid"):
+        main.merge(child_profile)
+
+    trace_path = tmp_path / "trace.json"
+    main.export_chrome_trace(str(trace_path))
+    events = json.loads(trace_path.read_text())["traceEvents"]
+
+    complete = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert set(complete) == {"grid", "train"}
+    assert complete["train"]["pid"] != complete["grid"]["pid"]
+    assert {e["args"]["name"] for e in events if e["ph"] == "M"} == {"main", "celula"}
@@ -0,0 +1,56 @@
+import json
+import pytest
+import numpy as np
+from src.core.vacina_digital import VacinaDigital
+from robustness_tests import (
+    RobustnessBenchmark,
+    default_attack_battery,
+    load_benchmark_images,
+)
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def vacina() -> VacinaDigital:
+    """Instância sem motor adversarial para manter o benchmark rápido."""
+    return VacinaDigital(secret_key="bench_key", alpha=0.05, use_surrogate_model=False)
+
+@pytest.fixture(scope="module")
+def benchmark(vacina) -> RobustnessBenchmark:
+    """Benchmark executado sobre um corpus sintético pequeno."""
+    battery = default_attack_battery()
+    attacks = {name: battery[name] for name in ("sem_ataque", "jpeg_q90", "noise_std5")}
+    bench = RobustnessBenchmark(vacina, attacks=attacks, seed=1)
+    clean = load_benchmark_images(num_images=4, size=(64, 64), seed=1)
+    bench.run(clean)
+    return bench
+
+# --- Testes ---
+
+def test_attack_battery_preserves_shape():
+    """Todo ataque da bateria padrão deve devolver uma imagem do mesmo tamanho."""
+    image = load_benchmark_images(num_images=1, size=(64, 64))[0]
+    rng = np.random.default_rng(0)
+    for name, attack in default_attack_battery().items():
+        attacked = attack(image, rng)
+        assert attacked.shape == image.shape, f"Ataque '{name}' alterou o tamanho da imagem."
+
+def test_benchmark_separates_clean_and_protected(benchmark):
+    """Sem ataque, o detector deve separar perfeitamente limpas e protegidas (AUC = 1)."""
+    result = benchmark.results["sem_ataque"]
+    assert result.roc_auc == pytest.approx(1.0)
+    assert result.true_positive_rate == 1.0
+    assert result.false_positive_rate == 0.0
+    assert result.num_samples == 8
+
+def test_benchmark_report_is_machine_readable(benchmark, tmp_path):
+    """O relatório deve ser JSON estrito, com latências e curva ROC por ataque."""
+    report_path = tmp_path / "report.json"
+    benchmark.save_report(str(report_path))
+
+    report = json.loads(report_path.read_text(), parse_constant=lambda c: pytest.fail(c))
+    assert set(report["attacks"]) == {"sem_ataque", "jpeg_q90", "noise_std5"}
+    for entry in report["attacks"].values():
+        percentiles = entry["latency_percentiles"]
+        assert 0 < percentiles["p50"] <= percentiles["p99"]
+        assert len(entry["roc_curve"]["fpr"]) == len(entry["roc_curve"]["tpr"])
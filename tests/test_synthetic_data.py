@@ -0,0 +1,49 @@
+import pytest
+import numpy as np
+from utils.synthetic_data import SHAPE_COLORS, SyntheticImageGenerator, make_synthetic_batch
+
+# --- Testes ---
+
+def test_shapes_batch_has_class_shapes():
+    """Cada imagem do tipo 'shapes' traz a cor da sua classe no centro."""
+    images, labels = make_synthetic_batch(8, size=(64, 64), kind='shapes', seed=3)
+
+    assert images.shape == (8, 64, 64, 3) and images.dtype == np.uint8
+    assert labels.tolist() == [0, 1, 2, 3] * 2
+    for image, label in zip(images, labels):
+        np.testing.assert_array_equal(image[36, 32], SHAPE_COLORS[label])
+
+def test_stream_and_memmap_match_in_memory_batch(tmp_path):
+    """Fluxo e memmap com a mesma semente reproduzem o lote em memória, sem depender do lote."""
+    generator = SyntheticImageGenerator(size=(32, 32), kind='smooth', seed=7)
+    images, labels = generator.generate(150)
+
+    streamed = [batch for batch, _ in generator.stream(batch_size=37, num_images=150)]
+    np.testing.assert_array_equal(np.concatenate(streamed), images)
+
+    mapped, mapped_labels = generator.to_memmap(str(tmp_path / "sinteticas.npy"), 150, batch_size=50)
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, images)
+    np.testing.assert_array_equal(mapped_labels, labels)
+
+    # Fluxo infinito: continua além de qualquer tamanho fixo, e sementes diferem
+    stream = generator.stream(batch_size=100)
+    assert [len(next(stream)[0]) for _ in range(3)] == [100, 100, 100]
+    assert not np.array_equal(make_synthetic_batch(2, (32, 32), 'noise', seed=1)[0],
+                              make_synthetic_batch(2, (32, 32), 'noise', seed=2)[0])
+
+def test_single_image_depends_only_on_index():
+    """Qualquer intervalo reproduz as mesmas imagens, inclusive com tamanho sem múltiplo de 8 bytes."""
+    generator = SyntheticImageGenerator(size=(7, 5), kind='noise', seed=11)
+    images = generator.images(0, 10)
+    assert images.shape == (10, 7, 5, 3)
+    for index in (0, 3, 9):
+        np.testing.assert_array_equal(generator.images(index, index + 1)[0], images[index])
+    assert not np.array_equal(images[0], images[1])
+
+def test_invalid_kind_raises():
+    """Tipos desconhecidos e classes além das formas disponíveis são rejeitados."""
+    with pytest.raises(ValueError):
+        SyntheticImageGenerator(kind='fractal')
+    with pytest.raises(ValueError):
+        SyntheticImageGenerator(kind='shapes', num_classes=5)
@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from src.core.vacina_digital import VacinaDigital
+from src.core.trigger_detection import BorderTriggerDetector
+
+# --- Fixtures ---
+
+@pytest.fixture(scope="module")
+def vacina() -> VacinaDigital:
+    """Instância com borda fina e cor não padrão."""
+    return VacinaDigital(secret_key="trigger_key", alpha=0.05, border_thickness=4,
+                         border_color=(0, 200, 50), use_surrogate_model=False)
+
+@pytest.fixture(scope="module")
+def batch(vacina, synthetic_images):
+    """Lote com 3 imagens limpas seguidas de 3 protegidas."""
+    clean = synthetic_images(3, size=(64, 64))
+    protected = np.stack([vacina.protect_image(img, 0, verbose=False)[0] for img in clean])
+    return np.concatenate([clean, protected])
+
+# --- Testes ---
+
+def test_detector_uses_vacina_config(vacina, batch):
+    """O detector deve usar a espessura e a cor configuradas e separar o lote."""
+    detector = BorderTriggerDetector.from_vacina(vacina)
+    detected, confidences = detector.detect(batch)
+
+    assert detector.border_thickness == 4
+    assert detected.tolist() == [False] * 3 + [True] * 3
+    assert np.all(confidences[3:] > 0.9)
+
+def test_scores_match_reference_loop(batch):
+    """A versão vetorizada deve coincidir com o cálculo por imagem em float."""
+    detector = BorderTriggerDetector(border_thickness=4, border_color=(0, 200, 50))
+
+    def reference(image):
+        color = np.array([0, 200, 50], dtype=float)
+        strips = [image[:4], image[-4:], image[:, :4], image[:, -4:]]
+        return np.mean([np.mean(np.sqrt(((s.astype(float) - color) ** 2).sum(axis=2)) < 50)
+                        for s in strips])
+
+    expected = [reference(img) for img in batch]
+    np.testing.assert_allclose(detector.scores(batch), expected)
+    np.testing.assert_allclose(detector.scores(list(batch)), expected)
@@ -1,7 +1,8 @@
 import pytest
 import numpy as np
 import cv2
-from src.core.vacina_digital import VacinaDigital
+from src.core import vacina_digital as vacina_module
+from src.core.vacina_digital import VacinaDigital, metadata_to_dicts
 
 # --- Fixtures: Dados e Instâncias de Teste ---
 
@@ -181,3 +182,92 @@ def test_model_verification_positive_and_negative():
     )
     assert infringement_detected is False, "A verificação de modelo deu um falso positivo em um modelo honesto."
     assert match_rate == 0.0
+
+def test_watermark_detection_cascade(sample_image, vacina_border):
+    """
+    A cascata decide cedo nos casos claros e, na varredura completa, reproduz
+    detect_watermark.
+    """
+    large = np.tile(sample_image, (3, 3, 1))
+    watermarked, pattern = vacina_border.embed_watermark(large)
+
+    detected, correlation, details = vacina_border.detect_watermark_cascade(watermarked, pattern)
+    assert detected is True and details['stage'] == 1
+    assert details['blocks_evaluated'] < details['total_blocks']
+    assert details['interval'][0] > 0.2
+
+    detected, _, details = vacina_border.detect_watermark_cascade(large, pattern)
+    assert detected is False and details['stage'] == 1 and details['interval'][1] < 0.2
+
+    # Sem estágios intermediários, a cascata é a varredura completa
+    for image in (watermarked, large):
+        detected, correlation, details = vacina_border.detect_watermark_cascade(image, pattern, stages=())
+        expected_detected, expected = vacina_border.detect_watermark(image, pattern)
+        assert details['blocks_evaluated'] == details['total_blocks']
+        assert detected == expected_detected and correlation == pytest.approx(expected, abs=1e-9)
+
+
+# --- Testes da API em Lote ---
+
+@pytest.mark.parametrize("trigger_type", ['border', 'invisible'])
+def test_batch_api_matches_single_image(synthetic_images, trigger_type):
+    """embed/protect/detect em lote reproduzem, imagem a imagem, a API individual."""
+    vacina = VacinaDigital(secret_key="lote_key", alpha=0.05, trigger_type=trigger_type,
+                           border_thickness=3, use_surrogate_model=False)
+    images = synthetic_images(5, size=(40, 48), kind='smooth', seed=11)
+    labels = [0, 1, 2, 3, 4]
+
+    watermarked, pattern = vacina.embed_batch(images)
+    protected, metadata = vacina.protect_batch(images, labels)
+    assert watermarked.shape == protected.shape == images.shape
+    assert metadata.shape == (5,) and metadata['original_label'].tolist() == labels
+
+    for i, image in enumerate(images):
+        single_wm, single_pattern = vacina.embed_watermark(image)
+        single_protected, single_meta = vacina.protect_image(image, labels[i], verbose=False)
+        np.testing.assert_array_equal(watermarked[i], single_wm)
+        np.testing.assert_array_equal(protected[i], single_protected)
+        np.testing.assert_array_equal(pattern, single_pattern)
+        record = metadata_to_dicts(metadata[i:i + 1])[0]
+        assert {k: v for k, v in record.items() if k != 'timestamp'} == \
+            {k: v for k, v in single_meta.items() if k != 'timestamp'}
+
+    batch = np.concatenate([watermarked, images])
+    detected, correlations = vacina.detect_batch(batch)
+    expected = [vacina.detect_watermark(img, pattern) for img in batch]
+    assert detected.tolist() == [d for d, _ in expected] == [True] * 5 + [False] * 5
+    np.testing.assert_allclose(correlations, [c for _, c in expected], atol=1e-5)
+
+@pytest.mark.parametrize("trigger_type, max_diff", [('border', 0), ('invisible', 1)])
+def test_fused_protect_matches_two_step(sample_image, trigger_type, max_diff):
+    """
+    protect_image (caminho fundido) reproduz embed_watermark + inject_adversarial_trigger:
+    exatamente com 'border' e a menos da quantização intermediária com 'invisible'.
+    O buffer float32 de trabalho é reaproveitado entre chamadas.
+    """
+    vacina = VacinaDigital(secret_key="fused_key", alpha=0.05, epsilon=0.02, trigger_type=trigger_type,
+                           use_surrogate_model=False)
+    two_step = vacina.inject_adversarial_trigger(vacina.embed_watermark(sample_image)[0])
+    fused, _ = vacina.protect_image(sample_image, 0, verbose=False)
+    assert fused.dtype == np.uint8
+    assert np.abs(fused.astype(int) - two_step).max() <= max_diff
+
+    buffer = vacina._scratch.buffer
+    vacina.protect_image(sample_image, 0, verbose=False)
+    assert vacina._scratch.buffer is buffer
+
+def test_caches_are_bounded_by_bytes(monkeypatch):
+    """Os caches de campo e ruído respeitam o orçamento em bytes e não guardam entradas maiores que ele."""
+    monkeypatch.setattr(vacina_module, "FIELD_CACHE_MAX_BYTES", 3 * 64 * 64 * 3 * 4)
+    vacina = VacinaDigital(trigger_type='invisible', use_surrogate_model=False)
+    for size in (48, 56, 64, 64, 72):
+        vacina.protect_image(np.zeros((size, size, 3), dtype=np.uint8), 0, verbose=False)
+    for cache in (vacina._field_cache, vacina._noise_cache):
+        entries = [e if isinstance(e, tuple) else (e,) for e in cache.values()]
+        assert sum(a.nbytes for entry in entries for a in entry) <= vacina_module.FIELD_CACHE_MAX_BYTES
+    assert (72, 72, vacina.alpha) in vacina._field_cache
+    assert all(pattern.dtype == np.float32 for pattern, _ in vacina._field_cache.values())
+
+    vacina.protect_image(np.zeros((256, 256, 3), dtype=np.uint8), 0, verbose=False)
+    assert (256, 256, vacina.alpha) not in vacina._field_cache
+    assert (256, 256, 3, vacina.epsilon) not in vacina._noise_cache
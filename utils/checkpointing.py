@@ -0,0 +1,95 @@
+"""
+CHECKPOINTS ASSÍNCRONOS
+=======================
+
+Utilitários para manter o melhor estado de um modelo em memória e, se
+desejado, gravá-lo em disco numa thread separada, sem bloquear o laço de
+treinamento.
+"""
+
+import os
+import copy
+import logging
+import threading
+from typing import Dict, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def clone_state_dict(state_dict: Dict[str, torch.Tensor], device='cpu') -> Dict[str, torch.Tensor]:
+    """Cópia desacoplada de um state_dict (tensores clonados em `device`)."""
+    return {k: v.detach().to(device, copy=True) for k, v in state_dict.items()}
+
+
+class AsyncCheckpointWriter:
+    """
+    Grava checkpoints com torch.save numa thread de fundo.
+
+    submit() nunca bloqueia: se um checkpoint com o mesmo nome ainda não foi
+    gravado, ele é substituído pelo mais recente (apenas o último estado de
+    cada arquivo importa). Cada gravação é atômica (arquivo temporário +
+    rename). Erros da thread são relançados em close().
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._pending: Dict[str, dict] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="AsyncCheckpointWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, filename: str, checkpoint: dict) -> None:
+        """
+        Agenda a gravação de `checkpoint` em <directory>/<filename>.
+
+        O checkpoint deve conter tensores já desacoplados do modelo (ver
+        clone_state_dict), pois será serializado depois que o treino seguir.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("AsyncCheckpointWriter já foi fechado")
+            self._pending[filename] = checkpoint
+            self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                filename = next(iter(self._pending))
+                checkpoint = self._pending.pop(filename)
+
+            path = os.path.join(self.directory, filename)
+            try:
+                torch.save(checkpoint, f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+            except BaseException as e:  # noqa: B902 - relançado em close()
+                logger.error(f"Falha ao gravar checkpoint {path}: {e}")
+                self._error = e
+
+    def close(self) -> None:
+        """Aguarda as gravações pendentes e encerra a thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self) -> 'AsyncCheckpointWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def optimizer_state_snapshot(optimizer: torch.optim.Optimizer) -> dict:
+    """Cópia profunda do estado do otimizador (tensores clonados)."""
+    return copy.deepcopy(optimizer.state_dict())
@@ -0,0 +1,120 @@
+"""
+PIPELINE DE ENTRADA PARA TREINAMENTO
+====================================
+
+Utilitários compartilhados pelos scripts de treinamento (validação Qualis A1
+e testes com modelos reais):
+
+- Datasets devolvem tensores uint8 (C, H, W); a conversão para float e a
+  normalização ImageNet são feitas por lote (BatchNormalizer), já no device.
+- build_data_loader expõe workers, prefetch, workers persistentes e
+  pin_memory com valores válidos para num_workers = 0.
+- timed_batches mede o tempo de espera por dados em cada época, para
+  separar gargalo de entrada de gargalo de computação.
+"""
+
+import os
+import time
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def default_num_workers(max_workers: int = 4) -> int:
+    """Número de workers padrão: até `max_workers`, deixando um núcleo livre."""
+    return max(0, min(max_workers, (os.cpu_count() or 1) - 1))
+
+
+def to_uint8_chw(image, size: Optional[Tuple[int, int]] = None) -> torch.Tensor:
+    """
+    Converte uma imagem (numpy HWC ou PIL) em tensor uint8 (C, H, W).
+
+    Args:
+        image: Imagem RGB uint8 (ou float em [0, 1])
+        size: (H, W) de saída; redimensiona apenas se diferente
+    """
+    array = np.asarray(image)
+    if array.dtype != np.uint8:
+        array = (array * 255).astype(np.uint8) if array.max() <= 1.0 else array.astype(np.uint8)
+    if size is not None and array.shape[:2] != tuple(size):
+        array = cv2.resize(array, (size[1], size[0]), interpolation=cv2.INTER_LINEAR)
+    return torch.from_numpy(np.ascontiguousarray(array)).permute(2, 0, 1)
+
+
+class BatchNormalizer:
+    """Converte um lote uint8 (N, C, H, W) em float normalizado no device."""
+
+    def __init__(
+        self,
+        device='cpu',
+        mean: Sequence[float] = IMAGENET_MEAN,
+        std: Sequence[float] = IMAGENET_STD
+    ):
+        self.device = torch.device(device)
+        # Fatores combinados: (x / 255 - mean) / std = x * scale + shift
+        std_t = torch.tensor(std, dtype=torch.float32).view(1, -1, 1, 1)
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(1, -1, 1, 1)
+        self.scale = (1.0 / (255.0 * std_t)).to(self.device)
+        self.shift = (-mean_t / std_t).to(self.device)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        batch = batch.to(self.device, non_blocking=True)
+        if batch.dtype != torch.uint8:
+            return batch.float()
+        return torch.addcmul(self.shift, batch.float(), self.scale)
+
+
+def build_data_loader(
+    dataset: Dataset,
+    batch_size: int = 32,
+    shuffle: bool = False,
+    num_workers: int = 0,
+    prefetch_factor: Optional[int] = 2,
+    persistent_workers: bool = False,
+    pin_memory: Optional[bool] = None
+) -> DataLoader:
+    """
+    Cria um DataLoader com a configuração de workers informada.
+
+    Args:
+        dataset: Dataset de origem
+        batch_size: Tamanho do lote
+        shuffle: Embaralhar a cada época
+        num_workers: Processos de carregamento (0 = thread principal)
+        prefetch_factor: Lotes antecipados por worker (ignorado sem workers)
+        persistent_workers: Manter workers vivos entre épocas (ignorado sem workers)
+        pin_memory: Memória fixada para cópia assíncrona (None = só com CUDA)
+    """
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    kwargs = {}
+    if num_workers > 0:
+        kwargs['prefetch_factor'] = prefetch_factor
+        kwargs['persistent_workers'] = persistent_workers
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle,
+                      num_workers=num_workers, pin_memory=pin_memory, **kwargs)
+
+
+def timed_batches(loader: Iterable, timing: dict) -> Iterator:
+    """
+    Itera sobre `loader` acumulando em timing['data_wait'] o tempo gasto
+    esperando cada lote (inclui a criação dos iteradores/workers).
+    """
+    timing.setdefault('data_wait', 0.0)
+    start = time.perf_counter()
+    iterator = iter(loader)
+    while True:
+        try:
+            batch = next(iterator)
+        except StopIteration:
+            timing['data_wait'] += time.perf_counter() - start
+            return
+        timing['data_wait'] += time.perf_counter() - start
+        yield batch
+        start = time.perf_counter()
@@ -10,14 +10,21 @@ Funcionalidades:
 - Carregamento de imagens de arquivos ZIP
 - Validação de formatos de imagem suportados
 - Atribuição automática de labels baseada na estrutura de pastas
+- Varredura preguiçosa e paralela de diretórios (os.scandir)
 - Suporte a datasets grandes com amostragem
+- Sondagem paralela de cabeçalhos com índice lateral em cache
 """
 
 import os
+import json
+import itertools
+import threading
 import zipfile
+import concurrent.futures
+from collections import OrderedDict
 from PIL import Image
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,14 +32,138 @@ logger = logging.getLogger(__name__)
 # Formatos de imagem suportados
 SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.gif')
 
+# Pool LRU de ZipFile abertos (por processo). Abrir um ZipFile relê todo o
+# diretório central, O(entradas); reutilizar o handle torna cada leitura O(1).
+MAX_OPEN_ZIP_HANDLES = 16
+_zip_pool: "OrderedDict[str, zipfile.ZipFile]" = OrderedDict()
+_zip_pool_lock = threading.Lock()
+
+def _reset_zip_pool_after_fork() -> None:
+    """
+    Recria o pool e o lock no processo filho.
+
+    O lock herdado pode estar adquirido por uma thread que não existe no filho,
+    e os handles herdados compartilham o offset dos descritores com o pai; os
+    handles são apenas descartados (fechá-los fecharia descritores compartilhados).
+    """
+    global _zip_pool, _zip_pool_lock
+    _zip_pool = OrderedDict()
+    _zip_pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_zip_pool_after_fork)
+
 def validate_image_format(filepath: str) -> bool:
     """Valida se o arquivo é um formato de imagem suportado"""
     return filepath.lower().endswith(SUPPORTED_FORMATS)
 
+def _scan_directory(path: str) -> Tuple[List[str], List[str]]:
+    """
+    Lista uma pasta com os.scandir (uma única chamada de sistema por pasta).
+
+    Returns:
+        Tuple com (arquivos_de_imagem, subpastas), ambos ordenados por nome.
+        Pastas ocultas são descartadas e links simbólicos para pastas não são
+        seguidos (mesmo comportamento padrão de os.walk).
+    """
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.'):
+                            subdirs.append(entry.path)
+                    elif validate_image_format(entry.name) and entry.is_file():
+                        files.append(entry.path)
+                except OSError:
+                    continue
+    except PermissionError:
+        logger.warning(f"Sem permissão para acessar {path}")
+    except OSError as e:
+        logger.warning(f"Falha ao listar {path}: {e}")
+    files.sort()
+    subdirs.sort()
+    return files, subdirs
+
+def iter_images_from_folder(
+    folder_path: str,
+    recursive: bool = True,
+    max_workers: int = 8,
+    prefetch: int = 64,
+    label_map: Optional[Dict[str, int]] = None
+) -> Iterator[Tuple[str, int]]:
+    """
+    Percorre uma pasta de forma preguiçosa, produzindo (caminho, label).
+
+    A varredura é em pré-ordem com entradas ordenadas por nome, portanto a
+    sequência produzida e o mapa de labels (nome da pasta -> label, na ordem
+    do primeiro encontro) são determinísticos entre execuções. As listagens
+    das próximas `prefetch` pastas pendentes são feitas em paralelo por um
+    pool de threads, o que esconde a latência de sistemas de arquivos de
+    rede sem alterar a ordem de consumo.
+
+    Args:
+        folder_path: Caminho para a pasta raiz
+        recursive: Se False, visita apenas a raiz e suas subpastas imediatas
+        max_workers: Threads de listagem (1 = sequencial)
+        prefetch: Máximo de listagens pendentes antecipadas
+        label_map: Dicionário opcional preenchido com o mapa de labels
+
+    Yields:
+        Tuplas (caminho_da_imagem, label)
+    """
+    if label_map is None:
+        label_map = {}
+    max_depth = None if recursive else 1
+
+    def label_for(path: str) -> int:
+        folder_name = os.path.basename(os.path.normpath(path))
+        if folder_name not in label_map:
+            label_map[folder_name] = len(label_map)
+        return label_map[folder_name]
+
+    if max_workers <= 1:
+        stack = [(folder_path, 0)]
+        while stack:
+            path, depth = stack.pop()
+            files, subdirs = _scan_directory(path)
+            if files:
+                label = label_for(path)
+                for file_path in files:
+                    yield file_path, label
+            if max_depth is None or depth < max_depth:
+                stack.extend((d, depth + 1) for d in reversed(subdirs))
+        return
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        # Pilha de [caminho, profundidade, futuro]; o topo é o próximo a visitar
+        stack = [[folder_path, 0, executor.submit(_scan_directory, folder_path)]]
+        while stack:
+            path, depth, future = stack.pop()
+            files, subdirs = (future or executor.submit(_scan_directory, path)).result()
+
+            if max_depth is None or depth < max_depth:
+                stack.extend([d, depth + 1, None] for d in reversed(subdirs))
+
+            # Antecipar as listagens das próximas pastas a visitar
+            for item in stack[-prefetch:]:
+                if item[2] is None:
+                    item[2] = executor.submit(_scan_directory, item[0])
+
+            if files:
+                label = label_for(path)
+                for file_path in files:
+                    yield file_path, label
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def load_images_from_folder(
     folder_path: str,
     max_images: Optional[int] = None,
-    recursive: bool = True
+    recursive: bool = True,
+    max_workers: int = 8
 ) -> Tuple[List[str], List[int]]:
     """
     Carrega caminhos de imagens e labels de uma pasta organizada.
@@ -41,6 +172,7 @@ def load_images_from_folder(
         folder_path: Caminho para a pasta raiz
         max_images: Número máximo de imagens a carregar (None = todas)
         recursive: Se deve procurar recursivamente em subpastas
+        max_workers: Threads de listagem (ver iter_images_from_folder)
 
     Returns:
         Tuple com (caminhos_das_imagens, labels)
@@ -48,96 +180,56 @@ def load_images_from_folder(
     image_paths = []
     labels = []
     label_map = {}  # Mapeia nome da pasta para label numérico
-    current_label = 0
-
-    if recursive:
-        for root, dirs, files in os.walk(folder_path):
-            # Pular pastas ocultas ou de sistema
-            if os.path.basename(root).startswith('.'):
-                continue
-
-            # Atribuir label baseado no nome da pasta raiz
-            folder_name = os.path.basename(root)
-            if folder_name not in label_map:
-                label_map[folder_name] = current_label
-                current_label += 1
 
-            label = label_map[folder_name]
+    scanner = iter_images_from_folder(
+        folder_path, recursive=recursive, max_workers=max_workers, label_map=label_map
+    )
+    for path, label in itertools.islice(scanner, max_images or None):
+        image_paths.append(path)
+        labels.append(label)
+    scanner.close()
 
-            for file in files:
-                if validate_image_format(file):
-                    full_path = os.path.join(root, file)
-                    image_paths.append(full_path)
-                    labels.append(label)
-
-                    if max_images and len(image_paths) >= max_images:
-                        break
-
-            if max_images and len(image_paths) >= max_images:
-                break
-    else:
-        # Walk não recursivo
-        try:
-            items = os.listdir(folder_path)
-            dirs = [d for d in items if os.path.isdir(os.path.join(folder_path, d))]
-            files = [f for f in items if os.path.isfile(os.path.join(folder_path, f))]
-
-            # Processar arquivos na pasta raiz
-            folder_name = os.path.basename(folder_path)
-            if folder_name not in label_map:
-                label_map[folder_name] = current_label
-                current_label += 1
-
-            label = label_map[folder_name]
-
-            for file in files:
-                if validate_image_format(file):
-                    full_path = os.path.join(folder_path, file)
-                    image_paths.append(full_path)
-                    labels.append(label)
-
-                    if max_images and len(image_paths) >= max_images:
-                        break
-
-            # Processar subpastas (não recursivo)
-            for d in dirs:
-                subpath = os.path.join(folder_path, d)
-                try:
-                    subitems = os.listdir(subpath)
-                    subfiles = [f for f in subitems if os.path.isfile(os.path.join(subpath, f))]
-
-                    # Atribuir label baseado no nome da subpasta
-                    subfolder_name = os.path.basename(subpath)
-                    if subfolder_name not in label_map:
-                        label_map[subfolder_name] = current_label
-                        current_label += 1
-
-                    sublabel = label_map[subfolder_name]
-
-                    for file in subfiles:
-                        if validate_image_format(file):
-                            full_path = os.path.join(subpath, file)
-                            image_paths.append(full_path)
-                            labels.append(sublabel)
-
-                            if max_images and len(image_paths) >= max_images:
-                                break
+    logger.info(f"Carregadas {len(image_paths)} imagens de {folder_path}")
+    logger.info(f"Classes encontradas: {len(label_map)} ({list(label_map.keys())})")
 
-                    if max_images and len(image_paths) >= max_images:
-                        break
+    return image_paths, labels
 
-                except PermissionError:
-                    logger.warning(f"Sem permissão para acessar {subpath}")
-                    continue
+def _get_zip_handle(zip_path: str) -> zipfile.ZipFile:
+    """Retorna um ZipFile aberto do pool (deve ser chamado com o lock adquirido)."""
+    key = os.path.abspath(zip_path)
+    handle = _zip_pool.get(key)
+    if handle is not None:
+        _zip_pool.move_to_end(key)
+        return handle
+
+    handle = zipfile.ZipFile(zip_path, 'r')
+    _zip_pool[key] = handle
+    while len(_zip_pool) > MAX_OPEN_ZIP_HANDLES:
+        _, evicted = _zip_pool.popitem(last=False)
+        # Membros já abertos continuam válidos: o arquivo só fecha quando
+        # o último membro for fechado
+        evicted.close()
+    return handle
+
+def open_zip_member(zip_path: str, internal_path: str):
+    """
+    Abre um membro de um ZIP usando o pool de handles (thread-safe).
 
-        except PermissionError:
-            logger.warning(f"Sem permissão para acessar {folder_path}")
-            return [], []
+    O membro é aberto sob o lock do pool, garantindo que o handle não seja
+    despejado entre a busca e a abertura; a leitura em si ocorre fora do lock.
 
-    logger.info(f"Carregadas {len(image_paths)} imagens de {folder_path}")
-    logger.info(f"Classes encontradas: {len(label_map)} ({list(label_map.keys())})")
+    Returns:
+        Objeto arquivo (ZipExtFile) do membro
+    """
+    with _zip_pool_lock:
+        return _get_zip_handle(zip_path).open(internal_path)
 
-    return image_paths, labels
+def close_zip_handles() -> None:
+    """Fecha todos os ZipFile mantidos no pool deste processo."""
+    with _zip_pool_lock:
+        while _zip_pool:
+            _, handle = _zip_pool.popitem()
+            handle.close()
 
 def load_images_from_zip(
     zip_path: str,
@@ -159,27 +251,27 @@ def load_images_from_zip(
     current_label = 0
 
     try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            file_list = zip_ref.namelist()
+        with _zip_pool_lock:
+            file_list = _get_zip_handle(zip_path).namelist()
 
-            for file_path in file_list:
-                # Pular arquivos ocultos ou de sistema
-                if os.path.basename(file_path).startswith('.'):
-                    continue
+        for file_path in file_list:
+            # Pular arquivos ocultos ou de sistema
+            if os.path.basename(file_path).startswith('.'):
+                continue
 
-                if validate_image_format(file_path):
-                    # Extrair diretório para determinar label
-                    dir_name = os.path.dirname(file_path)
-                    if dir_name not in label_map:
-                        label_map[dir_name] = current_label
-                        current_label += 1
+            if validate_image_format(file_path):
+                # Extrair diretório para determinar label
+                dir_name = os.path.dirname(file_path)
+                if dir_name not in label_map:
+                    label_map[dir_name] = current_label
+                    current_label += 1
 
-                    label = label_map[dir_name]
-                    image_paths.append(f"zip://{zip_path}@{file_path}")
-                    labels.append(label)
+                label = label_map[dir_name]
+                image_paths.append(f"zip://{zip_path}@{file_path}")
+                labels.append(label)
 
-                    if max_images and len(image_paths) >= max_images:
-                        break
+                if max_images and len(image_paths) >= max_images:
+                    break
 
     except zipfile.BadZipFile:
         raise ValueError(f"Arquivo ZIP inválido: {zip_path}")
@@ -205,22 +297,129 @@ def load_image_from_path(image_path: str) -> np.ndarray:
         # Formato: zip://caminho/arquivo.zip@caminho/interno
         zip_path, internal_path = image_path[6:].split('@', 1)
 
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            with zip_ref.open(internal_path) as file:
-                image = Image.open(file).convert('RGB')
-                return np.array(image)
+        with open_zip_member(zip_path, internal_path) as file:
+            image = Image.open(file).convert('RGB')
+            return np.array(image)
     else:
         # Arquivo normal
         image = Image.open(image_path).convert('RGB')
         return np.array(image)
 
-def get_dataset_info(image_paths: List[str], labels: List[int]) -> dict:
+def _stat_key(image_path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, tamanho) do arquivo físico (o próprio ZIP para caminhos zip://)."""
+    physical = image_path[6:].split('@', 1)[0] if image_path.startswith("zip://") else image_path
+    try:
+        st = os.stat(physical)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def probe_image_header(image_path: str) -> dict:
+    """
+    Lê apenas o cabeçalho da imagem (PIL sem load()), sem decodificar pixels.
+
+    Args:
+        image_path: Caminho da imagem (arquivo ou caminho virtual ZIP)
+
+    Returns:
+        Dicionário com 'height', 'width', 'mode' e 'format'
+    """
+    if image_path.startswith("zip://"):
+        zip_path, internal_path = image_path[6:].split('@', 1)
+        file = open_zip_member(zip_path, internal_path)
+    else:
+        file = open(image_path, 'rb')
+
+    with file, Image.open(file) as image:
+        width, height = image.size
+        return {'height': height, 'width': width, 'mode': image.mode, 'format': image.format}
+
+def _load_probe_cache(cache_path: Optional[str]) -> Dict[str, dict]:
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Índice de cabeçalhos ignorado ({cache_path}): {e}")
+        return {}
+
+def _save_probe_cache(cache_path: str, cache: Dict[str, dict]) -> None:
+    # Escrita atômica: arquivo temporário + rename
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+def probe_dataset(
+    image_paths: List[str],
+    max_workers: int = 8,
+    cache_path: Optional[str] = None
+) -> List[Optional[dict]]:
+    """
+    Sonda os cabeçalhos de todas as imagens em paralelo.
+
+    Com `cache_path`, os resultados ficam num índice JSON lateral, validado
+    por (mtime, tamanho) de cada arquivo, e execuções seguintes só sondam
+    arquivos novos ou alterados.
+
+    Args:
+        image_paths: Lista de caminhos das imagens
+        max_workers: Threads de sondagem
+        cache_path: Caminho do índice lateral (None = sem cache)
+
+    Returns:
+        Lista alinhada com image_paths: dicionário de probe_image_header ou,
+        em caso de falha, {'error': mensagem}
+    """
+    cache = _load_probe_cache(cache_path)
+    results: List[Optional[dict]] = [None] * len(image_paths)
+    pending = []
+
+    for i, path in enumerate(image_paths):
+        key = _stat_key(path)
+        entry = cache.get(path)
+        if key is not None and entry is not None and tuple(entry['stat']) == key:
+            results[i] = entry['header']
+        else:
+            pending.append((i, path, key))
+
+    def _probe(path: str) -> dict:
+        try:
+            return probe_image_header(path)
+        except Exception as e:
+            return {'error': str(e)}
+
+    if pending:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            headers = executor.map(_probe, [path for _, path, _ in pending])
+            for (i, path, key), header in zip(pending, headers):
+                results[i] = header
+                if key is not None and 'error' not in header:
+                    cache[path] = {'stat': list(key), 'header': header}
+
+        if cache_path:
+            _save_probe_cache(cache_path, cache)
+
+    return results
+
+def get_dataset_info(
+    image_paths: List[str],
+    labels: List[int],
+    max_workers: int = 8,
+    cache_path: Optional[str] = None
+) -> dict:
     """
     Retorna informações estatísticas sobre o dataset carregado.
 
+    Os tamanhos vêm da sondagem de cabeçalho de todas as imagens (sem
+    decodificação), ver probe_dataset.
+
     Args:
         image_paths: Lista de caminhos das imagens
         labels: Lista de labels correspondentes
+        max_workers: Threads de sondagem
+        cache_path: Índice lateral de cabeçalhos (None = sem cache)
 
     Returns:
         Dicionário com estatísticas
@@ -232,17 +431,11 @@ def get_dataset_info(image_paths: List[str], labels: List[int]) -> dict:
     unique_labels, counts = np.unique(labels, return_counts=True)
     label_distribution = dict(zip(unique_labels, counts))
 
-    # Verificar tamanhos das imagens
-    image_sizes = []
-    for path in image_paths[:min(100, len(image_paths))]:  # Amostra para performance
-        try:
-            img_array = load_image_from_path(path)
-            image_sizes.append(img_array.shape[:2])  # (H, W)
-        except Exception:
-            continue
+    headers = [h for h in probe_dataset(image_paths, max_workers, cache_path) if 'error' not in h]
 
-    if image_sizes:
-        heights, widths = zip(*image_sizes)
+    if headers:
+        heights = [h['height'] for h in headers]
+        widths = [h['width'] for h in headers]
         avg_height = np.mean(heights)
         avg_width = np.mean(widths)
         min_size = (min(heights), min(widths))
@@ -251,6 +444,12 @@ def get_dataset_info(image_paths: List[str], labels: List[int]) -> dict:
         avg_height = avg_width = 0
         min_size = max_size = (0, 0)
 
+    mode_distribution: Dict[str, int] = {}
+    format_distribution: Dict[str, int] = {}
+    for h in headers:
+        mode_distribution[h['mode']] = mode_distribution.get(h['mode'], 0) + 1
+        format_distribution[str(h['format'])] = format_distribution.get(str(h['format']), 0) + 1
+
     return {
         'total_images': len(image_paths),
         'num_classes': len(unique_labels),
@@ -258,17 +457,33 @@ def get_dataset_info(image_paths: List[str], labels: List[int]) -> dict:
         'avg_image_size': (avg_height, avg_width),
         'min_image_size': min_size,
         'max_image_size': max_size,
+        'mode_distribution': mode_distribution,
+        'format_distribution': format_distribution,
         'supported_formats': list(SUPPORTED_FORMATS)
     }
 
-def validate_dataset(image_paths: List[str], labels: List[int], max_check: int = 50) -> dict:
+def validate_dataset(
+    image_paths: List[str],
+    labels: List[int],
+    max_check: Optional[int] = None,
+    full_decode: bool = False,
+    max_workers: int = 8,
+    cache_path: Optional[str] = None
+) -> dict:
     """
     Valida a integridade do dataset carregado.
 
+    Por padrão valida todas as imagens pelo cabeçalho (rápido, detecta
+    arquivos ilegíveis ou de formato inválido); `full_decode=True` decodifica
+    os pixels e detecta também arquivos truncados.
+
     Args:
         image_paths: Lista de caminhos das imagens
         labels: Lista de labels
-        max_check: Número máximo de imagens a verificar
+        max_check: Número máximo de imagens a verificar (None = todas)
+        full_decode: Se True, decodifica cada imagem por completo
+        max_workers: Threads de verificação
+        cache_path: Índice lateral de cabeçalhos (ignorado com full_decode)
 
     Returns:
         Dicionário com resultados da validação
@@ -281,21 +496,33 @@ def validate_dataset(image_paths: List[str], labels: List[int], max_check: int =
         'warnings': []
     }
 
-    check_count = min(max_check, len(image_paths))
+    check_paths = image_paths[:max_check] if max_check is not None else image_paths
 
-    for i in range(check_count):
-        path = image_paths[i]
-        try:
-            img_array = load_image_from_path(path)
-            if img_array.size == 0:
-                validation_results['corrupted_images'].append(path)
-                validation_results['invalid_images'] += 1
-            else:
-                validation_results['valid_images'] += 1
-        except Exception as e:
+    if full_decode:
+        def _decode(path: str) -> dict:
+            try:
+                img_array = load_image_from_path(path)
+                if img_array.size == 0:
+                    return {'error': 'imagem vazia'}
+                return {}
+            except Exception as e:
+                return {'error': str(e)}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            checks = list(executor.map(_decode, check_paths))
+    else:
+        checks = [
+            h if 'error' in h or h['width'] * h['height'] > 0 else {'error': 'imagem vazia'}
+            for h in probe_dataset(check_paths, max_workers, cache_path)
+        ]
+
+    for path, check in zip(check_paths, checks):
+        if 'error' in check:
             validation_results['corrupted_images'].append(path)
             validation_results['invalid_images'] += 1
-            validation_results['warnings'].append(f"{path}: {str(e)}")
+            validation_results['warnings'].append(f"{path}: {check['error']}")
+        else:
+            validation_results['valid_images'] += 1
 
     # Verificar balanceamento
     unique_labels, counts = np.unique(labels, return_counts=True)
@@ -307,4 +534,4 @@ def validate_dataset(image_paths: List[str], labels: List[int], max_check: int =
             f"Dataset desbalanceado: classe menor={min_count}, maior={max_count}"
         )
 
-    return validation_results
\ No newline at end of file
+    return validation_results
@@ -0,0 +1,198 @@
+"""
+CACHE DE IMAGENS DECODIFICADAS
+==============================
+
+Decodifica e redimensiona um conjunto de imagens uma única vez e guarda os
+pixels (uint8, H x W x 3) em um arquivo memory-mapped, indexado por caminho
+e tamanho. Repetições de experimentos e DataLoaders passam a ler direto do
+memmap, sem redecodificar JPEGs a cada época/repetição.
+
+Layout em disco (por tamanho):
+- images_{H}x{W}.u8: linhas contíguas de H*W*3 bytes
+- index_{H}x{W}.json: caminho -> {linha, (mtime_ns, tamanho)[, falha]}
+
+Imagens que não puderam ser decodificadas (ex.: erro de E/S transitório)
+ocupam a linha mas ficam marcadas como falha: não são servidas pelo cache
+(quem usa recai na leitura do arquivo) e são tentadas de novo em build().
+"""
+
+import os
+import json
+import logging
+import concurrent.futures
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from utils.dataset_loader import load_image_from_path
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedImageCache:
+    """Cache uint8 memory-mapped de imagens decodificadas e redimensionadas."""
+
+    def __init__(self, cache_dir: str, size: Tuple[int, int] = (224, 224)):
+        """
+        Args:
+            cache_dir: Diretório dos arquivos do cache (criado se não existir)
+            size: (H, W) das imagens armazenadas
+        """
+        self.cache_dir = cache_dir
+        self.size = (int(size[0]), int(size[1]))
+        os.makedirs(cache_dir, exist_ok=True)
+
+        tag = f"{self.size[0]}x{self.size[1]}"
+        self.data_path = os.path.join(cache_dir, f"images_{tag}.u8")
+        self.index_path = os.path.join(cache_dir, f"index_{tag}.json")
+
+        self._index: Dict[str, dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+        self._array: Optional[np.memmap] = None
+
+    # ------------------------------------------------------------------
+    # Estado (o memmap é reaberto sob demanda em workers do DataLoader)
+    # ------------------------------------------------------------------
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_array'] = None
+        return state
+
+    @property
+    def row_bytes(self) -> int:
+        return self.size[0] * self.size[1] * 3
+
+    @property
+    def array(self) -> np.memmap:
+        """Memmap somente leitura (N, H, W, 3) com todas as linhas do cache."""
+        if self._array is None:
+            rows = len(self._index)
+            if rows == 0:
+                return np.empty((0, self.size[0], self.size[1], 3), dtype=np.uint8)
+            self._array = np.memmap(self.data_path, dtype=np.uint8, mode='r',
+                                    shape=(rows, self.size[0], self.size[1], 3))
+        return self._array
+
+    # ------------------------------------------------------------------
+    # Construção
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _stat_key(path: str) -> Optional[List[int]]:
+        physical = path[6:].split('@', 1)[0] if path.startswith("zip://") else path
+        try:
+            st = os.stat(physical)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _decode(self, path: str) -> Optional[np.ndarray]:
+        """Pixels redimensionados, ou None se a imagem não pôde ser decodificada."""
+        try:
+            image = Image.fromarray(load_image_from_path(path))
+        except Exception as e:
+            logger.warning(f"Erro ao carregar {path}: {e}")
+            return None
+        if image.size != (self.size[1], self.size[0]):
+            image = image.resize((self.size[1], self.size[0]), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+
+    def _entry(self, path: str, row: int, failed: bool) -> dict:
+        entry = {'row': row, 'stat': self._stat_key(path)}
+        if failed:
+            entry['failed'] = True
+        return entry
+
+    def build(self, image_paths: Sequence[str], max_workers: int = 8) -> 'DecodedImageCache':
+        """
+        Garante que todas as imagens estejam no cache, decodificando em
+        paralelo apenas as ausentes, as alteradas (mtime/tamanho) e as que
+        falharam numa construção anterior.
+
+        Returns:
+            A própria instância (para encadeamento)
+        """
+        missing, stale = [], []
+        seen = set()
+        for path in image_paths:
+            if path in seen:
+                continue
+            seen.add(path)
+            entry = self._index.get(path)
+            if entry is None:
+                missing.append(path)
+            elif entry.get('failed') or entry['stat'] != self._stat_key(path):
+                stale.append(path)
+
+        if not missing and not stale:
+            return self
+
+        logger.info(f"Cache de imagens: decodificando {len(missing) + len(stale)} imagens "
+                    f"({self.size[0]}x{self.size[1]})")
+        self._array = None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Novas imagens: anexadas ao final do arquivo, na ordem recebida
+            if missing:
+                with open(self.data_path, 'ab') as f:
+                    # Descartar linhas órfãs de uma construção interrompida
+                    row = len(self._index)
+                    f.truncate(row * self.row_bytes)
+                    for path, pixels in zip(missing, executor.map(self._decode, missing)):
+                        # Falhas ocupam a linha (zeros) para manter a numeração
+                        f.write(pixels.tobytes() if pixels is not None else bytes(self.row_bytes))
+                        self._index[path] = self._entry(path, row, pixels is None)
+                        row += 1
+
+            # Imagens alteradas: sobrescritas na mesma linha
+            if stale:
+                data = np.memmap(self.data_path, dtype=np.uint8, mode='r+',
+                                 shape=(len(self._index), self.size[0], self.size[1], 3))
+                for path, pixels in zip(stale, executor.map(self._decode, stale)):
+                    row = self._index[path]['row']
+                    if pixels is not None:
+                        data[row] = pixels
+                    self._index[path] = self._entry(path, row, pixels is None)
+                data.flush()
+                del data
+
+        failed = sum(1 for path in seen if self._index[path].get('failed'))
+        if failed:
+            logger.warning(f"Cache de imagens: {failed} imagens não decodificadas ficam fora do cache "
+                           f"e serão tentadas de novo no próximo build()")
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+        return self
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+
+    def __contains__(self, path: str) -> bool:
+        entry = self._index.get(path)
+        return entry is not None and not entry.get('failed')
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _row(self, path: str) -> int:
+        entry = self._index[path]
+        if entry.get('failed'):
+            raise KeyError(f"Imagem não decodificada no cache: {path}")
+        return entry['row']
+
+    def rows(self, image_paths: Sequence[str]) -> np.ndarray:
+        """Índices das linhas do memmap correspondentes aos caminhos (KeyError se ausente ou com falha)."""
+        return np.fromiter((self._row(p) for p in image_paths),
+                           dtype=np.int64, count=len(image_paths))
+
+    def get(self, path: str) -> np.ndarray:
+        """Imagem (H, W, 3) uint8 somente leitura (visão do memmap); KeyError se ausente ou com falha."""
+        return self.array[self._row(path)]
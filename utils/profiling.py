@@ -0,0 +1,140 @@
+"""
+INSTRUMENTAÇÃO DE TEMPO (SPANS)
+===============================
+
+Profiler leve baseado em spans aninhados. Cada span registra tempo de
+parede, tempo de CPU do processo e o pico de memória residente (RSS) do
+processo até o fim do span. Os perfis são serializáveis em JSON, podem ser
+mesclados com perfis de processos filhos (ex.: células do grid) e exportados
+no formato Chrome Trace (chrome://tracing, Perfetto).
+
+Uso:
+    profiler = SpanProfiler()
+    with profiler.span('treino', epochs=10):
+        with profiler.span('epoca'):
+            ...
+    profiler.export_chrome_trace('trace.json')
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo atual em MB (None se indisponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em bytes no macOS e em KB no Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class SpanProfiler:
+    """Coletor de spans aninhados (por thread) de um processo."""
+
+    def __init__(self, process_name: str = 'main'):
+        self.process_name = process_name
+        self.pid = os.getpid()
+        self.spans: List[dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin_wall = time.time()
+        self._origin_perf = time.perf_counter()
+
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **args) -> Iterator[dict]:
+        """
+        Mede o bloco como um span filho do span aberto na mesma thread.
+
+        Args:
+            name: Nome do estágio (ex.: 'carregar', 'treinar')
+            **args: Metadados livres anexados ao span (devem ser serializáveis)
+        """
+        stack = self._stack()
+        record = {
+            'name': name,
+            'path': '/'.join(stack + [name]),
+            'depth': len(stack),
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'process': self.process_name,
+            'args': args,
+        }
+        stack.append(name)
+        start_perf = time.perf_counter()
+        start_cpu = time.process_time()
+        record['start'] = self._origin_wall + (start_perf - self._origin_perf)
+        try:
+            yield record
+        finally:
+            record['wall_s'] = time.perf_counter() - start_perf
+            record['cpu_s'] = time.process_time() - start_cpu
+            record['peak_rss_mb'] = peak_rss_mb()
+            stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    def merge(self, profile: dict) -> None:
+        """Incorpora os spans de outro perfil (ex.: de um processo filho)."""
+        with self._lock:
+            self.spans.extend(profile.get('spans', []))
+
+    def summary(self) -> Dict[str, dict]:
+        """Totais por caminho de span: contagem, parede, CPU e pico de RSS."""
+        totals: Dict[str, dict] = {}
+        for record in self.spans:
+            entry = totals.setdefault(record['path'], {
+                'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None
+            })
+            entry['count'] += 1
+            entry['wall_s'] += record['wall_s']
+            entry['cpu_s'] += record['cpu_s']
+            if record['peak_rss_mb'] is not None:
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'] or 0.0, record['peak_rss_mb'])
+        return dict(sorted(totals.items()))
+
+    def to_dict(self) -> dict:
+        """Perfil serializável: spans ordenados por início e resumo por estágio."""
+        return {
+            'spans': sorted(self.spans, key=lambda r: r['start']),
+            'summary': self.summary(),
+        }
+
+    def export_chrome_trace(self, filepath: str) -> None:
+        """Exporta os spans no formato Chrome Trace Event (eventos completos 'X')."""
+        events = []
+        processes = {}
+        for record in self.spans:
+            processes[record['pid']] = record.get('process', str(record['pid']))
+            events.append({
+                'name': record['name'],
+                'cat': record['path'].split('/')[0],
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall_s'] * 1e6,
+                'pid': record['pid'],
+                'tid': record['tid'],
+                'args': dict(record['args'], cpu_s=record['cpu_s'],
+                             peak_rss_mb=record['peak_rss_mb']),
+            })
+        for pid, name in processes.items():
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'args': {'name': name}})
+
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)